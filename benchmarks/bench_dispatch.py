@@ -0,0 +1,86 @@
+"""
+Dispatcher throughput for state input, menu buttons and unmatched text,
+fed through the real router with the routing middlewares main.py
+registers. Telegram calls are stubbed; the bot's debug prints are
+counted and discarded.
+
+    python benchmarks/bench_dispatch.py
+"""
+import asyncio
+import contextlib
+import io
+import time
+from datetime import datetime
+
+from common import stub_telegram
+
+from aiogram import Bot
+from aiogram.types import Chat, Message, Update, User
+
+from constants import dp, router
+import handlers  # noqa: F401  (imported for its side effect: registers the bot handlers)
+from utils.data_store import get_user_data, init_user_data, set_user_data
+from utils.session_store import session_loader
+
+# Missing before user-017 and user-018; the script also runs on those commits
+try:
+    from utils.menu_routing import menu_routing
+except ImportError:
+    menu_routing = None
+try:
+    from utils.state_routing import state_routing
+except ImportError:
+    state_routing = None
+
+UPDATES = 3000
+
+
+def text_update(update_id: int, user_id: int, text: str) -> Update:
+    return Update(update_id=update_id, message=Message(
+        message_id=update_id,
+        date=datetime.now(),
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, is_bot=False, first_name="u"),
+        text=text
+    ))
+
+
+async def run(bot: Bot, label: str, make_update):
+    updates = [make_update(index) for index in range(UPDATES)]
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        started = time.perf_counter()
+        for update in updates:
+            await dp.feed_update(bot, update)
+        elapsed = time.perf_counter() - started
+    lines = output.getvalue().count("\n") / UPDATES
+    print(f"  {label:30s} {UPDATES / elapsed:7.0f} updates/s  {lines:.1f} stdout lines/update")
+
+
+async def main():
+    stub_telegram()
+    dp.include_routers(router)
+    dp.message.outer_middleware(session_loader)
+    for middleware in (menu_routing, state_routing):
+        if middleware is not None:
+            dp.message.outer_middleware(middleware)
+    bot = Bot("1:benchmark")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in range(1000, 1100):
+            init_user_data(user_id)
+            draft = get_user_data(user_id)
+            draft["state"] = "waiting_schedule_time"
+            set_user_data(user_id, draft)
+
+    print(f"{UPDATES} updates per run")
+    # An invalid time gets an error reply and leaves the state unchanged
+    await run(bot, "state input (schedule time)", lambda i: text_update(i, 1000 + i % 100, "not a time"))
+    await run(bot, "menu button (Developer Info)", lambda i: text_update(i, 7000 + i, "Developer Info"))
+    await run(bot, "menu button (Link Preview)", lambda i: text_update(i, 1000 + i % 100, "Link Preview"))
+    await run(bot, "unmatched text, no session", lambda i: text_update(i, 5000 + i, "hello there"))
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Memory of live drafts as plain dicts against PostDraft objects, and the
+cost of the two session encodings (JSON for dicts, marshal for drafts).
+
+    python benchmarks/bench_drafts.py
+"""
+import gc
+import time
+import tracemalloc
+
+import common  # noqa: F401  (imported for its side effects: repo on sys.path, mongomock db, temp cwd)
+
+from utils.post_draft import Button, MediaItem, PostDraft
+from utils.session_store import decode_session, encode_session
+
+DRAFTS = 100_000
+ENCODED = 10_000
+
+
+def empty_dict(index: int) -> dict:
+    return {
+        "text": "", "media": [], "buttons": [], "pin_post": False,
+        "notifications": True, "link_preview": True, "state": "main_post_menu"
+    }
+
+
+def empty_draft(index: int) -> PostDraft:
+    return PostDraft()
+
+
+def full_dict(index: int) -> dict:
+    return {
+        "text": f"Post {index} body",
+        "media": [{"type": "photo", "file_id": f"AgACAgIAAxkBAAI{index:08d}", "caption": ""}],
+        "buttons": [{"text": "Open", "url": "https://example.com"}],
+        "pin_post": False, "notifications": True, "link_preview": True, "state": "main_post_menu"
+    }
+
+
+def full_draft(index: int) -> PostDraft:
+    return PostDraft(
+        f"Post {index} body",
+        (MediaItem("photo", f"AgACAgIAAxkBAAI{index:08d}", ""),),
+        (Button("Open", "https://example.com"),)
+    )
+
+
+def live_memory(factory) -> float:
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    drafts = [factory(index) for index in range(DRAFTS)]
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del drafts
+    return used / 2**20
+
+
+def timed(function, values: list) -> tuple:
+    started = time.perf_counter()
+    results = [function(value) for value in values]
+    return (time.perf_counter() - started) / len(values), results
+
+
+def main():
+    print(f"tracemalloc over {DRAFTS:,} live drafts")
+    for label, as_dict, as_draft in (
+        ("empty draft", empty_dict, empty_draft),
+        ("1 media + 1 button", full_dict, full_draft),
+    ):
+        print(f"  {label:20s} dict {live_memory(as_dict):6.1f} MiB   PostDraft {live_memory(as_draft):6.1f} MiB")
+
+    drafts = [full_draft(index) for index in range(ENCODED)]
+    dicts = [full_dict(index) for index in range(ENCODED)]
+    marshal_encode, marshal_data = timed(PostDraft.to_bytes, drafts)
+    marshal_decode, _ = timed(PostDraft.from_bytes, marshal_data)
+    json_encode, json_data = timed(encode_session, dicts)
+    json_decode, _ = timed(decode_session, json_data)
+    print("serialization per draft")
+    print(f"  marshal {marshal_encode * 1e6:5.1f} / {marshal_decode * 1e6:5.1f} us encode/decode, "
+          f"{sum(map(len, marshal_data)) / ENCODED:.0f} B")
+    print(f"  json    {json_encode * 1e6:5.1f} / {json_decode * 1e6:5.1f} us encode/decode, "
+          f"{sum(map(len, json_data)) / ENCODED:.0f} B")
+
+
+if __name__ == "__main__":
+    main()
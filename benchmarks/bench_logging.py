@@ -0,0 +1,81 @@
+"""
+Cost of the logging helpers on the calling thread, and how much event-loop
+lag a burst of logging from concurrent handlers causes. Console output goes
+to /dev/null; the log files are written to the temporary directory.
+
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --disabled   (same load, logging off)
+
+Before user-023 the console handler is not reachable from here, so run it
+with 2>/dev/null there.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import common  # noqa: F401  (imported for its side effects: repo on sys.path, mongomock db, temp cwd)
+
+import utils.logger as logger_module
+from utils.logger import log_system_event, log_user_action, logger
+
+CALLS = 5000
+HANDLERS = 200
+LOGS_PER_HANDLER = 40
+
+
+def throughput(label: str, function):
+    started = time.perf_counter()
+    for index in range(CALLS):
+        function(index)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:16s} {CALLS / elapsed:8,.0f} calls/s ({elapsed / CALLS * 1e6:.0f} us/call)")
+
+
+async def burst():
+    lags = []
+    stop = False
+
+    async def ticker():
+        while not stop:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+
+    async def handler(user_id: int):
+        for index in range(LOGS_PER_HANDLER // 2):
+            log_user_action(user_id, "BUTTON", "x")
+            log_system_event("tick", str(index))
+            await asyncio.sleep(0)
+
+    ticker_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(user_id) for user_id in range(HANDLERS)))
+    elapsed = time.perf_counter() - started
+    stop = True
+    await ticker_task
+    lags.sort()
+    print(f"  {HANDLERS} handlers x {LOGS_PER_HANDLER} logs: {elapsed * 1000:.0f} ms; loop lag "
+          f"p50 {lags[len(lags) // 2] * 1000:.2f} ms, max {lags[-1] * 1000:.1f} ms")
+
+
+def main():
+    disabled = "--disabled" in sys.argv[1:]
+    if disabled:
+        logging.disable(logging.CRITICAL)
+    # Trees before user-023 build a logger per call and log to stderr directly
+    bot_logger = getattr(logger_module, "bot_logger", None)
+    if bot_logger and bot_logger.listener:
+        for handler in bot_logger.listener.handlers:
+            if type(handler) is logging.StreamHandler:
+                handler.setStream(open(os.devnull, "w"))
+
+    print(f"logging {'disabled' if disabled else 'enabled'}")
+    throughput("log_user_action", lambda index: log_user_action(index, "POST_CREATED", "channel -100123"))
+    throughput("logger.info", lambda index: logger.info(f"PUBLISH | job {index}"))
+    asyncio.run(burst())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Receipts of a 50-channel publish: how many db.posts writes the fan-out
+makes, and whether the edit lookup finds a post by any album item.
+
+    python benchmarks/bench_receipts.py
+"""
+import asyncio
+import time
+
+from common import FakeBot, db
+
+import utils.publish_queue as publish_queue_module
+from utils.publish_queue import PublishQueue
+
+CHANNELS = 50
+
+POST = {
+    "text": "hi",
+    "media": [{"type": "photo", "file_id": "a"}, {"type": "video", "file_id": "b"}],
+    "buttons": [{"text": "x", "url": "https://example.com"}]
+}
+
+
+async def main():
+    publish_queue_module.POLL_INTERVAL = 0.05
+    # Collections are created per attribute access, so count on the class
+    collection_class = type(db.posts)
+    writes = {"insert_one": 0, "insert_many": 0}
+    for name in writes:
+        original = getattr(collection_class, name)
+
+        def counted(self, *args, _name=name, _original=original, **kwargs):
+            if self.name == "posts":
+                writes[_name] += 1
+            return _original(self, *args, **kwargs)
+
+        setattr(collection_class, name, counted)
+
+    queue = PublishQueue(4)
+    await queue.start(FakeBot())
+    channels = [{"chat_id": -index, "title": f"C{index}"} for index in range(1, CHANNELS + 1)]
+    started = time.perf_counter()
+    post_id = await queue.enqueue(7, POST, channels, 7, 55)
+    while not (await db.publish_batches.find_one({"_id": post_id}))["completed_at"]:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    receipt = await db.posts.find_one({"channel_id": -3})
+    found = await db.posts.find_one({"channel_id": -3, "message_ids": receipt["media_group_ids"][1]})
+    print(f"{CHANNELS} channels published in {elapsed * 1000:.0f} ms")
+    print(f"  receipts stored: {await db.posts.count_documents({})}")
+    print(f"  db.posts writes: {writes['insert_many']} insert_many, {writes['insert_one']} insert_one")
+    print(f"  edit lookup by second album item: {'hit' if found else 'miss'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
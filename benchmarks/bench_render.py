@@ -0,0 +1,64 @@
+"""
+Per-publish render cost: building the keyboard and media list for every
+channel, as the publish path did before user-004, against compiling the
+post once with render_post and copying the method per channel.
+
+    python benchmarks/bench_render.py
+"""
+import time
+
+import common  # noqa: F401  (imported for its side effects: repo on sys.path, mongomock db, temp cwd)
+
+from aiogram.enums import ParseMode
+from aiogram.types import InputMediaPhoto
+
+from utils.keyboards import create_inline_buttons_keyboard
+from utils.post_renderer import render_post
+
+ROUNDS = 200
+
+POST = {
+    "text": "hello " * 50,
+    "media": [{"type": "photo", "file_id": f"F{i}"} for i in range(5)],
+    "buttons": [{"text": f"b{i}", "url": "https://example.com"} for i in range(4)],
+    "notifications": True
+}
+
+
+def render_per_channel(channels: int):
+    for _ in range(channels):
+        create_inline_buttons_keyboard(POST["buttons"])
+        [
+            InputMediaPhoto(
+                media=item["file_id"],
+                caption=POST["text"] if index == 0 else None,
+                parse_mode=ParseMode.HTML if index == 0 else None
+            )
+            for index, item in enumerate(POST["media"])
+        ]
+
+
+def compile_once(channels: int):
+    rendered = render_post(POST)
+    for chat_id in range(channels):
+        rendered.post_method.model_copy(update={"chat_id": chat_id})
+        rendered.buttons_method.model_copy(update={"chat_id": chat_id})
+
+
+def per_publish(function, channels: int) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        function(channels)
+    return (time.perf_counter() - started) / ROUNDS
+
+
+def main():
+    print("5 photos, 4 buttons; render cost per publish")
+    for channels in (1, 10, 25, 50):
+        before = per_publish(render_per_channel, channels)
+        after = per_publish(compile_once, channels)
+        print(f"  {channels:>2} channel(s): per channel {before * 1e6:6.0f} us, compiled once {after * 1e6:6.0f} us")
+
+
+if __name__ == "__main__":
+    main()
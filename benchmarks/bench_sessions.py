@@ -0,0 +1,90 @@
+"""
+Session store cost per backend, and how many backend writes SessionMap's
+write-behind buffer makes for repeated updates to the same sessions.
+fakeredis and mongomock stand in for the servers, so their timings are
+emulator overhead, not network latency; mongomock scans linearly, so it
+gets a smaller sample.
+
+Memory is measured the same way for every backend: tracemalloc from before
+the session values are built until they are stored and the caller's
+references dropped, i.e. what stays allocated in this process. For the
+memory backend that is the real cost; for redis* and mongo* it is the
+emulator's copy, which a real server would hold instead, so the encoded
+size is printed alongside.
+
+    python benchmarks/bench_sessions.py
+"""
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from common import db
+
+import fakeredis.aioredis
+
+from utils.post_draft import PostDraft
+from utils.session_store import MemorySessionStore, MongoSessionStore, RedisSessionStore, SessionMap
+
+
+def draft(index: int) -> PostDraft:
+    return PostDraft.from_dict({
+        "text": "Hello <b>world</b> " * 8,
+        "media": [{"type": "photo", "file_id": f"AgACAgIAAxkBAAI{index:08d}"}],
+        "buttons": [{"text": "Open", "url": "https://example.com"}]
+    })
+
+
+async def bench(name: str, store, make_value, count: int):
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    values = [make_value(index) for index in range(count)]
+    started = time.perf_counter()
+    for index, value in enumerate(values):
+        await store.set(f"draft:{index}", value)
+    set_time = (time.perf_counter() - started) / count
+    del values, value
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    started = time.perf_counter()
+    for index in range(count):
+        assert await store.get(f"draft:{index}") is not None
+    get_time = (time.perf_counter() - started) / count
+    print(
+        f"  {name:8s} n={count:<6} set {set_time * 1e6:7.1f} us  get {get_time * 1e6:7.1f} us"
+        f"  {memory * 10_000 / count / 2**20:5.2f} MiB per 10k retained in process"
+    )
+
+
+async def main():
+    encoded_size = len(draft(0).to_bytes())
+    print(f"draft size {encoded_size} B encoded, {encoded_size * 10_000 / 2**20:.2f} MiB per 10k on a server")
+    await bench("memory", MemorySessionStore(), draft, 10_000)
+    await bench("redis*", RedisSessionStore(client=fakeredis.aioredis.FakeRedis()), lambda index: draft(index).to_bytes(), 10_000)
+    await bench("mongo*", MongoSessionStore(db.sessions), lambda index: draft(index).to_bytes(), 200)
+
+    backend = RedisSessionStore(client=fakeredis.aioredis.FakeRedis())
+    writes = 0
+    original_set = backend.set
+
+    async def counted_set(key, value):
+        nonlocal writes
+        writes += 1
+        await original_set(key, value)
+
+    backend.set = counted_set
+    sessions = SessionMap("draft", backend=backend, per_user=False, encode=PostDraft.to_bytes, decode=PostDraft.from_bytes)
+    values = [draft(index) for index in range(10_000)]
+    started = time.perf_counter()
+    for index, value in enumerate(values):
+        sessions.set(index % 100, value)
+        sessions.get(index % 100)
+    elapsed = (time.perf_counter() - started) / len(values)
+    await sessions.flush_task
+    print(f"  SessionMap sync set+get {elapsed * 1e6:.1f} us; 10k updates to 100 sessions -> {writes} backend writes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Shared setup for PostBot's benchmark scripts
+Import this before anything from the bot. MongoDB is replaced by an
+in-memory mongomock database and Telegram calls by stubs, so the scripts
+need no server and no real token. Logs are written to a temporary
+directory instead of the repository's logs/.
+"""
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault("BOT_TOKEN", "1:benchmark")
+os.chdir(tempfile.mkdtemp(prefix="postbot-bench-"))
+
+from mongomock_motor import AsyncMongoMockClient
+
+import db as db_module
+
+# Modules bind `from db import db` at import time, so this has to run first
+db_module.db = AsyncMongoMockClient()["Postbot"]
+db = db_module.db
+
+
+class FakeBot:
+    """Bot stand-in recording every API call; `fail(name, kwargs)` may return an exception to raise"""
+
+    def __init__(self, fail=None, delay: float = 0.0):
+        self.calls = []
+        self.message_ids = itertools.count(100)
+        self.fail = fail or (lambda name, kwargs: None)
+        self.delay = delay
+
+    def _result(self, name: str, chat_id, media=None):
+        if name == "sendMediaGroup":
+            return [SimpleNamespace(message_id=next(self.message_ids)) for _ in media]
+        return SimpleNamespace(message_id=next(self.message_ids), chat=SimpleNamespace(id=chat_id))
+
+    async def __call__(self, method, request_timeout=None):
+        """Method objects, as sent by the publish path"""
+        await asyncio.sleep(self.delay)
+        name = method.__api_method__
+        kwargs = {"chat_id": getattr(method, "chat_id", None)}
+        self.calls.append((name, kwargs))
+        error = self.fail(name, kwargs)
+        if error:
+            raise error
+        return self._result(name, kwargs["chat_id"], getattr(method, "media", None))
+
+    def __getattr__(self, name):
+        """Shortcut methods such as send_message and edit_message_text"""
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self.delay)
+            self.calls.append((name, kwargs))
+            error = self.fail(name, kwargs)
+            if error:
+                raise error
+            return self._result(name, kwargs.get("chat_id"), kwargs.get("media"))
+        return call
+
+
+def stub_telegram(delay: float = 0.0):
+    """Make every aiogram Bot API call return True after `delay` seconds"""
+    from aiogram import Bot
+
+    async def call(self, method, request_timeout=None):
+        if delay:
+            await asyncio.sleep(delay)
+        return True
+
+    Bot.__call__ = call
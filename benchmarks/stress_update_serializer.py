@@ -0,0 +1,152 @@
+"""
+Stress test for per-user update serialization. Every update is fed to the
+dispatcher at once, with drafts behind a shared store that adds 0-4 ms
+of latency per call, with the serializer on or off:
+
+    python benchmarks/stress_update_serializer.py on
+    python benchmarks/stress_update_serializer.py off
+
+It checks that concurrent photos all land in the draft in order, that a
+read-modify-write around an API call loses no increments, and that
+different users still run in parallel.
+"""
+import asyncio
+import contextlib
+import io
+import itertools
+import random
+import sys
+import time
+from datetime import datetime
+
+import common  # noqa: F401  (imported for its side effects: repo on sys.path, mongomock db, temp cwd)
+
+from aiogram import Bot
+from aiogram.types import Chat, Message, PhotoSize, Update, User
+
+from constants import dp, router
+import handlers  # noqa: F401  (imported for its side effect: registers the bot handlers)
+import utils.data_store as data_store
+import utils.session_store as session_store
+from utils.menu_routing import menu_routing
+from utils.post_draft import PostDraft
+from utils.session_store import SessionStore, session_loader
+from utils.state_routing import state_router, state_routing
+from utils.update_scheduler import update_serializer
+
+USERS = 20
+PER_USER = 50
+
+# Seconds each stubbed API call takes; changed between scenarios
+api_delay = 0.0
+
+
+class SlowStore(SessionStore):
+    """Shared store with 0-4 ms of network latency per call"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key: str):
+        await asyncio.sleep(random.uniform(0, 0.004))
+        return self.data.get(key)
+
+    async def set(self, key: str, value):
+        await asyncio.sleep(random.uniform(0, 0.004))
+        self.data[key] = value
+
+    async def delete(self, key: str):
+        await asyncio.sleep(random.uniform(0, 0.004))
+        self.data.pop(key, None)
+
+
+async def fake_call(self, method, request_timeout=None):
+    if api_delay:
+        await asyncio.sleep(api_delay)
+    return True
+
+
+@state_router.message(data_store.user_post_data, "counting")
+async def count_handler(message: Message):
+    # Read-modify-write around an API call, like the edit flow's handlers
+    draft = data_store.get_user_data(message.from_user.id)
+    count = int(draft["text"])
+    await message.answer("ok")
+    data_store.set_user_data(message.from_user.id, PostDraft(text=str(count + 1), state="counting"))
+
+
+update_ids = itertools.count()
+
+
+def message_update(user_id: int, message_id: int, **content) -> Update:
+    return Update(update_id=next(update_ids), message=Message(
+        message_id=message_id,
+        date=datetime.now(),
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, is_bot=False, first_name="u"),
+        **content
+    ))
+
+
+def photo_update(user_id: int, index: int) -> Update:
+    return message_update(user_id, index, photo=[
+        PhotoSize(file_id=f"f{user_id}_{index}", file_unique_id="u", width=1, height=1, file_size=1)
+    ])
+
+
+async def main(serialize: bool):
+    global api_delay
+    Bot.__call__ = fake_call
+    data_store.user_post_data.backend = session_store.session_backend = SlowStore()
+    dp.include_routers(router)
+    if serialize:
+        dp.update.outer_middleware(update_serializer)
+    dp.message.outer_middleware(session_loader)
+    dp.message.outer_middleware(menu_routing)
+    dp.message.outer_middleware(state_routing)
+    bot = Bot("1:benchmark")
+    print(f"serializer {'on' if serialize else 'off'}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in range(USERS):
+            await dp.feed_update(bot, message_update(user_id, 0, text="Create Post"))
+            await dp.feed_update(bot, message_update(user_id, 1, text="Add Media"))
+        await asyncio.sleep(0.2)
+        updates = [photo_update(user_id, index) for index in range(PER_USER) for user_id in range(USERS)]
+        started = time.perf_counter()
+        await asyncio.gather(*(dp.feed_update(bot, update) for update in updates))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.3)
+        drafts = [data_store.get_user_data(user_id) for user_id in range(USERS)]
+    kept = sum(len(draft.get("media", ())) for draft in drafts)
+    in_order = all(
+        [item.file_id for item in draft.get("media", ())] == [f"f{user_id}_{index}" for index in range(PER_USER)]
+        for user_id, draft in enumerate(drafts)
+    )
+    print(f"  {USERS} users x {PER_USER} photos: {kept}/{USERS * PER_USER} kept, in order: {in_order}, {elapsed * 1000:.0f} ms")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in range(USERS):
+            data_store.set_user_data(user_id, PostDraft(text="0", state="counting"))
+        api_delay = 0.001
+        updates = [message_update(user_id, 200 + index, text="inc") for index in range(PER_USER) for user_id in range(USERS)]
+        await asyncio.gather(*(dp.feed_update(bot, update) for update in updates))
+        total = sum(int(data_store.get_user_data(user_id)["text"]) for user_id in range(USERS))
+    print(f"  {USERS} users x {PER_USER} read-modify-write increments: {total}/{USERS * PER_USER} kept")
+
+    api_delay = 0.05
+    with contextlib.redirect_stdout(io.StringIO()):
+        updates = [message_update(user_id, 100 + index, text="Developer Info") for index in range(5) for user_id in range(USERS)]
+        started = time.perf_counter()
+        await asyncio.gather(*(dp.feed_update(bot, update) for update in updates))
+        elapsed = time.perf_counter() - started
+    print(f"  {USERS} users x 5 updates of 50 ms API time: {elapsed * 1000:.0f} ms wall")
+    if serialize:
+        print(f"  metrics {update_serializer.get_metrics()}")
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("on", "off"):
+        sys.exit("usage: stress_update_serializer.py on|off")
+    asyncio.run(main(sys.argv[1] == "on"))
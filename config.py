@@ -31,15 +31,44 @@ class Config:
     MAX_CHANNELS_PER_USER = int(os.getenv("MAX_CHANNELS_PER_USER", "10"))
     MAX_BUTTONS_PER_POST = int(os.getenv("MAX_BUTTONS_PER_POST", "10"))
     MAX_MEDIA_PER_POST = int(os.getenv("MAX_MEDIA_PER_POST", "10"))
-    
+
+    # Publishing
+    PUBLISH_CONCURRENCY = int(os.getenv("PUBLISH_CONCURRENCY", "10"))  # publish workers
+    PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "5"))  # per channel, transient errors
+    PUBLISH_JOB_LEASE = int(os.getenv("PUBLISH_JOB_LEASE", "600"))  # seconds before a running job is presumed dead
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))  # dead-channel errors
+    CIRCUIT_COOLDOWN = int(os.getenv("CIRCUIT_COOLDOWN", "600"))  # seconds before re-probing
+    PROGRESS_EDIT_INTERVAL = float(os.getenv("PROGRESS_EDIT_INTERVAL", "2"))  # seconds between status edits
+    PUBLISH_DEDUPE_TTL = int(os.getenv("PUBLISH_DEDUPE_TTL", "600"))  # seconds a publish key is remembered
+
+    # Broadcasting
+    BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))  # broadcast workers
+    BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))  # messages/second, under the global limit
+    BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "1000"))  # users per cursor page
+    BROADCAST_LEASE = int(os.getenv("BROADCAST_LEASE", "60"))  # seconds an instance owns a running broadcast
+
     # Cache settings
     CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))  # 1 hour
+
+    # Session storage: memory, mongo or redis
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+    SESSION_TTL = int(os.getenv("SESSION_TTL", "86400"))  # idle seconds, 24 hours
+    SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "100000"))  # per session type
+    SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", "60"))  # seconds
+    BROADCAST_SESSION_TTL = int(os.getenv("BROADCAST_SESSION_TTL", "300"))  # unconfirmed broadcasts, 5 minutes
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE = os.getenv("LOG_FILE", "postbot.log")
+    EVENT_LOG_FILE = os.getenv("EVENT_LOG_FILE", "events.jsonl")  # structured JSON events
+    # Share of INFO events kept per event type, e.g. "user_action=0.1,api_call=0.05"
+    # Parsed by get_log_sample_rates(), so a malformed value fails validate() rather than the import
+    LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
       # Admin settings
     ADMIN_IDS = list(map(int, os.getenv("ADMIN_IDS", "").split(","))) if os.getenv("ADMIN_IDS") else []
+    # Bearer token for /metrics/handlers on the health port; unset keeps the endpoint off
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
     
     # Feature flags
     ENABLE_ANALYTICS = os.getenv("ENABLE_ANALYTICS", "true").lower() == "true"
@@ -49,6 +78,16 @@ class Config:
     # Rate limiting
     RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "30"))
     RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "60"))  # seconds
+    RATE_LIMIT_MAX_USERS = int(os.getenv("RATE_LIMIT_MAX_USERS", "100000"))  # users tracked at once
+
+    # last_activity is written at most once per interval per user
+    ACTIVITY_UPDATE_INTERVAL = int(os.getenv("ACTIVITY_UPDATE_INTERVAL", "300"))  # seconds
+
+    # Outbound Telegram API limits
+    TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # requests/second
+    TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))  # messages/second per chat
+    TELEGRAM_CHAT_BURST = int(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+    TELEGRAM_GROUP_RATE = int(os.getenv("TELEGRAM_GROUP_RATE", "20"))  # messages/minute per group
     
     # Backup settings
     BACKUP_INTERVAL = int(os.getenv("BACKUP_INTERVAL", "86400"))  # 24 hours
@@ -69,6 +108,33 @@ class Config:
         
         if cls.MAX_BUTTONS_PER_POST <= 0:
             raise ValueError("MAX_BUTTONS_PER_POST must be positive")
+
+        if cls.PUBLISH_CONCURRENCY <= 0:
+            raise ValueError("PUBLISH_CONCURRENCY must be positive")
+        if cls.PUBLISH_JOB_LEASE <= 0:
+            raise ValueError("PUBLISH_JOB_LEASE must be positive")
+
+        if cls.BROADCAST_CONCURRENCY <= 0 or cls.BROADCAST_RATE <= 0:
+            raise ValueError("Broadcast concurrency and rate must be positive")
+        if cls.BROADCAST_LEASE <= 0:
+            raise ValueError("BROADCAST_LEASE must be positive")
+
+        if cls.RATE_LIMIT_REQUESTS <= 0 or cls.RATE_LIMIT_WINDOW <= 0 or cls.RATE_LIMIT_MAX_USERS <= 0:
+            raise ValueError("RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW and RATE_LIMIT_MAX_USERS must be positive")
+
+        if cls.ACTIVITY_UPDATE_INTERVAL <= 0:
+            raise ValueError("ACTIVITY_UPDATE_INTERVAL must be positive")
+
+        if cls.TELEGRAM_GLOBAL_RATE <= 0 or cls.TELEGRAM_CHAT_RATE <= 0 or cls.TELEGRAM_GROUP_RATE <= 0:
+            raise ValueError("Telegram rate limits must be positive")
+        
+        if cls.SESSION_BACKEND.lower() not in ("memory", "mongo", "redis"):
+            raise ValueError("SESSION_BACKEND must be memory, mongo or redis")
+        if cls.SESSION_SWEEP_INTERVAL <= 0:
+            raise ValueError("SESSION_SWEEP_INTERVAL must be positive")
+        
+        if any(not 0 <= rate <= 1 for rate in cls.get_log_sample_rates().values()):
+            raise ValueError("LOG_SAMPLE_RATES must be between 0 and 1")
         
         if cls.CACHE_TTL < 0:
             raise ValueError("CACHE_TTL cannot be negative")
@@ -80,6 +146,24 @@ class Config:
         """Get database URI with proper formatting"""
         return cls.MONGO_URI
     
+    @classmethod
+    def get_log_sample_rates(cls):
+        """Parse LOG_SAMPLE_RATES into event name -> rate"""
+        rates = {}
+        for item in cls.LOG_SAMPLE_RATES.split(","):
+            if not item.strip():
+                continue
+            name, _, rate = item.partition("=")
+            try:
+                rates[name.strip()] = float(rate)
+            except ValueError:
+                raise ValueError(
+                    f"LOG_SAMPLE_RATES must look like user_action=0.1,api_call=0.05; got {item.strip()!r}"
+                ) from None
+            if not name.strip():
+                raise ValueError(f"LOG_SAMPLE_RATES entry {item.strip()!r} has no event name")
+        return rates
+    
     @classmethod
     def is_admin(cls, user_id):
         """Check if user is admin"""
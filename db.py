@@ -1,6 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from constants import MONGO_URI
+from utils.handler_metrics import database_timing
 
-mongo_client = AsyncIOMotorClient(MONGO_URI)
+# Command timings feed the per-handler DB histograms
+mongo_client = AsyncIOMotorClient(MONGO_URI, event_listeners=[database_timing])
 db = mongo_client["Postbot"]
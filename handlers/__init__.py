@@ -13,5 +13,23 @@ from . import (
     stats,
     connect,
     channel_selection,
+    schedule,
     edit_post
 )
+
+# Imported to register their handlers on the routers
+__all__ = [
+    "start",
+    "post_creation",
+    "post_settings",
+    "buttons",
+    "media",
+    "text_input",
+    "preview_publish",
+    "chat",
+    "stats",
+    "connect",
+    "channel_selection",
+    "schedule",
+    "edit_post"
+]
@@ -2,7 +2,7 @@
 Admin commands handler for PostBot
 Advanced administrative functionality
 """
-from aiogram import types, F
+from aiogram import types
 from aiogram.filters import Command
 from aiogram.enums import ParseMode
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -16,9 +16,22 @@ from db import db
 from config import Config
 from utils.logger import logger, log_user_action, log_system_event
 from utils.backup import backup_manager
+from utils.rate_limiter import rate_limiter
+from utils.circuit_breaker import channel_breaker
+from utils.broadcaster import broadcast_manager
+from utils.segments import count_segment, describe_segment, parse_segment
+from utils.session_store import MemorySessionStore, SessionMap, get_session_metrics
+from utils.throttle import inbound_throttle
+from utils.update_scheduler import update_serializer
+from utils.handler_metrics import handler_metrics
+from utils.callbacks import BroadcastConfirm, LogsPage
+from utils.log_reader import search_logs
+from utils.callback_routing import callback_router
 
-# Store broadcast sessions temporarily
-broadcast_sessions = {}
+# Pending broadcast confirmations by session ID, dropped by the sweeper
+broadcast_sessions = SessionMap("broadcast", per_user=False, ttl=Config.BROADCAST_SESSION_TTL)
+# Paged /logs results by search ID; log files are per instance, so never shared
+log_searches = SessionMap("logs", backend=MemorySessionStore(), per_user=False, ttl=900, max_entries=20)
 
 @router.message(Command("admin"))
 async def cmd_admin(message: types.Message):
@@ -38,8 +51,10 @@ async def cmd_admin(message: types.Message):
             f"• <code>/analytics</code> - Detailed bot analytics\n"
             f"• <code>/backup</code> - Database backup management\n"
             f"• <code>/broadcast</code> - Send message to all users\n"
+            f"• <code>/broadcasts</code> - Pause, resume or cancel broadcasts\n"
             f"• <code>/users</code> - User management\n"
             f"• <code>/system</code> - System information\n"
+            f"• <code>/latency</code> - Handler latency percentiles\n"
             f"• <code>/logs</code> - View recent logs\n"
             f"• <code>/config</code> - View configuration\n\n"
             f"<b>Quick Stats:</b>\n"
@@ -169,6 +184,14 @@ async def cmd_broadcast(message: types.Message):
         await message.reply("This command is only available for administrators.")
         return
     
+    # Leading options pick the audience segment
+    command_args = message.text.split(maxsplit=1)[1] if len(message.text.split(maxsplit=1)) > 1 else ""
+    try:
+        segment, command_text = parse_segment(command_args)
+    except ValueError as e:
+        await message.reply(f"Invalid audience option: {html.escape(str(e))}")
+        return
+    
     # Check if replying to a message
     if message.reply_to_message:
         broadcast_text = message.reply_to_message.text or message.reply_to_message.caption
@@ -177,37 +200,44 @@ async def cmd_broadcast(message: types.Message):
             return
     else:
         # Check if message has content to broadcast
-        if len(message.text.split(maxsplit=1)) < 2:
+        if not command_text:
             await message.reply(
                 "<b>Broadcast Usage:</b>\n"
-                "• <code>/broadcast &lt;message&gt;</code> - Broadcast text message\n"
-                "• Reply to a message with <code>/broadcast</code> - Broadcast that message\n\n"
+                "• <code>/broadcast [options] &lt;message&gt;</code> - Broadcast text message\n"
+                "• Reply to a message with <code>/broadcast [options]</code> - Broadcast that message\n\n"
+                "<b>Audience options:</b>\n"
+                "• <code>active:7</code> - Active in the last 7 days\n"
+                "• <code>has:channels</code> - Users with connected channels\n"
+                "• <code>joined:2025-01-01..2025-01-31</code> - Joined in a date range\n"
+                "• <code>users:123,456</code> - Specific users\n\n"
                 "<b>Example:</b>\n"
-                "<code>/broadcast New feature released! Check it out with /start</code>",
+                "<code>/broadcast active:30 New feature released! Check it out with /start</code>",
                 parse_mode=ParseMode.HTML
             )
             return
-        broadcast_text = message.text.split(maxsplit=1)[1]
+        broadcast_text = command_text
     
     try:
-        total_users = await db.users.count_documents({})
+        # Count-only preview of the audience
+        count_started = datetime.now()
+        total_users = await count_segment(segment)
+        count_ms = (datetime.now() - count_started).total_seconds() * 1000
         
         # Create unique session ID
-        session_id = str(uuid.uuid4())
-        broadcast_sessions[session_id] = {
+        session_id = uuid.uuid4().hex
+        broadcast_sessions.set(session_id, {
             'admin_id': message.from_user.id,
             'chat_id': message.chat.id,
-            'message': broadcast_text,
-            'is_reply': bool(message.reply_to_message),
-            'reply_message': message.reply_to_message,
+            'payload': build_broadcast_payload(message.reply_to_message, broadcast_text),
+            'segment': segment,
             'created_at': datetime.now()
-        }
+        })
         
         # Create confirmation keyboard
         keyboard = InlineKeyboardBuilder()
         keyboard.add(
-            types.InlineKeyboardButton(text="Yes, Send", callback_data=f"broadcast_yes_{session_id}"),
-            types.InlineKeyboardButton(text="No, Cancel", callback_data=f"broadcast_no_{session_id}")
+            types.InlineKeyboardButton(text="Yes, Send", callback_data=BroadcastConfirm(confirm=True, session_id=session_id).pack()),
+            types.InlineKeyboardButton(text="No, Cancel", callback_data=BroadcastConfirm(confirm=False, session_id=session_id).pack())
         )
         keyboard.adjust(2)
         
@@ -217,8 +247,8 @@ async def cmd_broadcast(message: types.Message):
             f"<b>Confirm Broadcast</b>\n\n"
             f"<b>Message Preview:</b>\n"
             f"{safe_preview}\n\n"
-            f"<b>Will send to:</b> All registered users\n"
-            f"<b>Estimated recipients:</b> {total_users:,}\n\n"
+            f"<b>Will send to:</b> {describe_segment(segment)}\n"
+            f"<b>Estimated recipients:</b> {total_users:,} (counted in {count_ms:.0f} ms)\n\n"
             f"<b>Choose an option:</b>"
         )
         
@@ -233,24 +263,26 @@ async def cmd_broadcast(message: types.Message):
         await message.reply(f"Error preparing broadcast: {error_msg}")
         logger.error(f"Broadcast preparation error: {e}")
 
-@router.callback_query(F.data.startswith("broadcast_"))
-async def handle_broadcast_callback(callback: types.CallbackQuery):
+@callback_router.data(BroadcastConfirm)
+async def handle_broadcast_callback(callback: types.CallbackQuery, callback_data: BroadcastConfirm):
     """Handle broadcast confirmation callbacks"""
     try:
-        action, session_id = callback.data.split("_", 2)[1], callback.data.split("_", 2)[2]
+        session_id = callback_data.session_id
         
-        if session_id not in broadcast_sessions:
+        # May have been created by another instance
+        await broadcast_sessions.load(session_id)
+        session = broadcast_sessions.get(session_id)
+        if session is None or (datetime.now() - session['created_at']).total_seconds() > Config.BROADCAST_SESSION_TTL:
+            broadcast_sessions.delete(session_id)
             await callback.answer("Broadcast session expired.", show_alert=True)
             return
         
-        session = broadcast_sessions[session_id]
-        
         # Verify admin
         if callback.from_user.id != session['admin_id']:
             await callback.answer("Only the admin who initiated this can confirm.", show_alert=True)
             return
         
-        if action == "yes":
+        if callback_data.confirm:
             await callback.answer("Starting broadcast...")
             await start_broadcast(callback, session)
         else:
@@ -258,104 +290,126 @@ async def handle_broadcast_callback(callback: types.CallbackQuery):
             await callback.message.edit_text("Broadcast cancelled.")
         
         # Clean up session
-        del broadcast_sessions[session_id]
+        broadcast_sessions.delete(session_id)
         
     except Exception as e:
         await callback.answer(f"Error: {str(e)}", show_alert=True)
         logger.error(f"Broadcast callback error: {e}")
 
+def build_broadcast_payload(reply_message, text: str) -> dict:
+    """Serializable announcement stored with the session and the broadcast"""
+    if reply_message and (reply_message.photo or reply_message.video or reply_message.document):
+        caption = f"<b>Announcement</b>\n\n{html.escape(reply_message.caption or '')}"
+        if reply_message.photo:
+            return {"type": "photo", "file_id": reply_message.photo[-1].file_id, "text": caption}
+        if reply_message.video:
+            return {"type": "video", "file_id": reply_message.video.file_id, "text": caption}
+        return {"type": "document", "file_id": reply_message.document.file_id, "text": caption}
+    
+    # Text message
+    return {"type": "text", "file_id": None, "text": f"<b>Announcement</b>\n\n{html.escape(text)}"}
+
+def format_broadcast_summary(broadcast: dict, broadcaster=None) -> str:
+    """Format the final status of a broadcast run"""
+    sent_count = broadcast["sent"]
+    blocked_count = broadcast["blocked"]
+    failed_count = broadcast["failed"]
+    total_attempts = sent_count + blocked_count + failed_count
+    success_rate = (sent_count / total_attempts * 100) if total_attempts > 0 else 0
+    
+    titles = {
+        "completed": "Broadcast Completed",
+        "paused": "Broadcast Paused",
+        "cancelled": "Broadcast Cancelled",
+        "running": "Broadcast Running"
+    }
+    summary = (
+        f"<b>{titles.get(broadcast['status'], 'Broadcast')}</b>\n\n"
+        f"Successfully sent: {sent_count:,}\n"
+        f"Blocked/Inactive: {blocked_count:,}\n"
+        f"Failed: {failed_count:,}\n"
+        f"Success rate: {success_rate:.1f}%\n"
+    )
+    if broadcaster:
+        summary += (
+            f"\nDuration: {broadcaster.elapsed:.1f}s ({broadcaster.throughput:.1f} msg/s)\n"
+            f"Flood waits: {broadcaster.flood_waits:,}\n"
+            f"Unreachable users pruned: {broadcaster.pruned:,}\n"
+        )
+    summary += f"\nBroadcast ID: <code>{broadcast['_id']}</code>"
+    if broadcast["status"] == "paused":
+        summary += f"\nResume with <code>/broadcasts resume {broadcast['_id']}</code>"
+    return summary
+
 async def start_broadcast(callback: types.CallbackQuery, session: dict):
     """Start the broadcast process"""
     try:
         await callback.message.edit_text("Starting broadcast...")
         
-        users_cursor = db.users.find({}, {"user_id": 1})
-        sent_count = 0
-        failed_count = 0
-        blocked_count = 0
-        
-        async for user in users_cursor:
-            try:
-                user_id = user["user_id"]
-                
-                if session['is_reply'] and session['reply_message']:
-                    # Forward the original message
-                    if session['reply_message'].photo:
-                        await callback.bot.send_photo(
-                            chat_id=user_id,
-                            photo=session['reply_message'].photo[-1].file_id,
-                            caption=f"<b>Announcement</b>\n\n{html.escape(session['reply_message'].caption or '')}",
-                            parse_mode=ParseMode.HTML
-                        )
-                    elif session['reply_message'].video:
-                        await callback.bot.send_video(
-                            chat_id=user_id,
-                            video=session['reply_message'].video.file_id,
-                            caption=f"<b>Announcement</b>\n\n{html.escape(session['reply_message'].caption or '')}",
-                            parse_mode=ParseMode.HTML
-                        )
-                    elif session['reply_message'].document:
-                        await callback.bot.send_document(
-                            chat_id=user_id,
-                            document=session['reply_message'].document.file_id,
-                            caption=f"<b>Announcement</b>\n\n{html.escape(session['reply_message'].caption or '')}",
-                            parse_mode=ParseMode.HTML
-                        )
-                    else:
-                        await callback.bot.send_message(
-                            chat_id=user_id,
-                            text=f"<b>Announcement</b>\n\n{html.escape(session['message'])}",
-                            parse_mode=ParseMode.HTML
-                        )
-                else:
-                    # Send text message
-                    await callback.bot.send_message(
-                        chat_id=user_id,
-                        text=f"<b>Announcement</b>\n\n{html.escape(session['message'])}",
-                        parse_mode=ParseMode.HTML
-                    )
-                
-                sent_count += 1
-                
-                # Rate limiting and progress update
-                if sent_count % 20 == 0:
-                    await asyncio.sleep(1)
-                    await callback.message.edit_text(
-                        f"Broadcasting... Sent: {sent_count:,}"
-                    )
-                
-            except Exception as e:
-                error_str = str(e).lower()
-                if "bot was blocked" in error_str or "user is deactivated" in error_str:
-                    blocked_count += 1
-                else:
-                    failed_count += 1
-                    logger.warning(f"Broadcast failed to {user['user_id']}: {e}")
-        
-        # Final status
-        total_attempts = sent_count + failed_count + blocked_count
-        success_rate = (sent_count / total_attempts * 100) if total_attempts > 0 else 0
-        
-        await callback.message.edit_text(
-            f"<b>Broadcast Completed</b>\n\n"
-            f"Successfully sent: {sent_count:,}\n"
-            f"Blocked/Inactive: {blocked_count:,}\n"
-            f"Failed: {failed_count:,}\n"
-            f"Success rate: {success_rate:.1f}%",
-            parse_mode=ParseMode.HTML
-        )
-        
-        log_user_action(
-            session['admin_id'], 
-            "BROADCAST_SENT", 
-            f"Sent: {sent_count}, Blocked: {blocked_count}, Failed: {failed_count}"
+        # Stored with a user_id watermark so it resumes after a restart
+        broadcast_id = await broadcast_manager.create(
+            session['admin_id'],
+            session['payload'],
+            callback.message.chat.id,
+            callback.message.message_id,
+            segment=session['segment']
         )
+        log_user_action(session['admin_id'], "BROADCAST_STARTED", f"ID: {broadcast_id}")
         
     except Exception as e:
         error_msg = html.escape(str(e))
         await callback.message.edit_text(f"Broadcast failed: {error_msg}")
         logger.error(f"Broadcast failed: {e}")
 
+@router.message(Command("broadcasts"))
+async def cmd_broadcasts(message: types.Message):
+    """List broadcasts or pause, resume or cancel one by id"""
+    if not Config.is_admin(message.from_user.id):
+        await message.reply("This command is only available for administrators.")
+        return
+    
+    args = message.text.split()[1:]
+    actions = {
+        "pause": broadcast_manager.pause,
+        "resume": broadcast_manager.resume,
+        "cancel": broadcast_manager.cancel
+    }
+    
+    if args:
+        if len(args) != 2 or args[0] not in actions:
+            await message.reply(
+                "<b>Usage:</b>\n"
+                "<code>/broadcasts</code> - List recent broadcasts\n"
+                "<code>/broadcasts pause ID</code>\n"
+                "<code>/broadcasts resume ID</code>\n"
+                "<code>/broadcasts cancel ID</code>",
+                parse_mode=ParseMode.HTML
+            )
+            return
+        
+        action, broadcast_id = args
+        if await actions[action](broadcast_id):
+            await message.reply(f"Broadcast <code>{html.escape(broadcast_id)}</code>: {action} requested.", parse_mode=ParseMode.HTML)
+            log_user_action(message.from_user.id, f"BROADCAST_{action.upper()}", f"ID: {broadcast_id}")
+        else:
+            await message.reply(f"Can't {action} broadcast <code>{html.escape(broadcast_id)}</code> in its current state.", parse_mode=ParseMode.HTML)
+        return
+    
+    broadcasts = await broadcast_manager.get_recent()
+    if not broadcasts:
+        await message.reply("No broadcasts yet.")
+        return
+    
+    response = "<b>Recent Broadcasts</b>\n\n"
+    for broadcast in broadcasts:
+        response += (
+            f"<code>{broadcast['_id']}</code> - <b>{broadcast['status']}</b>\n"
+            f"   {describe_segment(broadcast.get('segment') or {})}\n"
+            f"   {broadcast['created_at'].strftime('%Y-%m-%d %H:%M')} | "
+            f"Sent: {broadcast['sent']:,} | Blocked: {broadcast['blocked']:,} | Failed: {broadcast['failed']:,}\n\n"
+        )
+    await message.reply(response, parse_mode=ParseMode.HTML)
+
 @router.message(Command("users"))
 async def cmd_users(message: types.Message):
     """User management commands"""
@@ -510,6 +564,11 @@ async def cmd_system(message: types.Message):
         max_channels = html.escape(str(getattr(Config, 'MAX_CHANNELS_PER_USER', 'Unknown')))
         backup_enabled = getattr(Config, 'ENABLE_BACKUP', False)
         analytics_enabled = getattr(Config, 'ENABLE_ANALYTICS', False)
+        limiter = rate_limiter.get_metrics()
+        circuits = channel_breaker.get_metrics()
+        sessions = get_session_metrics()
+        updates = update_serializer.get_metrics()
+        throttle = inbound_throttle.get_metrics()
         
         system_info = (
             f"<b>System Information</b>\n\n"
@@ -526,7 +585,31 @@ async def cmd_system(message: types.Message):
             f"• Log Level: {log_level}\n"
             f"• Max Channels/User: {max_channels}\n"
             f"• Backup Enabled: {'' if backup_enabled else ''}\n"
-            f"• Analytics Enabled: {'' if analytics_enabled else ''}"
+            f"• Analytics Enabled: {'' if analytics_enabled else ''}\n\n"
+            f"<b>API Rate Limiter:</b>\n"
+            f"• Global bucket: {limiter['global_fill'] * 100:.0f}% full\n"
+            f"• Global waits: {limiter['global_waits']:,} ({limiter['global_wait_seconds']:.1f}s)\n"
+            f"• Chats tracked: {limiter['tracked_chats']:,} ({limiter['throttled_chats']:,} throttled)\n"
+            f"• Chat waits: {limiter['chat_waits']:,} ({limiter['chat_wait_seconds']:.1f}s)\n"
+            f"• Flood waits: {limiter['flood_waits']:,}\n\n"
+            f"<b>Channel Circuits:</b>\n"
+            f"• Unavailable channels: {circuits['open_circuits']:,}\n"
+            f"• Skipped sends: {circuits['skipped_sends']:,}\n\n"
+            f"<b>Update Queue:</b>\n"
+            f"• Active users: {updates['active_users']:,} ({updates['queued_updates']:,} queued, max depth {updates['max_depth']:,})\n"
+            f"• Waited: {updates['waited']:,} of {updates['processed']:,} "
+            f"(avg {updates['avg_wait'] * 1000:.0f} ms, max {updates['max_wait'] * 1000:.0f} ms)\n\n"
+            f"<b>Inbound Throttle:</b>\n"
+            f"• Limit: {throttle['limit']} updates / {throttle['window']}s per user\n"
+            f"• Users tracked: {throttle['tracked_users']:,} / {throttle['max_users']:,}\n"
+            f"• Rejected: {throttle['rejected']:,} of {throttle['allowed'] + throttle['rejected']:,} "
+            f"({throttle['throttled_windows']:,} throttled windows)\n\n"
+            f"<b>Sessions:</b>\n"
+        )
+        system_info += "\n".join(
+            f"• {namespace}: {metrics['size']:,} / {metrics['max_entries']:,} "
+            f"(evicted {metrics['evictions']:,}, expired {metrics['expirations']:,})"
+            for namespace, metrics in sessions.items()
         )
         
         await message.reply(system_info, parse_mode=ParseMode.HTML)
@@ -539,14 +622,142 @@ async def cmd_system(message: types.Message):
         await message.reply(f"System info error: {error_msg}")
         logger.error(f"System info error: {e}")
 
-# Clean up expired broadcast sessions periodically
-async def cleanup_broadcast_sessions():
-    """Clean up expired broadcast sessions"""
-    current_time = datetime.now()
-    expired_sessions = [
-        session_id for session_id, session in broadcast_sessions.items()
-        if (current_time - session['created_at']).seconds > 300  # 5 minutes
-    ]
+@router.message(Command("latency"))
+async def cmd_latency(message: types.Message):
+    """Show per-handler latency percentiles"""
+    if not Config.is_admin(message.from_user.id):
+        await message.reply("This command is only available for administrators.")
+        return
     
-    for session_id in expired_sessions:
-        del broadcast_sessions[session_id]
+    try:
+        metrics = handler_metrics.get_metrics()
+        if not metrics:
+            await message.reply("No updates handled yet.")
+            return
+        
+        def ms(seconds: float) -> str:
+            return f"{seconds * 1000:.0f}"
+        
+        # Busiest handlers first, within Telegram's message length
+        lines = [
+            "<b>Handler Latency</b> (ms, p50/p95/p99)\n"
+        ]
+        for entry in metrics[:20]:
+            latency, telegram, database = entry["latency"], entry["telegram"], entry["db"]
+            lines.append(
+                f"• <code>{html.escape(entry['handler'])}</code> "
+                f"({entry['update_type']}, {entry['outcome']}) ×{entry['count']:,}\n"
+                f"  {ms(latency['p50'])}/{ms(latency['p95'])}/{ms(latency['p99'])}, "
+                f"max {ms(latency['max'])} · API p95 {ms(telegram['p95'])} · DB p95 {ms(database['p95'])}"
+            )
+        if len(metrics) > 20:
+            lines.append(f"\n… and {len(metrics) - 20} more at <code>/metrics/handlers</code>")
+        
+        await message.reply("\n".join(lines), parse_mode=ParseMode.HTML)
+        log_user_action(message.from_user.id, "LATENCY_ACCESS")
+        
+    except Exception as e:
+        error_msg = html.escape(str(e))
+        await message.reply(f"Latency error: {error_msg}")
+        logger.error(f"Latency error: {e}")
+
+# Room for the header and <pre> tags within Telegram's 4096 characters
+LOG_PAGE_CHARS = 3500
+
+def paginate_log_lines(lines: list) -> list:
+    """Escaped pages of log lines, newest page first"""
+    pages = []
+    page, size = [], 0
+    for line in reversed(lines):
+        # Escaping can grow a line up to six times, so cut the escaped text
+        line = html.escape(line)
+        if len(line) > LOG_PAGE_CHARS // 2:
+            line = line[:LOG_PAGE_CHARS // 2]
+            # Drop an entity the cut split in two, e.g. a trailing "&am"
+            entity = line.rfind("&")
+            if entity != -1 and ";" not in line[entity:]:
+                line = line[:entity]
+        if page and size + len(line) + 1 > LOG_PAGE_CHARS:
+            pages.append("\n".join(reversed(page)))
+            page, size = [], 0
+        page.append(line)
+        size += len(line) + 1
+    if page:
+        pages.append("\n".join(reversed(page)))
+    return pages
+
+def render_log_page(search: dict, page: int):
+    """Text and Older/Newer keyboard for one page of a search"""
+    pages = search["pages"]
+    title = f"matching <code>{html.escape(search['pattern'])}</code>" if search["pattern"] else "in the log"
+    text = (
+        f"<b>Last {search['count']:,} lines {title}</b> "
+        f"(page {page + 1}/{len(pages)}, {search['files']} file(s) read)\n"
+        f"<pre>{pages[page]}</pre>"
+    )
+    keyboard = InlineKeyboardBuilder()
+    if page + 1 < len(pages):
+        keyboard.add(types.InlineKeyboardButton(
+            text="« Older", callback_data=LogsPage(page=page + 1, search_id=search["id"]).pack()))
+    if page > 0:
+        keyboard.add(types.InlineKeyboardButton(
+            text="Newer »", callback_data=LogsPage(page=page - 1, search_id=search["id"]).pack()))
+    return text, keyboard.as_markup()
+
+@router.message(Command("logs"))
+async def cmd_logs(message: types.Message):
+    """Show the last log lines, optionally filtered: /logs [n] [pattern]"""
+    if not Config.is_admin(message.from_user.id):
+        await message.reply("This command is only available for administrators.")
+        return
+    
+    try:
+        args = message.text.split(maxsplit=2)[1:]
+        count = 50
+        if args and args[0].isdigit():
+            count = int(args.pop(0))
+        pattern = " ".join(args).strip()
+        
+        # Block reads and decompression stay off the event loop
+        lines, files = await asyncio.to_thread(search_logs, count, pattern)
+        if not lines:
+            await message.reply("No matching log lines." if pattern else "The log is empty.")
+            return
+        
+        search = {
+            "id": uuid.uuid4().hex,
+            "pattern": pattern,
+            "count": len(lines),
+            "files": files,
+            "pages": paginate_log_lines(lines)
+        }
+        log_searches.set(search["id"], search)
+        
+        text, keyboard = render_log_page(search, 0)
+        await message.reply(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+        log_user_action(message.from_user.id, "LOGS_ACCESS")
+        
+    except Exception as e:
+        error_msg = html.escape(str(e))
+        await message.reply(f"Logs error: {error_msg}")
+        logger.error(f"Logs error: {e}")
+
+@callback_router.data(LogsPage)
+async def handle_logs_page(callback: types.CallbackQuery, callback_data: LogsPage):
+    """Page through a stored /logs search"""
+    if not Config.is_admin(callback.from_user.id):
+        await callback.answer("This is only available for administrators.", show_alert=True)
+        return
+    
+    search = log_searches.get(callback_data.search_id)
+    if search is None or not 0 <= callback_data.page < len(search["pages"]):
+        await callback.answer("This log view has expired. Run /logs again.", show_alert=True)
+        return
+    
+    try:
+        text, keyboard = render_log_page(search, callback_data.page)
+        await callback.message.edit_text(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+        await callback.answer()
+    except Exception as e:
+        await callback.answer(f"Error: {str(e)}", show_alert=True)
+        logger.error(f"Logs page error: {e}")
@@ -6,11 +6,13 @@ import html
 from aiogram import types
 from aiogram.enums import ParseMode
 
-from constants import router
-from utils.data_store import get_user_data, set_user_data
+from utils.data_store import get_user_data, set_user_data, user_post_data
+from utils.post_draft import Button
 from utils.keyboards import get_back_to_post_menu_keyboard
+from utils.state_routing import state_router
+from utils.menu_routing import menu_router
 
-@router.message(lambda message: message.text == "Add New Button")
+@menu_router.button("Add New Button")
 async def cmd_add_new_button(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -30,7 +32,7 @@ async def cmd_add_new_button(message: types.Message):
         parse_mode=ParseMode.HTML
     )
 
-@router.message(lambda message: message.text == "Send Message Format")
+@menu_router.button("Send Message Format")
 async def cmd_send_message_format(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -56,11 +58,11 @@ async def cmd_send_message_format(message: types.Message):
         parse_mode=ParseMode.HTML
     )
 
-@router.message(lambda message: message.text == "Clear Buttons")
+@menu_router.button("Clear Buttons")
 async def cmd_clear_buttons(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if user_data:
-        user_data["buttons"] = []
+        user_data["buttons"] = ()
         set_user_data(message.from_user.id, user_data)
         await message.answer("All buttons cleared!")
         
@@ -68,11 +70,7 @@ async def cmd_clear_buttons(message: types.Message):
     await cmd_add_buttons(message)
 
 # Handler for processing button text input
-@router.message(lambda message: 
-    get_user_data(message.from_user.id).get("state") == "adding_button_text" and
-    message.text and
-    message.text not in ["Back to Post Menu"]
-)
+@state_router.message(user_post_data, "adding_button_text", lambda message: bool(message.text))
 async def process_button_text_input(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     user_data["temp_button_text"] = message.text
@@ -90,11 +88,7 @@ async def process_button_text_input(message: types.Message):
     )
 
 # Handler for processing button URL input
-@router.message(lambda message: 
-    get_user_data(message.from_user.id).get("state") == "adding_button_url" and
-    message.text and
-    message.text not in ["Back to Post Menu"]
-)
+@state_router.message(user_post_data, "adding_button_url", lambda message: bool(message.text))
 async def process_button_url_input(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     url = message.text.strip()
@@ -121,10 +115,7 @@ async def process_button_url_input(message: types.Message):
         return
     
     button_text = user_data["temp_button_text"]
-    user_data["buttons"].append({
-        "text": button_text,
-        "url": url
-    })
+    user_data["buttons"] += (Button(button_text, url),)
     
     # Clean up temp data
     del user_data["temp_button_text"]
@@ -146,11 +137,7 @@ async def process_button_url_input(message: types.Message):
     await show_post_menu(message)
 
 # Handler for processing multiple buttons format
-@router.message(lambda message: 
-    get_user_data(message.from_user.id).get("state") == "adding_multiple_buttons" and
-    message.text and
-    message.text not in ["Back to Post Menu"]
-)
+@state_router.message(user_post_data, "adding_multiple_buttons", lambda message: bool(message.text))
 async def process_multiple_buttons_input(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     text = message.text.strip()
@@ -181,10 +168,7 @@ async def process_multiple_buttons_input(message: types.Message):
                     r'(?:/?|[/?]\S+)$', re.IGNORECASE)
                 
                 if url_pattern.match(url):
-                    parsed_buttons.append({
-                        "text": button_text,
-                        "url": url
-                    })
+                    parsed_buttons.append(Button(button_text, url))
                 else:
                     safe_text = html.escape(button_text)
                     await message.answer(
@@ -206,7 +190,7 @@ async def process_multiple_buttons_input(message: types.Message):
         
         if parsed_buttons:
             # Add all parsed buttons to user data
-            user_data["buttons"].extend(parsed_buttons)
+            user_data["buttons"] += tuple(parsed_buttons)
             user_data["state"] = "main_post_menu"
             set_user_data(message.from_user.id, user_data)
             
@@ -6,9 +6,19 @@ from aiogram import types
 from aiogram.enums import ParseMode
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-from constants import router
 from db import db
 from utils.data_store import get_user_data, set_user_data
+from utils.publish_queue import publish_queue
+from utils.scheduler import post_scheduler
+from utils.idempotency import publish_dedupe, publish_key
+from utils.circuit_breaker import CHANNEL_UNAVAILABLE
+from utils.callbacks import ConfirmMultiSelect, PublishAll, SelectChannel, ToggleChannel
+from utils.callback_routing import callback_router
+
+
+def unavailable_marker(channel: dict) -> str:
+    """Suffix flagging channels the bot can no longer post to"""
+    return " (unavailable)" if channel.get("status") == CHANNEL_UNAVAILABLE else ""
 
 
 async def show_channel_selection(message: types.Message, action="publish"):
@@ -31,6 +41,9 @@ async def show_channel_selection(message: types.Message, action="publish"):
             await publish_to_channels(message, [0])
         return
     
+    # Buttons carry the draft's id, so a second tap is recognised after the draft is gone
+    draft_id = get_user_data(message.from_user.id).get("draft_id", "")
+    
     # Create keyboard for channel selection
     keyboard = []
     
@@ -39,8 +52,8 @@ async def show_channel_selection(message: types.Message, action="publish"):
         title = channel.get("title", channel.get("username", "Unknown"))
         keyboard.append([
             InlineKeyboardButton(
-                text=f" {title}",
-                callback_data=f"select_channel_{i}"
+                text=f" {title}{unavailable_marker(channel)}",
+                callback_data=SelectChannel(index=i, draft_id=draft_id).pack()
             )
         ])
     
@@ -55,7 +68,7 @@ async def show_channel_selection(message: types.Message, action="publish"):
     keyboard.append([
         InlineKeyboardButton(
             text="All Channels",
-            callback_data="select_all_channels"
+            callback_data=PublishAll(draft_id=draft_id).pack()
         )
     ])
     
@@ -72,7 +85,7 @@ async def show_channel_selection(message: types.Message, action="publish"):
     for i, channel in enumerate(connected_channels, 1):
         title = html.escape(channel.get("title", channel.get("username", "Unknown")))
         username = html.escape(channel.get("username", ""))
-        response += f"{i}. <b>{title}</b>\n"
+        response += f"{i}. <b>{title}</b>{unavailable_marker(channel)}\n"
         if username:
             response += f"    {username}\n"
     
@@ -83,14 +96,15 @@ async def show_channel_selection(message: types.Message, action="publish"):
     )
 
 
-@router.callback_query(lambda query: query.data.startswith("select_channel_"))
-async def handle_single_channel_select(query: types.CallbackQuery):
+@callback_router.data(SelectChannel)
+async def handle_single_channel_select(query: types.CallbackQuery, callback_data: SelectChannel):
     """Handle single channel selection"""
     await query.answer()
     
     try:
-        channel_index = int(query.data.split("_")[-1])
-        await publish_to_channels(query.message, [channel_index], user_id=query.from_user.id)
+        await publish_to_channels(
+            query.message, [callback_data.index], user_id=query.from_user.id, draft_id=callback_data.draft_id
+        )
     except (ValueError, IndexError):
         try:
             await query.message.edit_text(
@@ -116,8 +130,8 @@ async def handle_single_channel_select(query: types.CallbackQuery):
             )
 
 
-@router.callback_query(lambda query: query.data == "select_all_channels")
-async def handle_all_channels_select(query: types.CallbackQuery):
+@callback_router.data(PublishAll)
+async def handle_all_channels_select(query: types.CallbackQuery, callback_data: PublishAll):
     """Handle all channels selection"""
     await query.answer()
     
@@ -140,7 +154,9 @@ async def handle_all_channels_select(query: types.CallbackQuery):
         
         # Select all channels
         channel_indices = list(range(len(connected_channels)))
-        await publish_to_channels(query.message, channel_indices, user_id=query.from_user.id)
+        await publish_to_channels(
+            query.message, channel_indices, user_id=query.from_user.id, draft_id=callback_data.draft_id
+        )
     
     except Exception as e:
         # Handle any errors during the process
@@ -156,7 +172,7 @@ async def handle_all_channels_select(query: types.CallbackQuery):
             )
 
 
-@router.callback_query(lambda query: query.data == "multi_select_start")
+@callback_router.exact("multi_select_start")
 async def handle_multi_select_start(query: types.CallbackQuery):
     """Start multi-select mode"""
     await query.answer()
@@ -176,10 +192,10 @@ async def handle_multi_select_start(query: types.CallbackQuery):
     user_data["selected_channels"] = []
     set_user_data(query.from_user.id, user_data)
     
-    await show_multi_select_interface(query.message, connected_channels, [])
+    await show_multi_select_interface(query.message, connected_channels, [], user_data.get("draft_id", ""))
 
 
-async def show_multi_select_interface(message: types.Message, channels, selected_indices):
+async def show_multi_select_interface(message: types.Message, channels, selected_indices, draft_id: str):
     """Show multi-select interface"""
     keyboard = []
     
@@ -190,8 +206,8 @@ async def show_multi_select_interface(message: types.Message, channels, selected
         emoji = "" if is_selected else ""
         keyboard.append([
             InlineKeyboardButton(
-                text=f"{emoji} {title}",
-                callback_data=f"toggle_channel_{i}"
+                text=f"{emoji} {title}{unavailable_marker(channel)}",
+                callback_data=ToggleChannel(index=i).pack()
             )
         ])
     
@@ -201,7 +217,7 @@ async def show_multi_select_interface(message: types.Message, channels, selected
         action_row.append(
             InlineKeyboardButton(
                 text=f" Post to {len(selected_indices)} channel(s)",
-                callback_data="confirm_multi_select"
+                callback_data=ConfirmMultiSelect(draft_id=draft_id).pack()
             )
         )
     
@@ -222,7 +238,7 @@ async def show_multi_select_interface(message: types.Message, channels, selected
         username = html.escape(channel.get("username", ""))
         is_selected = i in selected_indices
         emoji = "" if is_selected else ""
-        response += f"{emoji} <b>{title}</b>\n"
+        response += f"{emoji} <b>{title}</b>{unavailable_marker(channel)}\n"
         if username:
             response += f"    {username}\n"
     
@@ -236,13 +252,13 @@ async def show_multi_select_interface(message: types.Message, channels, selected
     )
 
 
-@router.callback_query(lambda query: query.data.startswith("toggle_channel_"))
-async def handle_toggle_channel(query: types.CallbackQuery):
+@callback_router.data(ToggleChannel)
+async def handle_toggle_channel(query: types.CallbackQuery, callback_data: ToggleChannel):
     """Handle toggling channel selection in multi-select mode"""
     await query.answer()
     
     try:
-        channel_index = int(query.data.split("_")[-1])
+        channel_index = callback_data.index
         
         user_data = get_user_data(query.from_user.id)
         selected_channels = user_data.get("selected_channels", [])
@@ -259,28 +275,33 @@ async def handle_toggle_channel(query: types.CallbackQuery):
         user_info = await db.users.find_one({"user_id": query.from_user.id})
         connected_channels = user_info.get("connected_channels", []) if user_info else []
         
-        await show_multi_select_interface(query.message, connected_channels, selected_channels)
+        await show_multi_select_interface(
+            query.message, connected_channels, selected_channels, user_data.get("draft_id", "")
+        )
         
     except (ValueError, IndexError):
         await query.answer(" Error selecting channel", show_alert=True)
 
 
-@router.callback_query(lambda query: query.data == "confirm_multi_select")
-async def handle_confirm_multi_select(query: types.CallbackQuery):
+@callback_router.data(ConfirmMultiSelect)
+async def handle_confirm_multi_select(query: types.CallbackQuery, callback_data: ConfirmMultiSelect):
     """Confirm multi-select and publish"""
     await query.answer()
     
     user_data = get_user_data(query.from_user.id)
     selected_channels = user_data.get("selected_channels", [])
     
-    if not selected_channels:
+    # Once the draft is gone publish_to_channels shows what became of it
+    if not selected_channels and user_data.get("draft_id") == callback_data.draft_id:
         await query.answer(" No channels selected", show_alert=True)
         return
     
-    await publish_to_channels(query.message, selected_channels, user_id=query.from_user.id)
+    await publish_to_channels(
+        query.message, selected_channels, user_id=query.from_user.id, draft_id=callback_data.draft_id
+    )
 
 
-@router.callback_query(lambda query: query.data == "cancel_channel_selection")
+@callback_router.exact("cancel_channel_selection")
 async def handle_cancel_selection(query: types.CallbackQuery):
     """Cancel channel selection"""
     await query.answer()
@@ -290,15 +311,67 @@ async def handle_cancel_selection(query: types.CallbackQuery):
         parse_mode=ParseMode.HTML
     )
     
+    # A cancelled selection also drops a pending schedule time
+    user_data = get_user_data(query.from_user.id)
+    user_data.pop("schedule_at", None)
+    set_user_data(query.from_user.id, user_data)
+    
     # Return to post menu
     from .post_menu import show_post_menu
     await show_post_menu(query.message)
 
 
-async def publish_to_channels(message: types.Message, channel_indices, user_id=None):
-    """Publish post to selected channels"""
-    from .preview_publish import publish_post_to_channel
+def format_publish_progress(total, succeeded, failed, post_id, channel_name=None):
+    """Format the live status text of a running publish"""
+    if channel_name:
+        progress_text = f"<b>Publishing to: {html.escape(channel_name)}</b>\n\n"
+    else:
+        progress_text = f"<b>Publishing to {total} channels</b>\n\n"
+    progress_text += f"Sent: {succeeded}/{total}"
+    if failed:
+        progress_text += f" | Failed: {failed}"
+    progress_text += f"\n\nJob ID: <code>{post_id}</code>"
+    return progress_text
+
+
+def format_publish_summary(total, success_count, failed_channels, channel_name=None):
+    """Build the publish result text from per-channel outcomes"""
+    if success_count == total:
+        # All successful
+        if total == 1:
+            channel_name = html.escape(channel_name or 'the channel')
+            result_text = "<b>Post Published Successfully!</b>\n\n"
+            result_text += f"Your post has been sent to <b>{channel_name}</b>"
+        else:
+            result_text = f"<b>Post Published Successfully!</b>\n\n"
+            result_text += f"Your post has been sent to <b>{total}</b> channels"
+    elif success_count > 0:
+        # Partial success
+        result_text = f"<b>Partially Published</b>\n\n"
+        result_text += f"Successfully posted to <b>{success_count}</b> out of <b>{total}</b> channels\n\n"
+        result_text += "<b>Failed channels:</b>\n"
+        for failed in failed_channels:
+            channel_name = html.escape(failed["channel"].get("title", failed["channel"].get("username", "Unknown")))
+            error_msg = html.escape(failed['error'][:50])
+            result_text += f"• {channel_name}: {error_msg}...\n"
+    else:
+        # All failed
+        result_text = "<b>Publishing Failed</b>\n\n"
+        result_text += "Failed to publish to any channels:\n"
+        for failed in failed_channels:
+            channel_name = html.escape(failed["channel"].get("title", failed["channel"].get("username", "Unknown")))
+            error_msg = html.escape(failed['error'][:50])
+            result_text += f"• {channel_name}: {error_msg}...\n"
+    
+    return result_text
+
+
+async def publish_to_channels(message: types.Message, channel_indices, user_id=None, draft_id=None):
+    """Queue the post for publishing to the selected channels
     
+    ``draft_id`` is the draft the tapped button was shown for; without it
+    the current draft is published.
+    """
     # Use provided user_id or fall back to message.from_user.id
     actual_user_id = user_id if user_id is not None else message.from_user.id
     
@@ -307,112 +380,147 @@ async def publish_to_channels(message: types.Message, channel_indices, user_id=N
     
     user_data = get_user_data(actual_user_id)
     
-    # Debug logging
-    print(f"DEBUG CHANNEL_SELECTION: User {actual_user_id} publish_to_channels")
-    print(f"DEBUG CHANNEL_SELECTION: User data exists: {user_data is not None}")
-    if user_data:
-        print(f"DEBUG CHANNEL_SELECTION: Has text: {bool(user_data.get('text'))}")
-        print(f"DEBUG CHANNEL_SELECTION: Has media: {bool(user_data.get('media'))}")
-        print(f"DEBUG CHANNEL_SELECTION: Text content: '{user_data.get('text', '')}'")
-        print(f"DEBUG CHANNEL_SELECTION: Media count: {len(user_data.get('media', []))}")
-        print(f"DEBUG CHANNEL_SELECTION: Full user_data keys: {list(user_data.keys())}")
-    else:
-        print(f"DEBUG CHANNEL_SELECTION: user_data is None!")
+    draft_id = draft_id or user_data.get("draft_id")
+    if not draft_id:
+        # Neither a button for a draft nor a current draft: nothing to publish or dedupe
+        await message.edit_text("<b>No Content to Publish</b>\n\nPlease create a post first.", parse_mode=ParseMode.HTML)
+        return
     
-    if not user_data:
-        await message.edit_text(
-            "<b>No Content to Publish</b>\n\n"
-            "Please create a post first.",
-            parse_mode=ParseMode.HTML
-        )
+    # A double-tap or redelivered callback gets the earlier job, not a second
+    # fan-out; checked first because queueing clears the draft
+    idempotency_key = publish_key(actual_user_id, draft_id)
+    existing_job_id = await publish_dedupe.claim(idempotency_key)
+    if existing_job_id is not None:
+        await show_existing_publish(message, existing_job_id)
         return
     
     # Validate channel indices
     valid_indices = [i for i in channel_indices if 0 <= i < len(connected_channels)]
     
-    if not valid_indices:
-        await message.edit_text(
-            "<b>Invalid Channel Selection</b>",
-            parse_mode=ParseMode.HTML
-        )
+    if not user_data or user_data.get("draft_id") != draft_id:
+        if user_data:
+            # The button belongs to a draft that was published or replaced since
+            status_text = (
+                "<b>Post Changed</b>\n\n"
+                "This selection is for an earlier post. Tap <b>Publish Post</b> again."
+            )
+        else:
+            status_text = "<b>No Content to Publish</b>\n\nPlease create a post first."
+    elif not valid_indices:
+        status_text = "<b>Invalid Channel Selection</b>"
+    else:
+        status_text = None
+    if status_text:
+        await publish_dedupe.release(idempotency_key)
+        await message.edit_text(status_text, parse_mode=ParseMode.HTML)
         return
     
     selected_channels = [connected_channels[i] for i in valid_indices]
     
+    # The draft now lives in the queued jobs or the scheduled post; cleared
+    # before queueing because a publish that fails everywhere gives it back
+    from utils.data_store import clear_user_data
+    clear_user_data(actual_user_id)
+    
+    try:
+        if user_data.get("schedule_at"):
+            job_id = await schedule_for_channels(message, actual_user_id, user_data, selected_channels)
+        else:
+            job_id = await queue_for_channels(message, actual_user_id, user_data, selected_channels)
+    except Exception:
+        set_user_data(actual_user_id, user_data)
+        await publish_dedupe.release(idempotency_key)
+        raise
+    await publish_dedupe.complete(idempotency_key, job_id)
+    
+    # Return to main menu
+    from .start import show_main_menu
+    await show_main_menu(message)
+
+
+async def queue_for_channels(message: types.Message, user_id: int, user_data: dict, selected_channels: list) -> str:
+    """Queue the post for publishing now and return the publish job id"""
+    # Store one publish job per channel; workers send them and report back
+    # by editing this message once every channel has finished
+    post_id = await publish_queue.enqueue(
+        user_id,
+        user_data,
+        selected_channels,
+        message.chat.id,
+        message.message_id
+    )
+    
     # Show publishing status
     if len(selected_channels) == 1:
         channel_name = html.escape(selected_channels[0].get("title", selected_channels[0].get("username", "Unknown")))
         status_text = f"<b>Publishing to: {channel_name}</b>\n\nYour post is being sent..."
     else:
         status_text = f"<b>Publishing to {len(selected_channels)} channels</b>\n\nYour post is being sent..."
+    status_text += f"\n\nJob ID: <code>{post_id}</code>"
     
     # Try to edit the message, if that fails, send a new message
     try:
         await message.edit_text(status_text, parse_mode=ParseMode.HTML)
     except Exception as edit_error:
-        # If editing fails, send a new message
+        # The summary falls back to a new message when this one can't be edited
         await message.answer(status_text, parse_mode=ParseMode.HTML)
-        # Update message reference for result display
-        message = await message.answer("Processing...")
-        await message.delete()
     
-    # Publish to each selected channel
-    success_count = 0
-    failed_channels = []
+    return post_id
+
+
+async def schedule_for_channels(message: types.Message, user_id: int, user_data: dict, selected_channels: list) -> str:
+    """Store the post for publishing at its scheduled time and return its id"""
+    run_at = user_data["schedule_at"]
+    schedule_id = await post_scheduler.schedule(
+        user_id,
+        user_data,
+        selected_channels,
+        message.chat.id,
+        run_at
+    )
     
-    for channel in selected_channels:
-        try:
-            await publish_post_to_channel(message, channel, user_data)
-            success_count += 1
-        except Exception as e:
-            failed_channels.append({
-                "channel": channel,
-                "error": str(e)
-            })
-    
-    # Show results
-    if success_count == len(selected_channels):
-        # All successful
-        if len(selected_channels) == 1:
-            channel_name = html.escape(selected_channels[0].get('title', 'the channel'))
-            result_text = "<b>Post Published Successfully!</b>\n\n"
-            result_text += f"Your post has been sent to <b>{channel_name}</b>"
-        else:
-            result_text = f"<b>Post Published Successfully!</b>\n\n"
-            result_text += f"Your post has been sent to <b>{len(selected_channels)}</b> channels"
-    elif success_count > 0:
-        # Partial success
-        result_text = f"<b>Partially Published</b>\n\n"
-        result_text += f"Successfully posted to <b>{success_count}</b> out of <b>{len(selected_channels)}</b> channels\n\n"
-        result_text += "<b>Failed channels:</b>\n"
-        for failed in failed_channels:
-            channel_name = html.escape(failed["channel"].get("title", failed["channel"].get("username", "Unknown")))
-            error_msg = html.escape(failed['error'][:50])
-            result_text += f"• {channel_name}: {error_msg}...\n"
+    if len(selected_channels) == 1:
+        channel_name = html.escape(selected_channels[0].get("title", selected_channels[0].get("username", "Unknown")))
+        status_text = f"<b>Post Scheduled for: {channel_name}</b>\n\n"
     else:
-        # All failed
-        result_text = "<b>Publishing Failed</b>\n\n"
-        result_text += "Failed to publish to any channels:\n"
-        for failed in failed_channels:
-            channel_name = html.escape(failed["channel"].get("title", failed["channel"].get("username", "Unknown")))
-            error_msg = html.escape(failed['error'][:50])
-            result_text += f"• {channel_name}: {error_msg}...\n"
+        status_text = f"<b>Post Scheduled for {len(selected_channels)} channels</b>\n\n"
+    status_text += (
+        f"Publishing at <b>{run_at.strftime('%Y-%m-%d %H:%M')}</b> (server time).\n"
+        f"Use /scheduled to view or cancel it.\n\n"
+        f"Schedule ID: <code>{schedule_id}</code>"
+    )
     
-    # Show results with better error handling
     try:
-        await message.edit_text(result_text, parse_mode=ParseMode.HTML)
-    except Exception as edit_error:
-        # If editing fails, send a new message
-        await message.answer(result_text, parse_mode=ParseMode.HTML)
-    if success_count > 0:
-        # Clear post data after successful publish
-        from utils.data_store import clear_user_data
-        clear_user_data(actual_user_id)
-        
-        # Return to main menu
-        from .start import cmd_back
-        await cmd_back(message)
+        await message.edit_text(status_text, parse_mode=ParseMode.HTML)
+    except Exception:
+        await message.answer(status_text, parse_mode=ParseMode.HTML)
+    
+    return schedule_id
+
+
+async def show_existing_publish(message: types.Message, job_id: str):
+    """Show the state of an earlier identical publish instead of repeating it"""
+    batch = await db.publish_batches.find_one({"_id": job_id}) if job_id else None
+    
+    if batch and batch.get("completed_at"):
+        status_text = format_publish_summary(
+            batch["total"], batch["succeeded"], batch["failures"], batch.get("channel_name")
+        )
+    elif batch:
+        status_text = format_publish_progress(
+            batch["total"], batch["succeeded"], batch["failed"], job_id, batch.get("channel_name")
+        )
+    elif job_id:
+        status_text = (
+            "<b>Already Scheduled</b>\n\n"
+            "This post is already scheduled for these channels.\n\n"
+            f"Schedule ID: <code>{job_id}</code>"
+        )
     else:
-        # Return to post menu if all failed
-        from .post_menu import show_post_menu
-        await show_post_menu(message)
+        status_text = "<b>Already Publishing</b>\n\nThis post is already being sent to these channels."
+    
+    try:
+        await message.edit_text(status_text, parse_mode=ParseMode.HTML)
+    except Exception:
+        # Usually "message is not modified" because the first tap already edited it
+        pass
@@ -6,11 +6,11 @@ from aiogram import types
 from aiogram.filters import Command
 from aiogram.enums import ParseMode
 
-from constants import router
 from db import db
 from utils.keyboards import get_chat_menu_keyboard
+from utils.menu_routing import menu_router
 
-@router.message(lambda message: message.text == "Chat")
+@menu_router.button("Chat")
 async def cmd_chat(message: types.Message):
     keyboard = get_chat_menu_keyboard()
 
@@ -23,7 +23,7 @@ async def cmd_chat(message: types.Message):
         parse_mode=ParseMode.MARKDOWN
     )
 
-@router.message(lambda message: message.text == "Connect")
+@menu_router.button("Connect")
 async def cmd_connect_info(message: types.Message):
     await message.answer(
         " **Connect to Channel/Group**\n\n"
@@ -40,7 +40,7 @@ async def cmd_connect_info(message: types.Message):
         parse_mode=ParseMode.MARKDOWN
     )
 
-@router.message(lambda message: message.text == "Connected")
+@menu_router.button("Connected")
 async def cmd_connected_info(message: types.Message):
     # Redirect to the new connected command
     from .connect import cmd_connected
@@ -116,7 +116,7 @@ async def cmd_connected_info(message: types.Message):
     # Update user information with connected chat
     await db.users.update_one(
         {"user_id": message.from_user.id},
-        {"$set": {"connected_chat": chat_id}},
+        {"$set": {"connected_chat": chat_id}, "$setOnInsert": {"deliverable": True}},
         upsert=True,
     )
 
@@ -127,82 +127,3 @@ async def cmd_connected_info(message: types.Message):
         f"You can now create and publish posts to this chat!",
         parse_mode=ParseMode.MARKDOWN
     )
-
-@router.message(lambda message: message.text == "Connected")
-async def cmd_connected_from_chat(message: types.Message):
-    # Retrieve connected chat from the user's information
-    user_info = await db.users.find_one({"user_id": message.from_user.id})
-
-    if user_info:
-        connected_chat = user_info.get("connected_chat")
-
-        if connected_chat:
-            try:
-                # Get chat information
-                chat_info = await message.bot.get_chat(connected_chat)
-                chat_name = chat_info.title or chat_info.first_name or str(connected_chat)
-                
-                # Create keyboard with disconnect option
-                from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-                keyboard = ReplyKeyboardMarkup(
-                    keyboard=[
-                        [KeyboardButton(text="Disconnect")],
-                        [KeyboardButton(text="Back")],
-                    ],
-                    resize_keyboard=True,
-                )
-
-                await message.reply(
-                    f" **Current Connection**\n\n"
-                    f"**Connected to:** {chat_name}\n"
-                    f"**Chat ID:** `{connected_chat}`\n"
-                    f"**Type:** {chat_info.type}\n\n"
-                    f"You can disconnect or go back to the main menu.",
-                    reply_markup=keyboard,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            except Exception as e:
-                await message.reply(
-                    f" **Connection Status**\n\n"
-                    f"**Connected to:** {connected_chat}\n"
-                    f"**Note:** Cannot fetch chat details\n\n"
-                    f"Error: {str(e)}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-        else:
-            await message.reply(
-                " **No Active Connection**\n\n"
-                "You are not currently connected to any chat.\n"
-                "Use **Connect** to connect to a channel or group.",
-                parse_mode=ParseMode.MARKDOWN
-            )
-    else:
-        await message.reply(
-            " **No Active Connection**\n\n"
-            "You are not currently connected to any chat.\n"
-            "Use **Connect** to connect to a channel or group.",
-            parse_mode=ParseMode.MARKDOWN
-        )
-
-@router.message(lambda message: message.text == "Disconnect")
-async def cmd_disconnect(message: types.Message):
-    # Update user information to disconnect from the chat
-    await db.users.update_one(
-        {"user_id": message.from_user.id},
-        {"$unset": {"connected_chat": ""}},
-    )
-
-    # Create a keyboard with the "Back" button
-    from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="Back")]],
-        resize_keyboard=True,
-    )
-
-    await message.reply(
-        " **Successfully Disconnected**\n\n"
-        "You have been disconnected from the chat.\n"
-        "You can connect to a new chat anytime.",
-        reply_markup=keyboard,
-        parse_mode=ParseMode.MARKDOWN
-    )
@@ -12,6 +12,9 @@ from constants import router
 from db import db
 from config import Config
 from utils.logger import logger, log_user_action
+from utils.circuit_breaker import CHANNEL_UNAVAILABLE
+from utils.callbacks import DisconnectChannel
+from utils.callback_routing import callback_router
 
 @router.message(Command("connect"))
 async def cmd_connect(message: types.Message):
@@ -218,6 +221,8 @@ async def cmd_connected(message: types.Message):
         chat_id = channel.get('chat_id')
         
         response += f"{i}. <b>{title}</b>\n"
+        if channel.get('status') == CHANNEL_UNAVAILABLE:
+            response += "   Unavailable - check the bot's admin rights\n"
         if username:
             response += f"   @{username}\n"
         else:
@@ -285,7 +290,7 @@ async def cmd_disconnect(message: types.Message):
         if len(title) > 30:
             title = title[:27] + "..."
         
-        callback_data = f"disconnect_{channel.get('chat_id')}"
+        callback_data = DisconnectChannel(chat_id=str(channel.get('chat_id'))).pack()
         keyboard.append([InlineKeyboardButton(text=f"❌ {title}", callback_data=callback_data)])
     
     keyboard.append([InlineKeyboardButton(text="Cancel", callback_data="cancel_manage")])
@@ -297,10 +302,10 @@ async def cmd_disconnect(message: types.Message):
         reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
     )
 
-@router.callback_query(lambda query: query.data.startswith("disconnect_"))
-async def handle_disconnect_channel(query: types.CallbackQuery):
+@callback_router.data(DisconnectChannel)
+async def handle_disconnect_channel(query: types.CallbackQuery, callback_data: DisconnectChannel):
     """Handle disconnect callback"""
-    chat_id = query.data.replace("disconnect_", "")
+    chat_id = callback_data.chat_id
     
     user = await db.users.find_one({"user_id": query.from_user.id})
     connected_channels = user.get("connected_channels", [])
@@ -335,7 +340,7 @@ async def handle_disconnect_channel(query: types.CallbackQuery):
     
     await query.answer()
 
-@router.callback_query(lambda query: query.data == "cancel_manage")
+@callback_router.exact("cancel_manage")
 async def handle_cancel_manage(query: types.CallbackQuery):
     """Cancel management action"""
     await query.message.edit_text("Action cancelled.")
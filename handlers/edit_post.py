@@ -3,6 +3,7 @@ Edit post handler for PostBot
 Allows editing existing posts in channels
 """
 from aiogram import types, F
+from aiogram.dispatcher.event.bases import SkipHandler
 from aiogram.filters import Command
 from aiogram.enums import ParseMode
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto, InputMediaVideo, InputMediaDocument, InputMediaAnimation
@@ -15,22 +16,23 @@ from constants import router
 from db import db
 from config import Config
 from utils.logger import logger, log_user_action
+from utils.session_store import SessionMap
+from utils.state_routing import state_router
+from utils.callbacks import EditChannel
+from utils.callback_routing import callback_router
 
-# Simple in-memory storage for edit states
-# In a production app, use Redis or database
-edit_sessions = {}
+# Edit states by user ID, kept in the configured session store
+edit_sessions = SessionMap("edit")
 
 def get_user_data(user_id):
-    if user_id not in edit_sessions:
-        edit_sessions[user_id] = {}
-    return edit_sessions[user_id]
+    # Runs inside router filters for every message, so never creates a session
+    return edit_sessions.get(user_id, {})
 
 def set_user_data(user_id, data):
-    edit_sessions[user_id] = data
+    edit_sessions.set(user_id, data)
 
 def clear_user_data(user_id):
-    if user_id in edit_sessions:
-        del edit_sessions[user_id]
+    edit_sessions.delete(user_id)
 
 @router.message(Command("edit"))
 async def cmd_edit_post(message: types.Message):
@@ -57,7 +59,7 @@ async def cmd_edit_post(message: types.Message):
         if len(title) > 30:
             title = title[:27] + "..."
             
-        callback_data = f"edit_channel_{channel.get('chat_id')}"
+        callback_data = EditChannel(chat_id=str(channel.get('chat_id'))).pack()
         keyboard.append([InlineKeyboardButton(text=title, callback_data=callback_data)])
     
     keyboard.append([InlineKeyboardButton(text="Cancel", callback_data="cancel_edit")])
@@ -73,17 +75,17 @@ async def cmd_edit_post(message: types.Message):
     clear_user_data(message.from_user.id)
     set_user_data(message.from_user.id, {"state": "selecting_channel"})
 
-@router.callback_query(lambda query: query.data == "cancel_edit")
+@callback_router.exact("cancel_edit")
 async def handle_cancel_edit(query: types.CallbackQuery):
     """Cancel the edit process"""
     clear_user_data(query.from_user.id)
     await query.message.edit_text("Edit cancelled.")
     await query.answer("Cancelled")
 
-@router.callback_query(lambda query: query.data.startswith("edit_channel_"))
-async def handle_channel_selection(query: types.CallbackQuery):
+@callback_router.data(EditChannel)
+async def handle_channel_selection(query: types.CallbackQuery, callback_data: EditChannel):
     """Handle channel selection for editing"""
-    chat_id = query.data.replace("edit_channel_", "")
+    chat_id = callback_data.chat_id
     
     # Verify user has access to this channel
     user = await db.users.find_one({"user_id": query.from_user.id})
@@ -120,7 +122,7 @@ async def handle_channel_selection(query: types.CallbackQuery):
     )
     await query.answer()
 
-@router.callback_query(lambda query: query.data == "back_to_channels")
+@callback_router.exact("back_to_channels")
 async def handle_back_to_channels(query: types.CallbackQuery):
     """Go back to channel selection"""
     # Re-use the cmd_edit_post logic but editing the message
@@ -132,7 +134,7 @@ async def handle_back_to_channels(query: types.CallbackQuery):
         title = channel.get('title', channel.get('username', 'Unknown'))
         if len(title) > 30:
             title = title[:27] + "..."
-        callback_data = f"edit_channel_{channel.get('chat_id')}"
+        callback_data = EditChannel(chat_id=str(channel.get('chat_id'))).pack()
         keyboard.append([InlineKeyboardButton(text=title, callback_data=callback_data)])
     
     keyboard.append([InlineKeyboardButton(text="Cancel", callback_data="cancel_edit")])
@@ -148,7 +150,7 @@ async def handle_back_to_channels(query: types.CallbackQuery):
     user_data["state"] = "selecting_channel"
     set_user_data(query.from_user.id, user_data)
 
-@router.message(lambda message: get_user_data(message.from_user.id).get("state") == "selecting_post")
+@state_router.message(edit_sessions, "selecting_post")
 async def handle_post_input(message: types.Message):
     """Handle the forwarded post or link"""
     user_data = get_user_data(message.from_user.id)
@@ -203,9 +205,10 @@ async def handle_post_input(message: types.Message):
     # Or we just start with empty/unknown content and let user overwrite
     
     # Try to find in DB first
+    # Receipts list every message of a post, so any album item matches
     db_post = await db.posts.find_one({
         "channel_id": int(chat_id) if chat_id.lstrip('-').isdigit() else chat_id,
-        "message_id": message_id
+        "message_ids": message_id
     })
     
     content = {}
@@ -281,7 +284,7 @@ async def show_post_content_and_edit_options(message, content, channel):
         reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
     )
 
-@router.callback_query(lambda query: query.data == "back_to_edit_menu")
+@callback_router.exact("back_to_edit_menu")
 async def handle_back_to_edit_menu(query: types.CallbackQuery):
     """Return to the main edit menu"""
     user_data = get_user_data(query.from_user.id)
@@ -339,7 +342,7 @@ async def handle_back_to_edit_menu(query: types.CallbackQuery):
         reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
     )
 
-@router.callback_query(lambda query: query.data == "edit_text")
+@callback_router.exact("edit_text")
 async def handle_edit_text(query: types.CallbackQuery):
     """Handle edit text option"""
     user_data = get_user_data(query.from_user.id)
@@ -362,7 +365,7 @@ async def handle_edit_text(query: types.CallbackQuery):
     )
     await query.answer()
 
-@router.callback_query(lambda query: query.data == "clear_text")
+@callback_router.exact("clear_text")
 async def handle_clear_text(query: types.CallbackQuery):
     """Clear text content"""
     user_data = get_user_data(query.from_user.id)
@@ -372,7 +375,7 @@ async def handle_clear_text(query: types.CallbackQuery):
     await query.answer("Text cleared")
     await handle_back_to_edit_menu(query)
 
-@router.callback_query(lambda query: query.data == "edit_buttons")
+@callback_router.exact("edit_buttons")
 async def handle_edit_buttons(query: types.CallbackQuery):
     """Handle edit buttons option"""
     user_data = get_user_data(query.from_user.id)
@@ -402,7 +405,7 @@ async def handle_edit_buttons(query: types.CallbackQuery):
     )
     await query.answer()
 
-@router.callback_query(lambda query: query.data == "clear_buttons")
+@callback_router.exact("clear_buttons")
 async def handle_clear_buttons(query: types.CallbackQuery):
     """Clear buttons content"""
     user_data = get_user_data(query.from_user.id)
@@ -412,7 +415,7 @@ async def handle_clear_buttons(query: types.CallbackQuery):
     await query.answer("Buttons cleared")
     await handle_back_to_edit_menu(query)
 
-@router.callback_query(lambda query: query.data == "edit_media")
+@callback_router.exact("edit_media")
 async def handle_edit_media(query: types.CallbackQuery):
     """Handle edit media option"""
     user_data = get_user_data(query.from_user.id)
@@ -435,7 +438,7 @@ async def handle_edit_media(query: types.CallbackQuery):
     )
     await query.answer()
 
-@router.callback_query(lambda query: query.data == "clear_media")
+@callback_router.exact("clear_media")
 async def handle_clear_media(query: types.CallbackQuery):
     """Clear media content"""
     user_data = get_user_data(query.from_user.id)
@@ -445,7 +448,7 @@ async def handle_clear_media(query: types.CallbackQuery):
     await query.answer("Media cleared")
     await handle_back_to_edit_menu(query)
 
-@router.callback_query(lambda query: query.data == "preview_edit")
+@callback_router.exact("preview_edit")
 async def handle_preview_edit(query: types.CallbackQuery):
     """Preview the edited post"""
     user_data = get_user_data(query.from_user.id)
@@ -536,7 +539,7 @@ async def handle_preview_edit(query: types.CallbackQuery):
             ])
         )
 
-@router.callback_query(lambda query: query.data == "save_changes")
+@callback_router.exact("save_changes")
 async def handle_save_changes(query: types.CallbackQuery):
     """Save changes to the channel"""
     user_data = get_user_data(query.from_user.id)
@@ -614,7 +617,7 @@ def create_inline_buttons_keyboard(buttons):
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 # Pin message
-@router.callback_query(lambda query: query.data == "pin_message")
+@callback_router.exact("pin_message")
 async def handle_pin_message(query: types.CallbackQuery):
     """Pin the selected message"""
     await query.answer()
@@ -676,7 +679,7 @@ async def handle_pin_message(query: types.CallbackQuery):
             )
 
 # Unpin message
-@router.callback_query(lambda query: query.data == "unpin_message")
+@callback_router.exact("unpin_message")
 async def handle_unpin_message(query: types.CallbackQuery):
     """Unpin the selected message"""
     await query.answer()
@@ -738,7 +741,7 @@ async def handle_unpin_message(query: types.CallbackQuery):
 
 
 # Delete message
-@router.callback_query(lambda query: query.data == "delete_message")
+@callback_router.exact("delete_message")
 async def handle_delete_message(query: types.CallbackQuery):
     """Delete the selected message with confirmation"""
     await query.answer()
@@ -763,7 +766,7 @@ async def handle_delete_message(query: types.CallbackQuery):
 
 
 # Confirm delete message
-@router.callback_query(lambda query: query.data == "confirm_delete_message")
+@callback_router.exact("confirm_delete_message")
 async def handle_confirm_delete_message(query: types.CallbackQuery):
     """Confirm and delete the message"""
     await query.answer()
@@ -837,7 +840,7 @@ async def handle_confirm_delete_message(query: types.CallbackQuery):
 
 
 # More options
-@router.callback_query(lambda query: query.data == "more_options")
+@callback_router.exact("more_options")
 async def handle_more_options(query: types.CallbackQuery):
     """Show more advanced options for the message"""
     await query.answer()
@@ -873,7 +876,7 @@ async def handle_more_options(query: types.CallbackQuery):
 
 
 # Copy message
-@router.callback_query(lambda query: query.data == "copy_message")
+@callback_router.exact("copy_message")
 async def handle_copy_message(query: types.CallbackQuery):
     """Copy message content to clipboard (show content for copying)"""
     await query.answer()
@@ -915,7 +918,7 @@ async def handle_copy_message(query: types.CallbackQuery):
 
 
 # Get message link
-@router.callback_query(lambda query: query.data == "get_message_link")
+@callback_router.exact("get_message_link")
 async def handle_get_message_link(query: types.CallbackQuery):
     """Generate and show the message link"""
     await query.answer()
@@ -959,7 +962,7 @@ async def handle_get_message_link(query: types.CallbackQuery):
 
 
 # Message stats
-@router.callback_query(lambda query: query.data == "message_stats")
+@callback_router.exact("message_stats")
 async def handle_message_stats(query: types.CallbackQuery):
     """Show message statistics (basic info)"""
     await query.answer()
@@ -998,7 +1001,7 @@ async def handle_message_stats(query: types.CallbackQuery):
 
 
 # Placeholder handlers for advanced features
-@router.callback_query(lambda query: query.data in ["clone_message", "forward_message", "quote_message", "schedule_edit", "notification_settings"])
+@callback_router.exact("clone_message", "forward_message", "quote_message", "schedule_edit", "notification_settings")
 async def handle_advanced_features(query: types.CallbackQuery):
     """Handle advanced features (to be implemented)"""
     await query.answer()
@@ -1025,7 +1028,7 @@ async def handle_advanced_features(query: types.CallbackQuery):
 
 
 # Quick action handlers for posts without buttons
-@router.callback_query(lambda query: query.data == "quick_add_button")
+@callback_router.exact("quick_add_button")
 async def handle_quick_add_button(query: types.CallbackQuery):
     """Quick add button action for posts without buttons"""
     await query.answer()
@@ -1049,7 +1052,7 @@ async def handle_quick_add_button(query: types.CallbackQuery):
     )
 
 
-@router.callback_query(lambda query: query.data == "quick_add_media")
+@callback_router.exact("quick_add_media")
 async def handle_quick_add_media(query: types.CallbackQuery):
     """Quick add media action for posts without buttons"""
     await query.answer()
@@ -1075,7 +1078,7 @@ async def handle_quick_add_media(query: types.CallbackQuery):
     )
 
 
-@router.callback_query(lambda query: query.data == "quick_add_text")
+@callback_router.exact("quick_add_text")
 async def handle_quick_add_text(query: types.CallbackQuery):
     """Quick add text action for posts without buttons and text"""
     await query.answer()
@@ -1100,18 +1103,14 @@ async def handle_quick_add_text(query: types.CallbackQuery):
     )
 
 
-@router.callback_query(lambda query: query.data == "separator")
+@callback_router.exact("separator")
 async def handle_separator_click(query: types.CallbackQuery):
     """Handle separator line click (do nothing, just provide feedback)"""
     await query.answer("This is just a visual separator", show_alert=False)
 
 
 # Message handlers for edit states
-@router.message(lambda message: 
-    get_user_data(message.from_user.id).get("state") == "editing_text" and
-    message.text and
-    message.text not in ["Back to Edit Menu"]
-)
+@state_router.message(edit_sessions, "editing_text", lambda message: bool(message.text))
 async def process_edit_text_input(message: types.Message):
     """Process text input during edit mode"""
     user_data = get_user_data(message.from_user.id)
@@ -1137,10 +1136,8 @@ async def process_edit_text_input(message: types.Message):
     }, selected_channel)
 
 
-@router.message(lambda message: 
-    get_user_data(message.from_user.id).get("state") == "editing_media" and
-    (message.photo or message.video or message.document or message.animation)
-)
+@state_router.message(edit_sessions, "editing_media",
+                      lambda message: bool(message.photo or message.video or message.document or message.animation))
 async def process_edit_media_input(message: types.Message):
     """Process media input during edit mode"""
     user_data = get_user_data(message.from_user.id)
@@ -1186,11 +1183,7 @@ async def process_edit_media_input(message: types.Message):
         )
 
 
-@router.message(lambda message: 
-    get_user_data(message.from_user.id).get("state") == "editing_buttons" and
-    message.text and
-    message.text not in ["Back to Edit Menu"]
-)
+@state_router.message(edit_sessions, "editing_buttons", lambda message: bool(message.text))
 async def process_edit_buttons_input(message: types.Message):
     """Process buttons input during edit mode"""
     user_data = get_user_data(message.from_user.id)
@@ -1286,13 +1279,13 @@ async def process_edit_buttons_input(message: types.Message):
         )
 
 
-@router.message(lambda message: 
-    get_user_data(message.from_user.id).get("state") == "editing_media" and
-    message.text == "/done"
-)
+@router.message(Command("done"))
 async def handle_done_editing_media(message: types.Message):
     """Handle done command for media editing"""
     user_data = get_user_data(message.from_user.id)
+    if user_data.get("state") != "editing_media":
+        # Not editing media; let other handlers see the message
+        raise SkipHandler()
     user_data["state"] = "editing_post"
     set_user_data(message.from_user.id, user_data)
     
@@ -5,22 +5,24 @@ import html
 from aiogram import types
 from aiogram.enums import ParseMode
 
-from constants import router
-from utils.data_store import get_user_data, set_user_data
+from utils.data_store import get_user_data, set_user_data, user_post_data
+from utils.post_draft import MediaItem
+from utils.state_routing import state_router
 from utils.keyboards import get_media_management_keyboard
+from utils.menu_routing import menu_router
 
-@router.message(lambda message: message.text == "Clear Media")
+@menu_router.button("Clear Media")
 async def cmd_clear_media(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if user_data:
-        user_data["media"] = []
+        user_data["media"] = ()
         set_user_data(message.from_user.id, user_data)
         await message.answer("All media cleared!")
         
     from .post_creation import cmd_add_media
     await cmd_add_media(message)
 
-@router.message(lambda message: message.text == "Done Adding Media")
+@menu_router.button("Done Adding Media")
 async def cmd_done_adding_media(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if user_data:
@@ -33,11 +35,7 @@ async def cmd_done_adding_media(message: types.Message):
     await show_post_menu(message)
 
 # Handler for processing media input (photos, videos, documents)
-@router.message(lambda message: 
-    get_user_data(message.from_user.id).get("state") == "adding_media" and
-    (message.photo or message.video or message.document) and
-    message.text not in ["Clear Media", "Done Adding Media", "Back to Post Menu"]
-)
+@state_router.message(user_post_data, "adding_media", lambda message: bool(message.photo or message.video or message.document))
 async def process_media_input(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     media_item = None
@@ -45,26 +43,14 @@ async def process_media_input(message: types.Message):
     if message.photo:
         # Get the largest photo size
         largest_photo = max(message.photo, key=lambda x: x.file_size or 0)
-        media_item = {
-            "type": "photo",
-            "file_id": largest_photo.file_id,
-            "caption": message.caption or ""
-        }
+        media_item = MediaItem("photo", largest_photo.file_id, message.caption or "")
     elif message.video:
-        media_item = {
-            "type": "video",
-            "file_id": message.video.file_id,
-            "caption": message.caption or ""
-        }
+        media_item = MediaItem("video", message.video.file_id, message.caption or "")
     elif message.document:
-        media_item = {
-            "type": "document",
-            "file_id": message.document.file_id,
-            "caption": message.caption or ""
-        }
+        media_item = MediaItem("document", message.document.file_id, message.caption or "")
     
     if media_item:
-        user_data["media"].append(media_item)
+        user_data["media"] += (media_item,)
         set_user_data(message.from_user.id, user_data)
         media_count = len(user_data["media"])
         
@@ -5,7 +5,6 @@ import html
 from aiogram import types
 from aiogram.enums import ParseMode
 
-from constants import router
 from utils.data_store import get_user_data, set_user_data, init_user_data
 from utils.keyboards import (
     get_post_creation_keyboard, 
@@ -14,8 +13,9 @@ from utils.keyboards import (
     get_button_management_keyboard,
     get_clear_confirmation_keyboard
 )
+from utils.menu_routing import menu_router
 
-@router.message(lambda message: message.text == "Create Post")
+@menu_router.button("Create Post")
 async def cmd_create_post(message: types.Message):
     # Initialize post data for the user
     init_user_data(message.from_user.id)
@@ -38,7 +38,7 @@ async def cmd_create_post(message: types.Message):
         parse_mode=ParseMode.HTML
     )
 
-@router.message(lambda message: message.text == "Add Text")
+@menu_router.button("Add Text")
 async def cmd_add_text(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -63,7 +63,7 @@ async def cmd_add_text(message: types.Message):
         parse_mode=ParseMode.HTML
     )
 
-@router.message(lambda message: message.text == "Add Media")
+@menu_router.button("Add Media")
 async def cmd_add_media(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -86,7 +86,7 @@ async def cmd_add_media(message: types.Message):
         parse_mode=ParseMode.HTML
     )
 
-@router.message(lambda message: message.text == "Add Buttons")
+@menu_router.button("Add Buttons")
 async def cmd_add_buttons(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -115,7 +115,7 @@ async def cmd_add_buttons(message: types.Message):
         parse_mode=ParseMode.HTML
     )
 
-@router.message(lambda message: message.text == "Clear All")
+@menu_router.button("Clear All")
 async def cmd_clear_post(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -133,7 +133,7 @@ async def cmd_clear_post(message: types.Message):
         parse_mode=ParseMode.HTML
     )
 
-@router.message(lambda message: message.text == "Yes, Clear All")
+@menu_router.button("Yes, Clear All")
 async def cmd_confirm_clear_post(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -152,7 +152,7 @@ async def cmd_confirm_clear_post(message: types.Message):
     from .post_menu import show_post_menu
     await show_post_menu(message)
 
-@router.message(lambda message: message.text == "No, Keep Content")
+@menu_router.button("No, Keep Content")
 async def cmd_cancel_clear_post(message: types.Message):
     await message.answer(
         "<b>Content Preserved!</b>\n\nYour post content has been kept.",
@@ -161,7 +161,7 @@ async def cmd_cancel_clear_post(message: types.Message):
     from .post_menu import show_post_menu
     await show_post_menu(message)
 
-@router.message(lambda message: message.text == "Back to Post Menu")
+@menu_router.button("Back to Post Menu")
 async def cmd_back_to_post_menu(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if user_data:
@@ -5,10 +5,10 @@ import html
 from aiogram import types
 from aiogram.enums import ParseMode
 
-from constants import router
 from utils.data_store import get_user_data, set_user_data
+from utils.menu_routing import menu_router
 
-@router.message(lambda message: message.text == "Pin Post")
+@menu_router.button("Pin Post")
 async def cmd_toggle_pin(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -31,7 +31,7 @@ async def cmd_toggle_pin(message: types.Message):
     from .post_menu import show_post_menu
     await show_post_menu(message)
 
-@router.message(lambda message: message.text == "Toggle Notifications")
+@menu_router.button("Toggle Notifications")
 async def cmd_toggle_notifications(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -54,7 +54,7 @@ async def cmd_toggle_notifications(message: types.Message):
     from .post_menu import show_post_menu
     await show_post_menu(message)
 
-@router.message(lambda message: message.text == "Link Preview")
+@menu_router.button("Link Preview")
 async def cmd_toggle_link_preview(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -5,12 +5,14 @@ from aiogram import types
 from aiogram.enums import ParseMode
 from aiogram.types import InputMediaPhoto, InputMediaVideo
 
-from constants import router
 from db import db
-from utils.data_store import get_user_data, clear_user_data
+from utils.data_store import get_user_data, set_user_data, clear_user_data
 from utils.keyboards import create_inline_buttons_keyboard
+from utils.post_renderer import render_post
+from utils.circuit_breaker import channel_breaker
+from utils.menu_routing import menu_router
 
-@router.message(lambda message: message.text == "Preview Post")
+@menu_router.button("Preview Post")
 async def cmd_preview_post(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     if not user_data:
@@ -122,11 +124,15 @@ async def cmd_preview_post(message: types.Message):
         from .post_menu import show_post_menu
         await show_post_menu(message)
 
-@router.message(lambda message: message.text == "Publish Post")
+@menu_router.button("Publish Post")
 async def cmd_publish_post(message: types.Message):
     # Get user data and validate it exists
     user_data = get_user_data(message.from_user.id)
     
+    # Publishing from the menu always means now, not at an earlier schedule time
+    if user_data.pop("schedule_at", None) is not None:
+        set_user_data(message.from_user.id, user_data)
+    
     # Debug logging - you can remove this later
     print(f"DEBUG: User {message.from_user.id} publish attempt")
     print(f"DEBUG: User data exists: {user_data is not None}")
@@ -203,122 +209,38 @@ async def cmd_publish_post(message: types.Message):
         from .post_menu import show_post_menu
         await show_post_menu(message)
   
-async def publish_post_to_channel(message: types.Message, channel_data: dict, user_data: dict):
-    """Publish a post to a specific channel"""
+async def publish_post_to_channel(bot, channel_data: dict, user_data: dict, rendered=None,
+                                  sent_messages: list = None, on_post_sent=None):
+    """Publish a post to a specific channel
+
+    ``rendered`` is the post compiled once with ``render_post``; multi-channel
+    publishes pass it in so each channel only fills in its chat_id.
+    ``sent_messages`` and ``on_post_sent`` are passed on to ``RenderedPost.send``
+    so a retried job resumes after the post itself went out.
+    Returns every message sent to the channel, post message first.
+    """
     try:
         connected_chat = channel_data.get("username") or channel_data.get("chat_id")
         
         if not connected_chat:
             raise Exception("Invalid channel data - no username or chat_id found")
         
-        # Validate user_data has content
-        has_text = user_data.get("text") and user_data["text"].strip()
-        has_media = user_data.get("media") and len(user_data["media"]) > 0
-        
-        if not has_text and not has_media:
-            raise Exception("No content to publish - both text and media are empty")
+        # Skip channels the bot has repeatedly been locked out of
+        channel_key = channel_data.get("chat_id") or connected_chat
+        channel_breaker.check(channel_key)
         
-        # Create inline keyboard for buttons if any
-        inline_keyboard = create_inline_buttons_keyboard(user_data.get("buttons", []))
-        
-        sent_message = None
-        
-        # Send the post
-        if has_media and len(user_data["media"]) == 1:
-            # Single media file
-            media_item = user_data["media"][0]
-            caption_text = user_data.get("text", "")
-            
-            if media_item["type"] == "photo":
-                sent_message = await message.bot.send_photo(
-                    chat_id=connected_chat,
-                    photo=media_item["file_id"],
-                    caption=caption_text,
-                    reply_markup=inline_keyboard,
-                    parse_mode=ParseMode.HTML,
-                    disable_notification=not user_data.get("notifications", True)
-                )
-            elif media_item["type"] == "video":
-                sent_message = await message.bot.send_video(
-                    chat_id=connected_chat,
-                    video=media_item["file_id"],
-                    caption=caption_text,
-                    reply_markup=inline_keyboard,
-                    parse_mode=ParseMode.HTML,
-                    disable_notification=not user_data.get("notifications", True)
-                )
-            elif media_item["type"] == "document":
-                sent_message = await message.bot.send_document(
-                    chat_id=connected_chat,
-                    document=media_item["file_id"],
-                    caption=caption_text,
-                    reply_markup=inline_keyboard,
-                    parse_mode=ParseMode.HTML,
-                    disable_notification=not user_data.get("notifications", True)
-                )
-                
-        elif has_media and len(user_data["media"]) > 1:
-            # Multiple media files - send as media group
-            media_group = []
-            text_content = user_data.get("text", "")
-            
-            for i, media_item in enumerate(user_data["media"][:10]):  # Telegram limit is 10
-                if media_item["type"] == "photo":
-                    media_group.append(InputMediaPhoto(
-                        media=media_item["file_id"],
-                        caption=text_content if i == 0 else None,
-                        parse_mode=ParseMode.HTML if i == 0 and text_content else None
-                    ))
-                elif media_item["type"] == "video":
-                    media_group.append(InputMediaVideo(
-                        media=media_item["file_id"],
-                        caption=text_content if i == 0 else None,
-                        parse_mode=ParseMode.HTML if i == 0 and text_content else None
-                    ))
-            
-            sent_messages = await message.bot.send_media_group(
-                chat_id=connected_chat,
-                media=media_group,
-                disable_notification=not user_data.get("notifications", True)
-            )
-            sent_message = sent_messages[0] if sent_messages else None
-            
-            if inline_keyboard:
-                await message.bot.send_message(
-                    chat_id=connected_chat,
-                    text="*Action buttons for the post above*",
-                    reply_markup=inline_keyboard,
-                    parse_mode=ParseMode.MARKDOWN,
-                    disable_notification=not user_data.get("notifications", True)
-                )
-        else:
-            # Text only
-            if not has_text:
-                raise Exception("No text content to publish")
-                
-            sent_message = await message.bot.send_message(
-                chat_id=connected_chat,
-                text=user_data["text"],
-                reply_markup=inline_keyboard,
-                parse_mode=ParseMode.HTML,
-                disable_notification=not user_data.get("notifications", True),
-                disable_web_page_preview=not user_data.get("link_preview", True)
-            )
+        if rendered is None:
+            rendered = render_post(user_data)
         
-        # Pin the message if requested
-        if user_data.get("pin_post", False) and sent_message:
-            try:
-                await message.bot.pin_chat_message(
-                    chat_id=connected_chat,
-                    message_id=sent_message.message_id,
-                    disable_notification=not user_data.get("notifications", True)
-                )
-            except Exception as pin_error:
-                # Don't raise exception for pin failures, just log it
-                print(f"Failed to pin message: {pin_error}")
+        try:
+            sent_messages = await rendered.send(bot, connected_chat, sent_messages, on_post_sent)
+        except Exception as send_error:
+            await channel_breaker.record_failure(channel_key, send_error)
+            raise
         
-        return sent_message
+        await channel_breaker.record_success(channel_key)
+        return sent_messages
         
     except Exception as e:
         print(f"Error in publish_post_to_channel: {e}")
-        raise e
\ No newline at end of file
+        raise e
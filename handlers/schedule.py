@@ -0,0 +1,165 @@
+"""
+Scheduled publishing handlers
+Lets users pick a publish time for the current draft and manage pending posts
+"""
+import html
+import re
+from datetime import datetime, timedelta
+from aiogram import types
+from aiogram.filters import Command
+from aiogram.enums import ParseMode
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from constants import router
+from utils.data_store import get_user_data, set_user_data, user_post_data
+from utils.keyboards import get_back_to_post_menu_keyboard
+from utils.scheduler import post_scheduler
+from utils.state_routing import state_router
+from utils.menu_routing import menu_router
+from utils.callbacks import CancelScheduled
+from utils.callback_routing import callback_router
+
+# "30m", "2h", "1d"
+RELATIVE_TIME = re.compile(r"^(\d+)\s*([mhd])$")
+RELATIVE_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+MAX_SCHEDULE_AHEAD = timedelta(days=365)
+
+
+def parse_schedule_time(text: str, now: datetime = None):
+    """Parse a publish time; returns None for invalid or past times
+
+    Accepts a delay ("30m", "2h", "1d"), a time today or tomorrow ("18:30")
+    or a full date ("2025-01-31 18:30"), in server time.
+    """
+    now = now or datetime.now()
+    text = text.strip().lower()
+
+    match = RELATIVE_TIME.match(text)
+    if match:
+        run_at = now + timedelta(**{RELATIVE_UNITS[match.group(2)]: int(match.group(1))})
+    else:
+        try:
+            run_at = datetime.strptime(text, "%Y-%m-%d %H:%M")
+        except ValueError:
+            try:
+                clock = datetime.strptime(text, "%H:%M")
+            except ValueError:
+                return None
+            run_at = now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+            if run_at <= now:
+                run_at += timedelta(days=1)
+
+    if run_at <= now or run_at - now > MAX_SCHEDULE_AHEAD:
+        return None
+    return run_at
+
+
+@menu_router.button("Schedule Post")
+async def cmd_schedule_post(message: types.Message):
+    """Ask for the publish time of the current draft"""
+    user_data = get_user_data(message.from_user.id)
+
+    has_text = bool(user_data.get("text") and user_data["text"].strip())
+    has_media = bool(user_data.get("media"))
+    if not has_text and not has_media:
+        await message.answer(
+            "<b>No Content to Schedule</b>\n\n"
+            "Please add some text or media before scheduling your post.",
+            parse_mode=ParseMode.HTML
+        )
+        return
+
+    user_data["state"] = "waiting_schedule_time"
+    user_data.pop("schedule_at", None)
+    set_user_data(message.from_user.id, user_data)
+
+    await message.answer(
+        "<b>Schedule Post</b>\n\n"
+        "When should this post be published?\n\n"
+        "<b>Examples:</b>\n"
+        "• <code>30m</code>, <code>2h</code>, <code>1d</code> - from now\n"
+        "• <code>18:30</code> - next time it's 18:30\n"
+        "• <code>2025-01-31 18:30</code> - exact date\n\n"
+        f"Server time is now <code>{datetime.now().strftime('%Y-%m-%d %H:%M')}</code>",
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_back_to_post_menu_keyboard()
+    )
+
+
+@state_router.message(user_post_data, "waiting_schedule_time", lambda message: bool(message.text))
+async def process_schedule_time(message: types.Message):
+    """Store the publish time and continue with channel selection"""
+    run_at = parse_schedule_time(message.text)
+    if run_at is None:
+        await message.answer(
+            "<b>Invalid Time</b>\n\n"
+            "Please send a future time like <code>2h</code>, <code>18:30</code> "
+            "or <code>2025-01-31 18:30</code> (up to a year ahead).",
+            parse_mode=ParseMode.HTML
+        )
+        return
+
+    user_data = get_user_data(message.from_user.id)
+    user_data["state"] = "main_post_menu"
+    user_data["schedule_at"] = run_at
+    set_user_data(message.from_user.id, user_data)
+
+    # publish_to_channels schedules instead of publishing while schedule_at is set
+    from .channel_selection import show_channel_selection
+    await show_channel_selection(message, action="publish")
+
+
+@router.message(Command("scheduled"))
+async def cmd_scheduled(message: types.Message):
+    """List the user's pending scheduled posts"""
+    pending = await post_scheduler.get_pending(message.from_user.id)
+
+    if not pending:
+        await message.reply(
+            "<b>No Scheduled Posts</b>\n\n"
+            "Use <b>Schedule Post</b> in the post menu to publish later.",
+            parse_mode=ParseMode.HTML
+        )
+        return
+
+    response = "<b>Scheduled Posts</b>\n\n"
+    keyboard = []
+    for i, post in enumerate(pending, 1):
+        text = (post["post"].get("text") or "").strip()
+        if text:
+            preview = html.escape(text[:40]) + ("..." if len(text) > 40 else "")
+        else:
+            preview = f"{len(post['post'].get('media') or [])} media file(s)"
+        channels = ", ".join(html.escape(channel.get("title", "Unknown")) for channel in post.get("channels", []))
+
+        response += f"{i}. <b>{post['run_at'].strftime('%Y-%m-%d %H:%M')}</b>\n"
+        response += f"   {preview}\n"
+        response += f"   To: {channels}\n\n"
+        keyboard.append([
+            InlineKeyboardButton(
+                text=f"Cancel #{i}",
+                callback_data=CancelScheduled(schedule_id=post['_id']).pack()
+            )
+        ])
+
+    await message.reply(
+        response,
+        parse_mode=ParseMode.HTML,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
+    )
+
+
+@callback_router.data(CancelScheduled)
+async def handle_cancel_scheduled(query: types.CallbackQuery, callback_data: CancelScheduled):
+    """Cancel a pending scheduled post"""
+    schedule_id = callback_data.schedule_id
+
+    if await post_scheduler.cancel(query.from_user.id, schedule_id):
+        await query.answer("Scheduled post cancelled")
+        await query.message.edit_text(
+            "<b>Scheduled Post Cancelled</b>\n\n"
+            "Use /scheduled to see your remaining posts.",
+            parse_mode=ParseMode.HTML
+        )
+    else:
+        await query.answer("This post was already published or cancelled", show_alert=True)
@@ -2,6 +2,7 @@
 Start command handler with enhanced welcome message and developer info
 """
 import html
+from datetime import datetime
 from aiogram import types
 from aiogram.filters import Command
 from aiogram.enums import ParseMode
@@ -10,6 +11,7 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from constants import router, DEVELOPER_USERNAME, DEVELOPER_CHANNEL
 from db import db
 from utils.keyboards import get_main_menu_keyboard
+from utils.menu_routing import menu_router
 
 @router.message(Command("start"))
 async def cmd_start(message: types.Message):
@@ -56,19 +58,27 @@ async def cmd_start(message: types.Message):
                 "user_id": message.from_user.id,
                 "username": message.from_user.username,
                 "full_name": message.from_user.full_name,
-                "first_seen": message.date
-            }
+                "first_seen": message.date,
+                "last_activity": datetime.now(),
+                # Messaging the bot again makes a blocked user reachable
+                "deliverable": True
+            },
+            "$setOnInsert": {"joined_date": datetime.now()},
+            "$unset": {"blocked_at": ""}
         },
         upsert=True,
     )
 
-@router.message(lambda message: message.text == "Back")
+@menu_router.button("Back")
 async def cmd_back(message: types.Message):
     # Clear any ongoing post data
     from utils.data_store import clear_user_data
     clear_user_data(message.from_user.id)
 
-    # Re-send the original keyboard after returning
+    await show_main_menu(message)
+
+async def show_main_menu(message: types.Message):
+    """Re-send the main menu keyboard"""
     keyboard = get_main_menu_keyboard()
 
     safe_name = html.escape(message.from_user.full_name)
@@ -80,7 +90,7 @@ async def cmd_back(message: types.Message):
         parse_mode=ParseMode.HTML,
     )
 
-@router.message(lambda message: message.text == "Developer Info")
+@menu_router.button("Developer Info")
 async def cmd_developer_info(message: types.Message):
     """Show developer information"""
     
@@ -129,7 +139,7 @@ async def cmd_developer_info(message: types.Message):
         parse_mode=ParseMode.HTML
     )
 
-@router.message(lambda message: message.text == "Edit Post")
+@menu_router.button("Edit Post")
 async def cmd_edit_post_menu(message: types.Message):
     """Handle Edit Post button from main menu"""
     from .edit_post import cmd_edit_post
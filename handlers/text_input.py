@@ -5,15 +5,11 @@ import html
 from aiogram import types
 from aiogram.enums import ParseMode
 
-from constants import router
-from utils.data_store import get_user_data, set_user_data
+from utils.data_store import get_user_data, set_user_data, user_post_data
+from utils.state_routing import state_router
 
 # Handler for processing text input
-@router.message(lambda message: 
-    get_user_data(message.from_user.id).get("state") == "adding_text" and
-    message.text and
-    message.text not in ["Back to Post Menu"]
-)
+@state_router.message(user_post_data, "adding_text", lambda message: bool(message.text))
 async def process_text_input(message: types.Message):
     user_data = get_user_data(message.from_user.id)
     user_data["text"] = message.text
@@ -2,6 +2,7 @@
 Main bot file with modular imports and health check server
 """
 import asyncio
+import hmac
 import logging
 from aiohttp import web
 
@@ -14,9 +15,22 @@ from constants import dp, router
 from db import mongo_client
 from utils.logger import logger, log_system_event
 from utils.backup import scheduled_backup_task
+from utils.rate_limiter import rate_limiter
+from utils.publish_queue import publish_queue
+from utils.circuit_breaker import channel_breaker
+from utils.scheduler import post_scheduler
+from utils.broadcaster import broadcast_manager
+from utils.session_store import session_loader, session_sweeper_task
+from utils.throttle import inbound_throttle
+from utils.activity import activity_tracker
+from utils.update_scheduler import update_serializer
+from utils.handler_metrics import handler_metrics, update_timing, handler_labels, telegram_timing
+from utils.state_routing import state_routing
+from utils.menu_routing import menu_router, menu_routing
+from utils.callback_routing import callback_routing
 
-# Import all handlers
-from handlers import (
+# Import all handlers; importing a module registers its handlers
+from handlers import (  # noqa: F401
     start,
     post_creation,
     post_settings,
@@ -28,6 +42,7 @@ from handlers import (
     stats,
     connect,
     channel_selection,
+    schedule,
     edit_post,
     admin  # Import admin handlers
 )
@@ -37,11 +52,24 @@ async def health_check(request):
     """Health check endpoint for Koyeb"""
     return web.Response(text="OK", status=200)
 
+async def handler_metrics_endpoint(request):
+    """Per-handler latency percentiles as JSON, for callers holding METRICS_TOKEN"""
+    expected = f"Bearer {Config.METRICS_TOKEN}"
+    if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected.encode()):
+        return web.Response(text="Unauthorized", status=401)
+    return web.json_response({
+        "since": handler_metrics.started_at,
+        "handlers": handler_metrics.get_metrics()
+    })
+
 async def start_health_server():
     """Start health check HTTP server on port 8000"""
     app = web.Application()
     app.router.add_get('/', health_check)
     app.router.add_get('/health', health_check)
+    # Handler names and latencies are internal; admins also get them from /latency
+    if Config.METRICS_TOKEN:
+        app.router.add_get('/metrics/handlers', handler_metrics_endpoint)
     
     runner = web.AppRunner(app)
     await runner.setup()
@@ -53,17 +81,56 @@ async def main() -> None:
     # Validate configuration
     Config.validate()
     log_system_event("Configuration validated successfully")
+    # Every keyboard button must have exactly one handler
+    menu_router.check()
     
     logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO))
 
     dp.include_routers(router)
+    # Drop a user's updates over RATE_LIMIT_REQUESTS per RATE_LIMIT_WINDOW before they queue
+    dp.update.outer_middleware(inbound_throttle)
+    # Refresh last_activity, at most once per ACTIVITY_UPDATE_INTERVAL per user
+    dp.update.outer_middleware(activity_tracker)
+    # One update at a time per user, users in parallel
+    dp.update.outer_middleware(update_serializer)
+    # Time each update once it leaves the queue; name aiogram-matched handlers
+    dp.update.outer_middleware(update_timing)
+    dp.message.middleware(handler_labels)
+    dp.callback_query.middleware(handler_labels)
+    # Reload the user's sessions from the shared store before filters run
+    dp.message.outer_middleware(session_loader)
+    dp.callback_query.outer_middleware(session_loader)
+    # Menu buttons by exact text, then free-form input by the user's state
+    dp.message.outer_middleware(menu_routing)
+    dp.message.outer_middleware(state_routing)
+    # Callback queries through the prefix trie, typed payloads unpacked once
+    dp.callback_query.outer_middleware(callback_routing)
+    # Drop idle drafts and sessions in the background
+    asyncio.create_task(session_sweeper_task())
 
     bot = Bot(Config.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    # Charge API time, pacing included, to the update that made the call
+    bot.session.middleware(telegram_timing)
+    # Pace every outbound API call against Telegram's flood limits
+    bot.session.middleware(rate_limiter)
 
     # Test database connection
     await mongo_client.admin.command("ismaster")
     log_system_event("Database connection established")
     
+    # Restore dead-channel circuits and probe them in the background
+    await channel_breaker.load()
+    asyncio.create_task(channel_breaker.probe_task(bot))
+    
+    # Resume unfinished publish jobs and start the publish workers
+    await publish_queue.start(bot)
+    
+    # Fire scheduled posts into the publish queue
+    await post_scheduler.start(bot)
+    
+    # Resume broadcasts interrupted by a restart
+    await broadcast_manager.start(bot)
+    
     # Start health check server for Koyeb
     asyncio.create_task(start_health_server())
     
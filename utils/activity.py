@@ -0,0 +1,63 @@
+"""
+User activity tracking for PostBot
+Every update refreshes the sender's last_activity, which /stats and
+active:N broadcast segments read. Writes are throttled per user to one per
+ACTIVITY_UPDATE_INTERVAL and run in the background, so busy users cost
+one small update every few minutes and handlers never wait on them.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from aiogram import BaseMiddleware
+
+from config import Config
+from db import db
+from utils.logger import log_error
+
+
+class ActivityTracker(BaseMiddleware):
+    """Outer update middleware writing users' last_activity"""
+
+    def __init__(self, interval: int = None, max_users: int = None):
+        self.interval = interval or Config.ACTIVITY_UPDATE_INTERVAL
+        self.max_users = max_users or Config.RATE_LIMIT_MAX_USERS
+        # user_id -> monotonic time of the last write; least recent first
+        self.last_write = OrderedDict()
+        # Running writes, referenced so they aren't collected mid-write
+        self.writing = set()
+        self.writes = 0
+
+    def due(self, user_id: int) -> bool:
+        """True, and the user's write time reset, when last_activity needs a write"""
+        now = time.monotonic()
+        last = self.last_write.get(user_id)
+        if last is not None and now - last < self.interval:
+            return False
+        self.last_write[user_id] = now
+        self.last_write.move_to_end(user_id)
+        if len(self.last_write) > self.max_users:
+            # Forgetting a user only costs one early write
+            self.last_write.popitem(last=False)
+        return True
+
+    async def __call__(self, handler, event, data):
+        user = data.get("event_from_user")
+        if user is not None and self.due(user.id):
+            task = asyncio.create_task(self._write(user.id))
+            self.writing.add(task)
+            task.add_done_callback(self.writing.discard)
+        return await handler(event, data)
+
+    async def _write(self, user_id: int):
+        try:
+            # Users who never sent /start have no document to update
+            await db.users.update_one({"user_id": user_id}, {"$set": {"last_activity": datetime.now()}})
+            self.writes += 1
+        except Exception as e:
+            log_error(e, f"Updating last_activity for {user_id} failed")
+
+
+# Global activity tracker instance
+activity_tracker = ActivityTracker()
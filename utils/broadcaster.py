@@ -0,0 +1,458 @@
+"""
+Concurrent paced broadcaster for PostBot
+A bounded worker pool fed from the db.users cursor sends one prebuilt
+message to every user at a steady target rate, backing off for the whole
+pool when Telegram answers with RetryAfter.
+
+Broadcasts are stored in db.broadcasts and walk users in user_id order with
+a last_user_id watermark, so a restart resumes from the last checkpoint and
+admins can pause, resume or cancel them by id. A running broadcast is owned
+by one bot instance under a lease renewed at every checkpoint; another
+instance only resumes it once the lease has run out.
+"""
+import asyncio
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendDocument, SendMessage, SendPhoto, SendVideo
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+
+from config import Config
+from db import db
+from utils.logger import logger, log_error, log_system_event, log_user_action
+from utils.progress import ProgressReporter
+from utils.rate_limiter import TokenBucket
+from utils.segments import DELIVERABLE, ensure_indexes as ensure_segment_indexes, segment_query
+
+# Broadcast states
+RUNNING = "running"
+PAUSED = "paused"
+CANCELLED = "cancelled"
+COMPLETED = "completed"
+
+# Error fragments for users who can no longer receive messages
+BLOCKED_ERRORS = ("bot was blocked", "user is deactivated", "chat not found")
+
+OUTCOME_BATCH_SIZE = 500  # user updates per bulk_write
+
+MAX_FLOOD_RETRIES = 3  # per user
+CHECKPOINT_INTERVAL = 5  # seconds between watermark saves
+
+# Owner id of this process's broadcasts
+INSTANCE_ID = uuid.uuid4().hex
+
+# Payload type -> (method class, media field name)
+PAYLOAD_METHODS = {
+    "photo": (SendPhoto, "photo"),
+    "video": (SendVideo, "video"),
+    "document": (SendDocument, "document")
+}
+
+
+def build_broadcast_method(payload: dict):
+    """Build the announcement once; the broadcaster fills in each chat_id"""
+    if payload["type"] in PAYLOAD_METHODS:
+        method_class, media_field = PAYLOAD_METHODS[payload["type"]]
+        return method_class(**{
+            "chat_id": 0,
+            media_field: payload["file_id"],
+            "caption": payload["text"],
+            "parse_mode": ParseMode.HTML
+        })
+    return SendMessage(chat_id=0, text=payload["text"], parse_mode=ParseMode.HTML)
+
+
+class Broadcaster:
+    """Send one message to every user with a paced worker pool"""
+
+    def __init__(
+        self,
+        bot,
+        method,
+        worker_count: int = None,
+        rate: float = None,
+        batch_size: int = None,
+        progress=None,
+        after_user_id=None,
+        checkpoint=None,
+        query: dict = None
+    ):
+        self.bot = bot
+        # API method object with a placeholder chat_id, copied per user
+        self.method = method
+        self.worker_count = worker_count or Config.BROADCAST_CONCURRENCY
+        self.rate = rate or Config.BROADCAST_RATE
+        self.batch_size = batch_size or Config.BROADCAST_BATCH_SIZE
+        self.progress = progress
+        # Async callback saving the watermark and counters
+        self.checkpoint = checkpoint
+        # db.users filter for the audience
+        self.query = query or DELIVERABLE
+
+        # Burst of one second's worth, then a steady rate
+        self.bucket = TokenBucket(self.rate, self.rate)
+        self.queue = asyncio.Queue(maxsize=self.worker_count * 2)
+        self.stopping = False
+
+        # Every user up to and including last_user_id has been handled
+        self.last_user_id = after_user_id
+        self.dispatched = deque()
+        self.handled = set()
+
+        # Pending db.users updates for users who can't be reached anymore
+        self.outcomes = []
+        self.pruned = 0
+        # Running background flushes, referenced so they aren't collected mid-write
+        self.flushing = set()
+
+        self.sent = 0
+        self.blocked = 0
+        self.failed = 0
+        self.flood_waits = 0
+        self.resumed_attempts = 0
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def attempted(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Messages attempted per second in this run"""
+        elapsed = self.elapsed
+        return (self.attempted - self.resumed_attempts) / elapsed if elapsed > 0 else 0.0
+
+    def restore(self, counters: dict):
+        """Continue the counters of an earlier run"""
+        self.sent = counters.get("sent", 0)
+        self.blocked = counters.get("blocked", 0)
+        self.failed = counters.get("failed", 0)
+        self.flood_waits = counters.get("flood_waits", 0)
+        self.resumed_attempts = self.attempted
+
+    def stop(self):
+        """Stop feeding users; sends already queued still finish"""
+        self.stopping = True
+
+    async def run(self):
+        """Broadcast to every user and return when all sends are done"""
+        self.started_at = time.monotonic()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        checkpointer = asyncio.create_task(self._checkpoint_loop()) if self.checkpoint else None
+        try:
+            await self._produce()
+            await self.queue.join()
+        finally:
+            for task in workers + ([checkpointer] if checkpointer else []):
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.finished_at = time.monotonic()
+        await asyncio.gather(*self.flushing)
+        await self.flush_outcomes()
+        if self.checkpoint:
+            await self.checkpoint(self)
+
+    async def _produce(self):
+        """Feed user ids in user_id order; the bounded queue applies backpressure"""
+        query = self.query
+        if self.last_user_id is not None:
+            query = {"$and": [query, {"user_id": {"$gt": self.last_user_id}}]}
+        cursor = db.users.find(query, {"user_id": 1, "_id": 0}).sort("user_id", ASCENDING).batch_size(self.batch_size)
+        async for user in cursor:
+            if self.stopping:
+                break
+            if "user_id" in user:
+                self.dispatched.append(user["user_id"])
+                await self.queue.put(user["user_id"])
+
+    async def _worker(self):
+        while True:
+            user_id = await self.queue.get()
+            try:
+                await self._send(user_id)
+            finally:
+                self._mark_handled(user_id)
+                self.queue.task_done()
+            self._report()
+
+    def _mark_handled(self, user_id):
+        """Advance the watermark past every user handled in order"""
+        self.handled.add(user_id)
+        while self.dispatched and self.dispatched[0] in self.handled:
+            self.last_user_id = self.dispatched.popleft()
+            self.handled.discard(self.last_user_id)
+
+    async def _checkpoint_loop(self):
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            try:
+                await self.flush_outcomes()
+                await self.checkpoint(self)
+            except Exception as e:
+                log_error(e, "Broadcast checkpoint failed")
+
+    async def _send(self, user_id: int):
+        for attempt in range(MAX_FLOOD_RETRIES + 1):
+            await self.bucket.acquire()
+            try:
+                await self.bot(self.method.model_copy(update={"chat_id": user_id}))
+            except TelegramRetryAfter as e:
+                # Flood control applies to the whole bot, so the pool backs off together
+                self.flood_waits += 1
+                self.bucket.pause(e.retry_after)
+                if attempt == MAX_FLOOD_RETRIES:
+                    self.failed += 1
+                continue
+            except Exception as e:
+                error_message = str(e).lower()
+                if isinstance(e, TelegramForbiddenError) or any(fragment in error_message for fragment in BLOCKED_ERRORS):
+                    self.blocked += 1
+                    self._record_undeliverable(user_id, "user is deactivated" in error_message)
+                else:
+                    self.failed += 1
+                    logger.warning(f"Broadcast failed to {user_id}: {e}")
+                return
+            self.sent += 1
+            return
+
+    def _record_undeliverable(self, user_id: int, deactivated: bool):
+        """Queue a db.users update dropping the user from future broadcasts"""
+        flags = {"deliverable": False}
+        if deactivated:
+            flags["deactivated"] = True
+        else:
+            flags["blocked_at"] = datetime.now()
+        self.outcomes.append(UpdateOne({"user_id": user_id}, {"$set": flags}))
+        if len(self.outcomes) >= OUTCOME_BATCH_SIZE:
+            task = asyncio.create_task(self.flush_outcomes())
+            self.flushing.add(task)
+            task.add_done_callback(self.flushing.discard)
+
+    async def flush_outcomes(self):
+        """Write queued delivery outcomes in one bulk_write"""
+        if not self.outcomes:
+            return
+        outcomes, self.outcomes = self.outcomes, []
+        try:
+            await db.users.bulk_write(outcomes, ordered=False)
+            self.pruned += len(outcomes)
+        except Exception as e:
+            log_error(e, f"Recording {len(outcomes)} undeliverable users failed")
+
+    def progress_text(self) -> str:
+        """Live counts and throughput"""
+        return (
+            f"<b>Broadcasting...</b>\n\n"
+            f"Sent: {self.sent:,} | Blocked: {self.blocked:,} | Failed: {self.failed:,}\n"
+            f"Throughput: {self.throughput:.1f} msg/s"
+        )
+
+    def _report(self):
+        if self.progress:
+            self.progress.update(self.progress_text())
+
+
+class BroadcastManager:
+    """Persistent broadcasts that survive restarts"""
+
+    def __init__(self):
+        self.bot = None
+        # broadcast id -> (Broadcaster, state requested by stop(), None once taken over)
+        self.active = {}
+
+    async def start(self, bot):
+        """Create indexes and resume broadcasts interrupted by a restart"""
+        self.bot = bot
+        await db.users.create_index("user_id")
+        await db.users.create_index(
+            [("user_id", ASCENDING)],
+            name="deliverable_user_id",
+            partialFilterExpression=DELIVERABLE
+        )
+        await ensure_segment_indexes()
+        await db.broadcasts.create_index([("created_at", DESCENDING)])
+
+        # Users stored before delivery tracking count as deliverable
+        backfilled = await db.users.update_many(
+            {"deliverable": {"$exists": False}, "blocked_at": {"$exists": False}, "deactivated": {"$ne": True}},
+            {"$set": {"deliverable": True}}
+        )
+        if backfilled.modified_count:
+            log_system_event("Deliverable users backfilled", f"Count: {backfilled.modified_count}")
+
+        # Running broadcasts of a live instance keep their lease; only take
+        # over the ones whose owner stopped renewing it
+        resumed = 0
+        while True:
+            broadcast = await db.broadcasts.find_one_and_update(
+                {"status": RUNNING, "$or": [
+                    {"lease_until": {"$lt": datetime.now()}},
+                    {"lease_until": {"$exists": False}}
+                ]},
+                {"$set": self._lease()},
+                return_document=ReturnDocument.AFTER
+            )
+            if broadcast is None:
+                break
+            self._launch(broadcast)
+            resumed += 1
+        if resumed:
+            log_system_event("Broadcasts resumed", f"Count: {resumed}")
+
+    @staticmethod
+    def _lease() -> dict:
+        """Fields claiming a broadcast for this instance until the next checkpoint is overdue"""
+        return {"owner": INSTANCE_ID, "lease_until": datetime.now() + timedelta(seconds=Config.BROADCAST_LEASE)}
+
+    async def create(self, admin_id: int, payload: dict, status_chat_id: int, status_message_id: int, segment: dict = None) -> str:
+        """Store a broadcast and start sending it"""
+        broadcast = {
+            "_id": uuid.uuid4().hex[:12],
+            "admin_id": admin_id,
+            "payload": payload,
+            "segment": segment or {},
+            "status": RUNNING,
+            **self._lease(),
+            "status_chat_id": status_chat_id,
+            "status_message_id": status_message_id,
+            "last_user_id": None,
+            "sent": 0,
+            "blocked": 0,
+            "failed": 0,
+            "flood_waits": 0,
+            "created_at": datetime.now(),
+            "completed_at": None
+        }
+        await db.broadcasts.insert_one(broadcast)
+        self._launch(broadcast)
+        return broadcast["_id"]
+
+    def _launch(self, broadcast: dict):
+        broadcaster = Broadcaster(
+            self.bot,
+            build_broadcast_method(broadcast["payload"]),
+            progress=ProgressReporter(self.bot, broadcast["status_chat_id"], broadcast["status_message_id"]),
+            after_user_id=broadcast.get("last_user_id"),
+            checkpoint=lambda b, broadcast_id=broadcast["_id"]: self._checkpoint(broadcast_id, b),
+            query=segment_query(broadcast.get("segment") or {})
+        )
+        broadcaster.restore(broadcast)
+        self.active[broadcast["_id"]] = [broadcaster, COMPLETED]
+        asyncio.create_task(self._run(broadcast, broadcaster))
+
+    async def _checkpoint(self, broadcast_id: str, broadcaster: Broadcaster, status: str = None):
+        """Save the watermark and renew the lease; stops the broadcast if another instance owns it"""
+        update = {
+            "last_user_id": broadcaster.last_user_id,
+            "sent": broadcaster.sent,
+            "blocked": broadcaster.blocked,
+            "failed": broadcaster.failed,
+            "flood_waits": broadcaster.flood_waits,
+            **self._lease()
+        }
+        if status:
+            update["status"] = status
+        if status == COMPLETED:
+            update["completed_at"] = datetime.now()
+        broadcast = await db.broadcasts.find_one_and_update(
+            {"_id": broadcast_id, "owner": INSTANCE_ID},
+            {"$set": update},
+            return_document=ReturnDocument.AFTER
+        )
+        entry = self.active.get(broadcast_id)
+        if broadcast is None and entry is not None and entry[1] is not None:
+            # The lease ran out and another instance resumed it; it reports the outcome
+            logger.warning(f"Broadcast {broadcast_id} was taken over by another instance; stopping here")
+            entry[1] = None
+            entry[0].stop()
+        return broadcast
+
+    async def _run(self, broadcast: dict, broadcaster: Broadcaster):
+        from handlers.admin import format_broadcast_summary
+
+        broadcast_id = broadcast["_id"]
+        try:
+            await broadcaster.run()
+        except Exception as e:
+            # Paused at the last watermark so an admin can resume it
+            log_error(e, f"Broadcast {broadcast_id} stopped")
+            self.active.pop(broadcast_id, None)
+            await self._checkpoint(broadcast_id, broadcaster, PAUSED)
+            return
+
+        status = self.active.pop(broadcast_id)[1]
+        if status is None:
+            return
+        broadcast = await self._checkpoint(broadcast_id, broadcaster, status)
+        if broadcast is None:
+            return
+
+        summary = format_broadcast_summary(broadcast, broadcaster)
+        if not await broadcaster.progress.finish(summary):
+            try:
+                await self.bot.send_message(broadcast["status_chat_id"], summary, parse_mode=ParseMode.HTML)
+            except Exception as e:
+                log_error(e, f"Broadcast summary for {broadcast_id} could not be delivered")
+
+        log_user_action(
+            broadcast["admin_id"],
+            f"BROADCAST_{status.upper()}",
+            f"ID: {broadcast_id}, Sent: {broadcaster.sent}, Blocked: {broadcaster.blocked}, "
+            f"Failed: {broadcaster.failed}, Rate: {broadcaster.throughput:.1f}/s"
+        )
+
+    async def _stop(self, broadcast_id: str, status: str) -> bool:
+        entry = self.active.get(broadcast_id)
+        if entry is None:
+            return False
+        entry[1] = status
+        entry[0].stop()
+        return True
+
+    async def pause(self, broadcast_id: str) -> bool:
+        """Pause a running broadcast at its current watermark"""
+        return await self._stop(broadcast_id, PAUSED)
+
+    async def resume(self, broadcast_id: str) -> bool:
+        """Continue a paused broadcast from its watermark"""
+        broadcast = await db.broadcasts.find_one_and_update(
+            {"_id": broadcast_id, "status": PAUSED},
+            {"$set": {"status": RUNNING, **self._lease()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if broadcast is None:
+            return False
+        self._launch(broadcast)
+        return True
+
+    async def cancel(self, broadcast_id: str) -> bool:
+        """Cancel a running or paused broadcast"""
+        if await self._stop(broadcast_id, CANCELLED):
+            return True
+        result = await db.broadcasts.update_one(
+            {"_id": broadcast_id, "status": PAUSED},
+            {"$set": {"status": CANCELLED}}
+        )
+        return result.modified_count > 0
+
+    async def get_recent(self, limit: int = 10) -> list:
+        """Latest broadcasts, newest first"""
+        return await db.broadcasts.find(
+            {},
+            {"payload": 0}
+        ).sort("created_at", DESCENDING).limit(limit).to_list(length=limit)
+
+
+# Global broadcast manager, started in main.py
+broadcast_manager = BroadcastManager()
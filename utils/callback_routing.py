@@ -0,0 +1,104 @@
+"""
+Callback query routing for PostBot
+Callback handlers register either an exact data string or a typed
+CallbackData schema. Both live in one character trie, so a callback is
+routed by walking its prefix once instead of testing every handler's
+filter, and typed payloads are unpacked and validated once before the
+handler runs.
+"""
+from aiogram import BaseMiddleware
+
+from utils.handler_metrics import handler_metrics
+from utils.logger import log_error
+
+
+class _Node:
+    __slots__ = ("children", "handler", "schema")
+
+    def __init__(self):
+        self.children = {}
+        # Handler for data ending here (exact) or for "<prefix>:..." (schema)
+        self.handler = None
+        self.schema = None
+
+
+class CallbackRouter:
+    """Prefix trie from callback data to handlers"""
+
+    def __init__(self):
+        self.root = _Node()
+        self.routes = 0
+
+    def _node(self, key: str) -> _Node:
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+        return node
+
+    def exact(self, *values: str):
+        """Register a handler(query) for callbacks whose data is one of `values`"""
+        def decorator(handler):
+            for value in values:
+                node = self._node(value)
+                if node.handler is not None:
+                    raise ValueError(f"Callback {value!r} is already handled by {node.handler.__name__}")
+                node.handler = handler
+                self.routes += 1
+            return handler
+        return decorator
+
+    def data(self, schema):
+        """Register a handler(query, callback_data) for a CallbackData schema"""
+        def decorator(handler):
+            node = self._node(schema.__prefix__ + schema.__separator__)
+            if node.handler is not None:
+                raise ValueError(f"Callback prefix {schema.__prefix__!r} is already handled by {node.handler.__name__}")
+            node.handler = handler
+            node.schema = schema
+            self.routes += 1
+            return handler
+        return decorator
+
+    def resolve(self, data: str):
+        """(handler, schema or None) for callback data, or None"""
+        node = self.root
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                return None
+            if node.schema is not None:
+                # Schema prefixes end with the separator, so nothing longer can match
+                return node.handler, node.schema
+        if node.handler is not None:
+            return node.handler, None
+        return None
+
+
+class CallbackRoutingMiddleware(BaseMiddleware):
+    """Outer callback query middleware dispatching through the trie"""
+
+    def __init__(self, callback_router: CallbackRouter):
+        self.callback_router = callback_router
+
+    async def __call__(self, handler, event, data):
+        route = self.callback_router.resolve(event.data) if event.data else None
+        if route is None:
+            return await handler(event, data)
+
+        callback_handler, schema = route
+        if schema is None:
+            handler_metrics.label(callback_handler)
+            return await callback_handler(event)
+        try:
+            callback_data = schema.unpack(event.data)
+        except (TypeError, ValueError) as e:
+            log_error(e, f"Malformed callback data: {event.data}")
+            await event.answer("This button is no longer valid.", show_alert=True)
+            return None
+        handler_metrics.label(callback_handler)
+        return await callback_handler(event, callback_data)
+
+
+# Global callback router instance
+callback_router = CallbackRouter()
+callback_routing = CallbackRoutingMiddleware(callback_router)
@@ -0,0 +1,52 @@
+"""
+Typed callback data for PostBot's inline keyboards
+Short prefixes keep packed payloads well inside Telegram's 64-byte limit;
+pack() raises if one ever grows past it.
+"""
+from aiogram.filters.callback_data import CallbackData
+
+
+class SelectChannel(CallbackData, prefix="sc"):
+    """Publish a draft to one channel, by index in connected_channels"""
+    index: int
+    draft_id: str
+
+
+class PublishAll(CallbackData, prefix="pa"):
+    """Publish a draft to every connected channel"""
+    draft_id: str
+
+
+class ConfirmMultiSelect(CallbackData, prefix="cm"):
+    """Publish a draft to the channels picked in multi-select"""
+    draft_id: str
+
+
+class ToggleChannel(CallbackData, prefix="tc"):
+    """Toggle a channel in multi-select, by index in connected_channels"""
+    index: int
+
+
+class EditChannel(CallbackData, prefix="ec"):
+    """Pick the channel whose post is edited"""
+    chat_id: str
+
+
+class DisconnectChannel(CallbackData, prefix="dc"):
+    chat_id: str
+
+
+class CancelScheduled(CallbackData, prefix="cs"):
+    schedule_id: str
+
+
+class BroadcastConfirm(CallbackData, prefix="bc"):
+    """Confirm or cancel a pending broadcast session"""
+    confirm: bool
+    session_id: str
+
+
+class LogsPage(CallbackData, prefix="lp"):
+    """Show one page of a stored /logs search"""
+    page: int
+    search_id: str
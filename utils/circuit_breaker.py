@@ -0,0 +1,177 @@
+"""
+Per-channel circuit breaker for publish targets
+Channels where the bot was removed or lost admin rights are skipped
+instantly instead of spending a full API round trip on every publish.
+Open circuits are probed on a timer and the state is mirrored onto the
+users' connected_channels entries so selection menus can flag them.
+"""
+import asyncio
+import time
+from datetime import datetime
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from config import Config
+from db import db
+from utils.logger import logger, log_error, log_system_event
+
+# Circuit states
+CLOSED = "closed"
+OPEN = "open"
+
+# Channel status values stored on connected_channels entries
+CHANNEL_ACTIVE = "active"
+CHANNEL_UNAVAILABLE = "unavailable"
+
+PROBE_INTERVAL = 60  # seconds between checks for circuits due a probe
+
+# Error fragments meaning the bot can't post to the chat until someone fixes it
+DEAD_CHANNEL_ERRORS = (
+    "chat not found",
+    "not enough rights",
+    "need administrator rights",
+    "chat_admin_required",
+    "bot was kicked",
+    "bot is not a member",
+    "have no rights to send",
+)
+
+
+class ChannelUnavailableError(Exception):
+    """Raised instead of calling the API for a channel with an open circuit"""
+
+
+class Circuit:
+    """Failure state for one channel"""
+
+    __slots__ = ("state", "failures", "opened_at", "last_error")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error = ""
+
+
+class ChannelCircuitBreaker:
+    """Circuit breaker keyed by channel chat_id"""
+
+    def __init__(self, failure_threshold: int = None, cooldown: int = None):
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD
+        self.cooldown = cooldown or Config.CIRCUIT_COOLDOWN
+        self.circuits = {}
+        self.skipped = 0
+
+    @staticmethod
+    def is_dead_channel_error(error: Exception) -> bool:
+        """True for permission and chat-not-found errors"""
+        if isinstance(error, TelegramForbiddenError):
+            return True
+        if isinstance(error, TelegramBadRequest):
+            error_message = str(error).lower()
+            return any(fragment in error_message for fragment in DEAD_CHANNEL_ERRORS)
+        return False
+
+    def check(self, chat_id):
+        """Raise ChannelUnavailableError if the channel's circuit is open"""
+        circuit = self.circuits.get(chat_id)
+        if circuit and circuit.state == OPEN:
+            self.skipped += 1
+            raise ChannelUnavailableError(f"Channel unavailable, skipped: {circuit.last_error}")
+
+    async def record_success(self, chat_id):
+        """Reset the failure count after a successful send"""
+        circuit = self.circuits.get(chat_id)
+        if circuit is None:
+            return
+        was_open = circuit.state == OPEN
+        del self.circuits[chat_id]
+        if was_open:
+            await self._mark_channel(chat_id, CHANNEL_ACTIVE)
+
+    async def record_failure(self, chat_id, error: Exception):
+        """Count a failed send and open the circuit after repeated dead-channel errors"""
+        if not self.is_dead_channel_error(error):
+            return
+
+        circuit = self.circuits.setdefault(chat_id, Circuit())
+        circuit.failures += 1
+        circuit.last_error = str(error)[:200]
+
+        if circuit.state == CLOSED and circuit.failures >= self.failure_threshold:
+            circuit.state = OPEN
+            circuit.opened_at = time.monotonic()
+            logger.warning(f"CIRCUIT | channel {chat_id} opened after {circuit.failures} failures: {circuit.last_error}")
+            await self._mark_channel(chat_id, CHANNEL_UNAVAILABLE, circuit.last_error)
+
+    async def _mark_channel(self, chat_id, status: str, error: str = None):
+        """Mirror the channel state onto every user's connected_channels entry"""
+        try:
+            await db.users.update_many(
+                {"connected_channels.chat_id": chat_id},
+                {"$set": {
+                    "connected_channels.$.status": status,
+                    "connected_channels.$.status_error": error,
+                    "connected_channels.$.status_changed_at": datetime.now()
+                }}
+            )
+        except Exception as e:
+            log_error(e, f"Updating channel status for {chat_id} failed")
+
+    async def load(self):
+        """Re-open circuits for channels already marked unavailable"""
+        cursor = db.users.find(
+            {"connected_channels.status": CHANNEL_UNAVAILABLE},
+            {"connected_channels": 1}
+        )
+        async for user in cursor:
+            for channel in user.get("connected_channels", []):
+                if channel.get("status") == CHANNEL_UNAVAILABLE and channel.get("chat_id") not in self.circuits:
+                    circuit = Circuit()
+                    circuit.state = OPEN
+                    circuit.failures = self.failure_threshold
+                    circuit.opened_at = time.monotonic()
+                    circuit.last_error = channel.get("status_error") or "Channel unavailable"
+                    self.circuits[channel["chat_id"]] = circuit
+
+    async def probe(self, bot):
+        """Check open circuits whose cooldown has passed and close recovered ones"""
+        now = time.monotonic()
+        due = [
+            chat_id for chat_id, circuit in self.circuits.items()
+            if circuit.state == OPEN and now - circuit.opened_at >= self.cooldown
+        ]
+        for chat_id in due:
+            try:
+                member = await bot.get_chat_member(chat_id, bot.id)
+                recovered = member.status in ("administrator", "creator")
+            except Exception:
+                recovered = False
+
+            if recovered:
+                log_system_event("Channel circuit closed", f"Channel: {chat_id}")
+                await self.record_success(chat_id)
+            elif chat_id in self.circuits:
+                # Still dead; wait another cooldown before probing again
+                self.circuits[chat_id].opened_at = time.monotonic()
+
+    async def probe_task(self, bot):
+        """Background task probing open circuits"""
+        while True:
+            await asyncio.sleep(min(self.cooldown, PROBE_INTERVAL))
+            try:
+                await self.probe(bot)
+            except Exception as e:
+                log_error(e, "Channel circuit probe failed")
+
+    def get_metrics(self) -> dict:
+        """Open circuit count and skipped sends"""
+        return {
+            "open_circuits": sum(1 for circuit in self.circuits.values() if circuit.state == OPEN),
+            "tracked_channels": len(self.circuits),
+            "skipped_sends": self.skipped
+        }
+
+
+# Global circuit breaker instance
+channel_breaker = ChannelCircuitBreaker()
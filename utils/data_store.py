@@ -1,34 +1,33 @@
 """
 Data storage utilities for user post data management
 """
+from utils.post_draft import PostDraft
+from utils.session_store import SessionMap
 
-# Enhanced user input dictionary to store complex post data
-user_post_data = {}
+# Post drafts by user ID, kept in the configured session store
+user_post_data = SessionMap("draft", encode=PostDraft.to_bytes, decode=PostDraft.from_bytes)
 
 def get_user_data(user_id):
     """Get user post data by user ID"""
-    data = user_post_data.get(user_id, {})
-    print(f"DEBUG DATA_STORE: Getting data for user {user_id}: {bool(data)} (keys: {list(data.keys()) if data else 'None'})")
-    return data
+    return user_post_data.get(user_id, {})
 
 def set_user_data(user_id, data):
-    """Set user post data"""
-    user_post_data[user_id] = data
-    print(f"DEBUG DATA_STORE: Setting data for user {user_id}: {list(data.keys()) if data else 'None'}")
+    """Set user post data
+
+    Plain dicts, such as the empty one get_user_data returns when there is
+    no draft, are stored as PostDraft; an empty one stores nothing.
+    """
+    if not isinstance(data, PostDraft):
+        if not data:
+            user_post_data.delete(user_id)
+            return
+        data = PostDraft.from_dict(data)
+    user_post_data.set(user_id, data)
 
 def clear_user_data(user_id):
     """Clear user post data"""
-    if user_id in user_post_data:
-        del user_post_data[user_id]
+    user_post_data.delete(user_id)
 
 def init_user_data(user_id):
     """Initialize user post data with default values"""
-    user_post_data[user_id] = {
-        "text": "",
-        "media": [],
-        "buttons": [],
-        "pin_post": False,
-        "notifications": True,
-        "link_preview": True,
-        "state": "main_post_menu"
-    }
+    user_post_data.set(user_id, PostDraft())
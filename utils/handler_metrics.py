@@ -0,0 +1,220 @@
+"""
+Per-handler latency metrics for PostBot
+Every update is timed from the dispatcher and recorded under its handler,
+update type and outcome, together with the time it spent waiting on the
+Telegram API and on MongoDB. Durations go into log-bucketed histograms,
+so memory depends on the number of handlers, not on traffic.
+"""
+import contextvars
+import time
+from array import array
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from pymongo import monitoring
+
+# Sub-bucket precision: 3 bits, so every bucket is within 12.5% of its values
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Durations are kept in microseconds and capped at ~134 seconds
+MAX_MICROS = (1 << 27) - 1
+BUCKETS = (MAX_MICROS.bit_length() - SUB_BUCKET_BITS) * SUB_BUCKETS + SUB_BUCKETS
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def _bucket_index(micros: int) -> int:
+    if micros < 2 * SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKETS + (micros >> shift)
+
+
+def _bucket_upper(index: int) -> int:
+    """Highest microsecond value recorded in a bucket"""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index - shift * SUB_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """HDR-style histogram of durations in a fixed array of counters"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        micros = min(int(seconds * 1_000_000), MAX_MICROS)
+        self.counts[_bucket_index(micros)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound in seconds below which `fraction` of the values fall"""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_upper(index) / 1_000_000, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        summary = {f"p{fraction * 100:g}": self.percentile(fraction) for fraction in PERCENTILES}
+        summary["mean"] = self.total / self.count if self.count else 0.0
+        summary["max"] = self.max
+        return summary
+
+
+class _UpdateTiming:
+    """Time one update spent in its handler, the Telegram API and MongoDB"""
+
+    __slots__ = ("handler", "telegram", "db")
+
+    def __init__(self):
+        self.handler = None
+        self.telegram = 0.0
+        self.db = 0.0
+
+
+class _HandlerStats:
+    __slots__ = ("latency", "telegram", "db")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.telegram = LatencyHistogram()
+        self.db = LatencyHistogram()
+
+
+# Timing of the update being handled; copied into tasks and motor's executor
+_current_update = contextvars.ContextVar("current_update", default=None)
+
+
+class HandlerMetrics:
+    """Histograms per (handler, update type, outcome)"""
+
+    def __init__(self):
+        self.stats = {}
+        self.started_at = time.time()
+
+    def label(self, handler):
+        """Name the handler of the current update; used by the routing middlewares"""
+        timing = _current_update.get()
+        if timing is not None:
+            timing.handler = handler.__name__
+
+    def record(self, handler: str, update_type: str, outcome: str, latency: float, timing: _UpdateTiming):
+        key = (handler, update_type, outcome)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = _HandlerStats()
+        stats.latency.record(latency)
+        stats.telegram.record(timing.telegram)
+        stats.db.record(timing.db)
+
+    def get_metrics(self) -> list:
+        """Per-handler percentiles, busiest first"""
+        metrics = [
+            {
+                "handler": handler,
+                "update_type": update_type,
+                "outcome": outcome,
+                "count": stats.latency.count,
+                "latency": stats.latency.summary(),
+                "telegram": stats.telegram.summary(),
+                "db": stats.db.summary()
+            }
+            for (handler, update_type, outcome), stats in self.stats.items()
+        ]
+        metrics.sort(key=lambda entry: entry["count"], reverse=True)
+        return metrics
+
+
+class UpdateTimingMiddleware(BaseMiddleware):
+    """Outer update middleware timing every update end to end"""
+
+    def __init__(self, handler_metrics: HandlerMetrics):
+        self.handler_metrics = handler_metrics
+
+    async def __call__(self, handler, event, data):
+        timing = _UpdateTiming()
+        token = _current_update.set(timing)
+        outcome = "ok"
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+            if result is UNHANDLED:
+                outcome = "unhandled"
+            return result
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            latency = time.perf_counter() - started
+            _current_update.reset(token)
+            name = timing.handler or ("-" if outcome == "unhandled" else "middleware")
+            self.handler_metrics.record(name, event.event_type, outcome, latency, timing)
+
+
+class HandlerLabelMiddleware(BaseMiddleware):
+    """Inner middleware naming handlers matched by aiogram's own filters"""
+
+    def __init__(self, handler_metrics: HandlerMetrics):
+        self.handler_metrics = handler_metrics
+
+    async def __call__(self, handler, event, data):
+        self.handler_metrics.label(data["handler"].callback)
+        return await handler(event, data)
+
+
+class TelegramTimingMiddleware(BaseRequestMiddleware):
+    """Session middleware adding API time, pacing included, to the current update"""
+
+    async def __call__(self, make_request, bot, method):
+        timing = _current_update.get()
+        if timing is None:
+            return await make_request(bot, method)
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            timing.telegram += time.perf_counter() - started
+
+
+class DatabaseTimingListener(monitoring.CommandListener):
+    """pymongo command listener adding MongoDB time to the current update"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._add(event.duration_micros)
+
+    def failed(self, event):
+        self._add(event.duration_micros)
+
+    @staticmethod
+    def _add(duration_micros: int):
+        # Runs in motor's executor, which carries the caller's context
+        timing = _current_update.get()
+        if timing is not None:
+            timing.db += duration_micros / 1_000_000
+
+
+# Global handler metrics instance
+handler_metrics = HandlerMetrics()
+update_timing = UpdateTimingMiddleware(handler_metrics)
+handler_labels = HandlerLabelMiddleware(handler_metrics)
+telegram_timing = TelegramTimingMiddleware()
+database_timing = DatabaseTimingListener()
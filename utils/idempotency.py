@@ -0,0 +1,94 @@
+"""
+Publish idempotency for PostBot
+A publish is keyed by (user, draft id). Keys live in a
+short-TTL in-memory map and in a Mongo collection with a unique _id, so a
+double-tap or a redelivered callback gets the original job instead of a
+second fan-out.
+"""
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from config import Config
+from db import db
+
+# Marker for a key whose publish is still being submitted
+IN_FLIGHT = ""
+
+
+def publish_key(user_id: int, draft_id: str) -> str:
+    """Idempotency key for publishing this draft; a draft is only ever queued once"""
+    return hashlib.sha1(f"{user_id}\x00{draft_id}".encode()).hexdigest()
+
+
+class PublishDeduplicator:
+    """Remembers recent publish keys and the job each one started"""
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl or Config.PUBLISH_DEDUPE_TTL
+        # key -> (job_id, expires_at)
+        self.keys = {}
+        self.duplicates = 0
+
+    async def ensure_indexes(self):
+        """Let Mongo expire old keys"""
+        await db.publish_keys.create_index("created_at", expireAfterSeconds=self.ttl)
+
+    def _prune(self, now: float):
+        for key in [key for key, (_, expires_at) in self.keys.items() if expires_at <= now]:
+            del self.keys[key]
+
+    async def claim(self, key: str):
+        """Reserve a key for a new publish
+
+        Returns:
+            None if the caller should publish, otherwise the job id of the
+            earlier publish (IN_FLIGHT while it is still being submitted)
+        """
+        now = time.monotonic()
+        self._prune(now)
+
+        # Checked and reserved without awaiting, so concurrent taps in this
+        # process can't both get through
+        if key in self.keys:
+            self.duplicates += 1
+            return self.keys[key][0]
+        self.keys[key] = (IN_FLIGHT, now + self.ttl)
+
+        # The unique _id catches duplicates across restarts and processes
+        try:
+            try:
+                await db.publish_keys.insert_one({"_id": key, "job_id": IN_FLIGHT, "created_at": datetime.now()})
+            except DuplicateKeyError:
+                existing = await db.publish_keys.find_one({"_id": key})
+                if existing and existing["created_at"] > datetime.now() - timedelta(seconds=self.ttl):
+                    self.keys[key] = (existing["job_id"], now + self.ttl)
+                    self.duplicates += 1
+                    return existing["job_id"]
+                # Expired but not yet removed by the TTL monitor
+                await db.publish_keys.replace_one(
+                    {"_id": key},
+                    {"job_id": IN_FLIGHT, "created_at": datetime.now()},
+                    upsert=True
+                )
+        except Exception:
+            # Don't leave the key reserved for a publish that never started
+            self.keys.pop(key, None)
+            raise
+        return None
+
+    async def complete(self, key: str, job_id: str):
+        """Record the job a claimed key started"""
+        self.keys[key] = (job_id, time.monotonic() + self.ttl)
+        await db.publish_keys.update_one({"_id": key}, {"$set": {"job_id": job_id}})
+
+    async def release(self, key: str):
+        """Forget a claimed key whose publish never started"""
+        self.keys.pop(key, None)
+        await db.publish_keys.delete_one({"_id": key})
+
+
+# Global deduplicator instance
+publish_dedupe = PublishDeduplicator()
@@ -22,6 +22,7 @@ def get_post_creation_keyboard():
             [KeyboardButton(text="Add Buttons"), KeyboardButton(text="Pin Post")],
             [KeyboardButton(text="Toggle Notifications"), KeyboardButton(text="Link Preview")],
             [KeyboardButton(text="Preview Post"), KeyboardButton(text="Publish Post")],
+            [KeyboardButton(text="Schedule Post")],
             [KeyboardButton(text="Clear All"), KeyboardButton(text="Back")]
         ],
         resize_keyboard=True,
@@ -83,3 +84,19 @@ def create_inline_buttons_keyboard(buttons_list):
     for button in buttons_list:
         buttons.append([InlineKeyboardButton(text=button["text"], url=button["url"])])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+# Every reply keyboard label, so state input never swallows a menu button
+MENU_LABELS = frozenset(
+    button.text
+    for keyboard in (
+        get_main_menu_keyboard(),
+        get_post_creation_keyboard(),
+        get_chat_menu_keyboard(),
+        get_back_to_post_menu_keyboard(),
+        get_media_management_keyboard(),
+        get_button_management_keyboard(),
+        get_clear_confirmation_keyboard()
+    )
+    for row in keyboard.keyboard
+    for button in row
+)
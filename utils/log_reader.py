@@ -0,0 +1,115 @@
+"""
+Log search for PostBot's /logs command
+The current log is read backwards from its end in fixed-size blocks and
+the search stops as soon as enough matching lines are found. Rotated
+files are only opened when the newer ones don't have enough; gzipped ones
+are streamed forward keeping just the last matches. Within a block only
+the lines around each occurrence of the pattern are cut out. Memory stays
+at one block plus the lines returned, whatever the size of the log set.
+"""
+import gzip
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+from config import Config
+
+BLOCK_SIZE = 64 * 1024
+MAX_LINES = 1000
+# Stop scanning older files after this many seconds
+SEARCH_BUDGET = 10.0
+
+LOG_PATH = Path("logs") / Config.LOG_FILE
+
+
+def log_files(path: Path = LOG_PATH) -> list:
+    """The log and its rotated copies, newest first"""
+    rotated = {}
+    for candidate in path.parent.glob(path.name + ".*"):
+        suffix = candidate.name[len(path.name) + 1:].removesuffix(".gz")
+        if suffix.isdigit():
+            rotated.setdefault(int(suffix), candidate)
+    files = [path] if path.exists() else []
+    return files + [rotated[index] for index in sorted(rotated)]
+
+
+def _matching_lines(block: bytes, needle: bytes) -> list:
+    """Non-empty lines of a block containing `needle`, in file order"""
+    if not needle:
+        return [line for line in block.split(b"\n") if line]
+    # Jump between occurrences instead of testing every line
+    lowered = block.lower()
+    matches = []
+    position = lowered.find(needle)
+    while position != -1:
+        start = lowered.rfind(b"\n", 0, position) + 1
+        end = lowered.find(b"\n", position)
+        if end == -1:
+            end = len(lowered)
+        matches.append(block[start:end])
+        position = lowered.find(needle, end)
+    return matches
+
+
+def _tail_plain(path: Path, count: int, needle: bytes) -> list:
+    """Last `count` matching lines of a plain file, newest first"""
+    found = []
+    with open(path, "rb") as file:
+        position = file.seek(0, os.SEEK_END)
+        carry = b""
+        while position > 0 and len(found) < count:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            file.seek(position)
+            block = file.read(size) + carry
+            # The first piece may continue in the block before this one
+            if position > 0:
+                carry, _, block = block.partition(b"\n")
+            else:
+                carry = b""
+            matches = _matching_lines(block, needle)
+            found.extend(reversed(matches[-(count - len(found)):]))
+    return found
+
+
+def _tail_gzip(path: Path, count: int, needle: bytes) -> list:
+    """Last `count` matching lines of a gzipped file, newest first"""
+    found = deque(maxlen=count)
+    with gzip.open(path, "rb") as file:
+        carry = b""
+        while True:
+            chunk = file.read(BLOCK_SIZE)
+            if not chunk:
+                block, carry = carry, b""
+            else:
+                block, _, carry = (carry + chunk).rpartition(b"\n")
+            found.extend(_matching_lines(block, needle))
+            if not chunk:
+                break
+    found.reverse()
+    return list(found)
+
+
+def search_logs(count: int, pattern: str = "", path: Path = LOG_PATH) -> tuple:
+    """(last `count` lines containing `pattern`, oldest first; files scanned)
+
+    Substring match, case-insensitive for ASCII. Blocking; run it in a worker thread.
+    """
+    count = max(1, min(count, MAX_LINES))
+    needle = pattern.lower().encode()
+    deadline = time.monotonic() + SEARCH_BUDGET
+    found = []
+    scanned = 0
+    for file_path in log_files(path):
+        if len(found) >= count or time.monotonic() > deadline:
+            break
+        tail = _tail_gzip if file_path.suffix == ".gz" else _tail_plain
+        try:
+            found.extend(tail(file_path, count - len(found), needle))
+        except (OSError, EOFError):
+            # Rotated or compressed away while we were reading it
+            continue
+        scanned += 1
+    found.reverse()
+    return [line.decode("utf-8", errors="replace") for line in found], scanned
@@ -1,21 +1,137 @@
 """
 Logging utility for PostBot
-Enhanced logging with file rotation and formatting
+Enhanced logging with file rotation and formatting. Loggers only put
+records on a queue; a background listener thread formats them and does
+the file and console I/O, so logging never blocks the event loop.
+
+Bot events are structured: a name plus key/value fields, rendered only on
+the listener thread, both as a text line and as one JSON object per line
+in the event log. Noisy event types can be sampled with LOG_SAMPLE_RATES;
+warnings and errors are always kept. Rotated files are gzipped on a
+worker thread.
 """
+import atexit
+import gzip
+import json
 import logging
 import logging.handlers
 import os
+import queue
+import random
+import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
 
 from config import Config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    def _dumps(entry: dict) -> str:
+        return orjson.dumps(entry, default=str).decode()
+else:
+    _dumps = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":"), default=str).encode
+
+
+class LogEvent:
+    """Log message with an event name and fields, rendered when written"""
+
+    __slots__ = ("name", "fields", "template", "sample_rate")
+
+    def __init__(self, name: str, fields: dict, template: str = None, sample_rate: float = 1.0):
+        self.name = name
+        self.fields = fields
+        self.template = template
+        self.sample_rate = sample_rate
+
+    def __str__(self):
+        if self.template:
+            return self.template.format_map(self.fields)
+        return " | ".join([self.name.upper(), *(f"{key}={value}" for key, value in self.fields.items())])
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            "ts": f"{self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}.{int(record.msecs):03d}",
+            "level": record.levelname
+        }
+        message = record.msg
+        if isinstance(message, LogEvent):
+            entry["event"] = message.name
+            entry.update(message.fields)
+            if message.sample_rate < 1.0:
+                entry["sample_rate"] = message.sample_rate
+        else:
+            entry["event"] = "message"
+            entry["message"] = record.getMessage()
+            entry["source"] = f"{record.module}:{record.lineno}"
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return _dumps(entry)
+
+
+class EventQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler leaving event records for the listener to render"""
+
+    def prepare(self, record):
+        # The queue never leaves the process, so the record can go as is
+        if isinstance(record.msg, LogEvent):
+            return record
+        return super().prepare(record)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    """Move the full log aside and compress it without holding up the listener"""
+    plain = dest[:-len(".gz")]
+    os.replace(source, plain)
+    threading.Thread(target=_gzip_file, args=(plain, dest), name="log-compress").start()
+
+
+def _gzip_file(plain: str, dest: str):
+    partial = dest + ".part"
+    try:
+        with open(plain, "rb") as source, gzip.open(partial, "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(partial, dest)
+        os.remove(plain)
+    except OSError as e:
+        logging.getLogger("postbot").error(f"Log compression failed for {plain}: {e}")
+
+
+def _rotating_handler(filename: Path) -> logging.handlers.RotatingFileHandler:
+    handler = logging.handlers.RotatingFileHandler(
+        filename=filename,
+        maxBytes=10 * 1024 * 1024,  # 10MB
+        backupCount=5,
+        encoding='utf-8'
+    )
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    return handler
+
 class BotLogger:
     """Enhanced logger for PostBot"""
     
     def __init__(self, name: str = "postbot"):
         self.name = name
         self.logger = None
+        self.listener = None
+        # Event name -> share of INFO/DEBUG events kept; Config.validate() reports a malformed value
+        try:
+            self.sample_rates = Config.get_log_sample_rates()
+        except ValueError:
+            self.sample_rates = {}
         self._setup_logger()
     
     def _setup_logger(self):
@@ -30,13 +146,9 @@ class BotLogger:
         logs_dir = Path("logs")
         logs_dir.mkdir(exist_ok=True)
         
-        # File handler with rotation
-        file_handler = logging.handlers.RotatingFileHandler(
-            filename=logs_dir / Config.LOG_FILE,
-            maxBytes=10 * 1024 * 1024,  # 10MB
-            backupCount=5,
-            encoding='utf-8'
-        )
+        # File handlers with rotation; rotated files are gzipped
+        file_handler = _rotating_handler(logs_dir / Config.LOG_FILE)
+        event_handler = _rotating_handler(logs_dir / Config.EVENT_LOG_FILE)
         
         # Console handler
         console_handler = logging.StreamHandler()
@@ -53,76 +165,99 @@ class BotLogger:
         
         # Set formatters
         file_handler.setFormatter(detailed_formatter)
+        event_handler.setFormatter(JsonFormatter())
         console_handler.setFormatter(simple_formatter)
         
-        # Add handlers
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        # Handlers run on the listener thread; the logger only enqueues
+        log_queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(log_queue, file_handler, event_handler, console_handler)
+        self.logger.addHandler(EventQueueHandler(log_queue))
+        # The console handler is ours; don't repeat records on the root logger's
+        self.logger.propagate = False
+        self.listener.start()
+        # Flush queued records on shutdown
+        atexit.register(self.listener.stop)
     
     def get_logger(self):
         """Get the configured logger"""
         return self.logger
     
+    def log_event(self, name: str, level: int = logging.INFO, template: str = None, exc_info=None, **fields):
+        """Log a structured event; fields are only rendered if it is kept"""
+        rate = self.sample_rates.get(name, 1.0)
+        if level < logging.WARNING and rate < 1.0 and random.random() >= rate:
+            return
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, LogEvent(name, fields, template, rate), exc_info=exc_info)
+    
     def log_user_action(self, user_id: int, action: str, details: str = ""):
         """Log user actions with standardized format"""
-        message = f"User {user_id} | {action}"
         if details:
-            message += f" | {details}"
-        self.logger.info(message)
+            self.log_event("user_action", template="User {user_id} | {action} | {details}",
+                           user_id=user_id, action=action, details=details)
+        else:
+            self.log_event("user_action", template="User {user_id} | {action}", user_id=user_id, action=action)
     
     def log_error(self, error: Exception, context: str = ""):
         """Log errors with context"""
-        message = f"ERROR: {str(error)}"
-        if context:
-            message = f"{context} | {message}"
-        self.logger.error(message, exc_info=True)
+        template = "{context} | ERROR: {error}" if context else "ERROR: {error}"
+        self.log_event("error", logging.ERROR, template, exc_info=True,
+                       error=str(error), error_type=type(error).__name__, context=context)
     
     def log_api_call(self, method: str, params: dict = None, success: bool = True):
         """Log API calls"""
         status = "SUCCESS" if success else "FAILED"
-        message = f"API {method} | {status}"
         if params:
-            message += f" | Params: {params}"
-        self.logger.info(message)
+            self.log_event("api_call", template="API {method} | {status} | Params: {params}",
+                           method=method, status=status, params=params)
+        else:
+            self.log_event("api_call", template="API {method} | {status}", method=method, status=status)
     
     def log_database_operation(self, operation: str, collection: str, success: bool = True, count: int = None):
         """Log database operations"""
         status = "SUCCESS" if success else "FAILED"
-        message = f"DB {operation} | {collection} | {status}"
         if count is not None:
-            message += f" | Count: {count}"
-        self.logger.info(message)
+            self.log_event("db_operation", template="DB {operation} | {collection} | {status} | Count: {count}",
+                           operation=operation, collection=collection, status=status, count=count)
+        else:
+            self.log_event("db_operation", template="DB {operation} | {collection} | {status}",
+                           operation=operation, collection=collection, status=status)
     
     def log_system_event(self, event: str, details: str = ""):
         """Log system events"""
-        message = f"SYSTEM | {event}"
         if details:
-            message += f" | {details}"
-        self.logger.info(message)
+            self.log_event("system", template="SYSTEM | {message} | {details}", message=event, details=details)
+        else:
+            self.log_event("system", template="SYSTEM | {message}", message=event)
 
-# Global logger instance
-logger = BotLogger().get_logger()
+# Global logger instance, set up once per process
+bot_logger = BotLogger()
+logger = bot_logger.get_logger()
 
 # Convenience functions
+def log_event(name: str, level: int = logging.INFO, **fields):
+    """Log a structured event, e.g. log_event("post_published", user_id=1, channels=3)"""
+    bot_logger.log_event(name, level, **fields)
+
 def log_user_action(user_id: int, action: str, details: str = ""):
     """Log user actions"""
-    BotLogger().log_user_action(user_id, action, details)
+    bot_logger.log_user_action(user_id, action, details)
 
 def log_error(error: Exception, context: str = ""):
     """Log errors with context"""
-    BotLogger().log_error(error, context)
+    bot_logger.log_error(error, context)
 
 def log_api_call(method: str, params: dict = None, success: bool = True):
     """Log API calls"""
-    BotLogger().log_api_call(method, params, success)
+    bot_logger.log_api_call(method, params, success)
 
 def log_database_operation(operation: str, collection: str, success: bool = True, count: int = None):
     """Log database operations"""
-    BotLogger().log_database_operation(operation, collection, success, count)
+    bot_logger.log_database_operation(operation, collection, success, count)
 
 def log_system_event(event: str, details: str = ""):
     """Log system events"""
-    BotLogger().log_system_event(event, details)
+    bot_logger.log_system_event(event, details)
 
 # Performance logging decorator
 def log_performance(func_name: str):
@@ -0,0 +1,56 @@
+"""
+Menu button routing for PostBot
+Reply keyboard buttons are dispatched through one exact-text table instead
+of a router filter per button. Labels come from utils/keyboards.py: a
+handler for a label that is on no keyboard, a second handler for the same
+label, or a keyboard label without a handler is an error.
+"""
+from aiogram import BaseMiddleware
+
+from utils.handler_metrics import handler_metrics
+from utils.keyboards import MENU_LABELS
+
+
+class MenuRouter:
+    """Maps reply keyboard labels to their handlers"""
+
+    def __init__(self, labels=MENU_LABELS):
+        self.labels = labels
+        self.handlers = {}
+
+    def button(self, label: str):
+        """Register the handler for a menu button"""
+        if label not in self.labels:
+            raise ValueError(f"Menu button {label!r} is not on any keyboard in utils/keyboards.py")
+
+        def decorator(handler):
+            if label in self.handlers:
+                raise ValueError(f"Menu button {label!r} is already handled by {self.handlers[label].__name__}")
+            self.handlers[label] = handler
+            return handler
+        return decorator
+
+    def check(self):
+        """Fail startup if a keyboard shows a button nothing handles"""
+        missing = self.labels - self.handlers.keys()
+        if missing:
+            raise RuntimeError(f"Menu buttons without a handler: {', '.join(sorted(missing))}")
+
+
+class MenuRoutingMiddleware(BaseMiddleware):
+    """Outer message middleware dispatching menu buttons by exact text"""
+
+    def __init__(self, menu_router: MenuRouter):
+        self.menu_router = menu_router
+
+    async def __call__(self, handler, event, data):
+        menu_handler = self.menu_router.handlers.get(event.text) if event.text else None
+        if menu_handler is not None:
+            handler_metrics.label(menu_handler)
+            return await menu_handler(event)
+        return await handler(event, data)
+
+
+# Global menu router instance
+menu_router = MenuRouter()
+menu_routing = MenuRoutingMiddleware(menu_router)
@@ -0,0 +1,166 @@
+"""
+Post drafts for PostBot
+A draft is a slotted object instead of a free-form dict, with media and
+buttons kept as tuples of small named tuples. Handlers keep using
+dict-style access (draft["text"], draft.get("media")), and drafts are
+turned back into the plain document layout wherever they are stored in
+MongoDB.
+"""
+import marshal
+import uuid
+from collections import namedtuple
+from datetime import datetime
+
+# Bumped whenever the binary layout changes
+FORMAT_VERSION = 2
+
+
+class _FieldAccess:
+    """Read fields by name, so renderers accept these and stored dicts alike"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+
+class MediaItem(_FieldAccess, namedtuple("MediaItem", "type file_id caption")):
+    __slots__ = ()
+
+
+class Button(_FieldAccess, namedtuple("Button", "text url")):
+    __slots__ = ()
+
+
+def _media_item(item) -> MediaItem:
+    if isinstance(item, MediaItem):
+        return item
+    return MediaItem(item["type"], item["file_id"], item.get("caption", ""))
+
+
+def _button(button) -> Button:
+    if isinstance(button, Button):
+        return button
+    return Button(button["text"], button["url"])
+
+
+class PostDraft:
+    """One user's post being composed"""
+
+    __slots__ = (
+        "text", "media", "buttons", "pin_post", "notifications", "link_preview",
+        "state", "schedule_at", "selected_channels", "temp_button_text", "draft_id"
+    )
+
+    def __init__(self, text: str = "", media: tuple = (), buttons: tuple = (),
+                 pin_post: bool = False, notifications: bool = True, link_preview: bool = True,
+                 state: str = "main_post_menu", schedule_at: datetime = None,
+                 selected_channels: list = None, temp_button_text: str = None, draft_id: str = None):
+        self.text = text
+        self.media = tuple(media)
+        self.buttons = tuple(buttons)
+        self.pin_post = pin_post
+        self.notifications = notifications
+        self.link_preview = link_preview
+        self.state = state
+        self.schedule_at = schedule_at
+        self.selected_channels = selected_channels
+        self.temp_button_text = temp_button_text
+        # Identifies this draft across publish attempts; a new draft gets a new id
+        self.draft_id = draft_id or uuid.uuid4().hex
+
+    # Dict-style access for the handlers; None means "not set"
+
+    def __getitem__(self, key):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(f"PostDraft has no field {key!r}")
+        if key == "media":
+            value = tuple(_media_item(item) for item in value)
+        elif key == "buttons":
+            value = tuple(_button(button) for button in value)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        setattr(self, key, None)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        if key in self:
+            setattr(self, key, None)
+        return value
+
+    def keys(self) -> list:
+        return [key for key in self.__slots__ if getattr(self, key) is not None]
+
+    def to_dict(self) -> dict:
+        """Plain document layout used by publish batches and scheduled posts"""
+        document = {key: getattr(self, key) for key in self.keys()}
+        document["media"] = [item._asdict() for item in self.media]
+        document["buttons"] = [button._asdict() for button in self.buttons]
+        return document
+
+    @classmethod
+    def from_dict(cls, document: dict) -> "PostDraft":
+        """Draft from the plain document layout; unknown fields are ignored"""
+        draft = cls()
+        for key, value in document.items():
+            if key in cls.__slots__ and value is not None:
+                draft[key] = value
+        return draft
+
+    # Binary form for persistent session stores
+
+    def to_bytes(self) -> bytes:
+        return marshal.dumps((
+            FORMAT_VERSION, self.text, tuple(tuple(item) for item in self.media),
+            tuple(tuple(button) for button in self.buttons), self.pin_post,
+            self.notifications, self.link_preview, self.state,
+            self.schedule_at.timestamp() if self.schedule_at else None,
+            self.selected_channels, self.temp_button_text, self.draft_id
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PostDraft":
+        # Only ever fed data PostBot itself wrote to its session store
+        fields = marshal.loads(data)
+        version = fields[0]
+        if version == 1:
+            # Drafts stored before draft ids existed get a fresh one
+            fields += (None,)
+        elif version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported draft format {version}")
+        (_, text, media, buttons, pin_post, notifications, link_preview,
+         state, schedule_at, selected_channels, temp_button_text, draft_id) = fields
+        return cls(
+            text, [MediaItem(*item) for item in media], [Button(*button) for button in buttons],
+            pin_post, notifications, link_preview, state,
+            datetime.fromtimestamp(schedule_at) if schedule_at is not None else None,
+            selected_channels, temp_button_text, draft_id
+        )
+
+
+def post_document(user_data) -> dict:
+    """Plain dict for a draft or an already plain post"""
+    return user_data.to_dict() if isinstance(user_data, PostDraft) else user_data
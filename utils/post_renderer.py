@@ -0,0 +1,165 @@
+"""
+Compile-once post rendering for multi-channel publishing
+A draft is validated and turned into ready-to-send API method objects once;
+each channel send only fills in its chat_id.
+"""
+from aiogram.enums import ParseMode
+from aiogram.methods import PinChatMessage, SendDocument, SendMediaGroup, SendMessage, SendPhoto, SendVideo
+from aiogram.types import InputMediaPhoto, InputMediaVideo
+
+from utils.keyboards import create_inline_buttons_keyboard
+from utils.logger import logger
+
+# Placeholder chat id used in templates, replaced for every channel
+TEMPLATE_CHAT_ID = 0
+
+# Single media type -> (method class, media field name)
+SINGLE_MEDIA_METHODS = {
+    "photo": (SendPhoto, "photo"),
+    "video": (SendVideo, "video"),
+    "document": (SendDocument, "document")
+}
+
+# Media types that can go into a media group
+GROUP_MEDIA_TYPES = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo
+}
+
+
+class RenderedPost:
+    """Ready-to-send API calls for one post"""
+
+    __slots__ = ("post_method", "buttons_method", "pin_post", "disable_notification")
+
+    def __init__(self, post_method, buttons_method=None, pin_post=False, disable_notification=False):
+        self.post_method = post_method
+        self.buttons_method = buttons_method
+        self.pin_post = pin_post
+        self.disable_notification = disable_notification
+
+    @property
+    def is_media_group(self) -> bool:
+        """True when the post is sent as an album"""
+        return isinstance(self.post_method, SendMediaGroup)
+
+    async def send(self, bot, chat_id, sent_messages: list = None, on_post_sent=None) -> list:
+        """Send the post to one chat
+
+        Args:
+            sent_messages: Post messages of an earlier attempt that already
+                went out; only the follow-ups are sent again
+            on_post_sent: Awaited with the post messages before a follow-up
+                buttons message is sent, so the caller can record them and
+                a retry resumes instead of posting the album twice
+
+        Returns:
+            Every message sent, post message(s) first and the follow-up
+            buttons message (if any) last
+        """
+        if sent_messages is None:
+            result = await bot(self.post_method.model_copy(update={"chat_id": chat_id}))
+
+            # Media groups return a list; the first item carries the caption
+            sent_messages = list(result) if isinstance(result, list) else [result]
+
+            if self.buttons_method and on_post_sent:
+                await on_post_sent(sent_messages)
+        else:
+            sent_messages = list(sent_messages)
+
+        if self.buttons_method:
+            sent_messages.append(await bot(self.buttons_method.model_copy(update={"chat_id": chat_id})))
+
+        if self.pin_post and sent_messages:
+            try:
+                await bot(PinChatMessage(
+                    chat_id=chat_id,
+                    message_id=sent_messages[0].message_id,
+                    disable_notification=self.disable_notification
+                ))
+            except Exception as pin_error:
+                # Don't fail the publish for pin failures, just log it
+                logger.warning(f"Failed to pin message in {chat_id}: {pin_error}")
+
+        return sent_messages
+
+
+def render_post(user_data: dict) -> RenderedPost:
+    """Validate a draft and build its API calls once
+
+    Raises:
+        Exception: If the draft has nothing to publish or unsupported media
+    """
+    text = user_data.get("text") or ""
+    media = user_data.get("media") or []
+    has_text = bool(text.strip())
+
+    if not has_text and not media:
+        raise Exception("No content to publish - both text and media are empty")
+
+    inline_keyboard = create_inline_buttons_keyboard(user_data.get("buttons", []))
+    disable_notification = not user_data.get("notifications", True)
+    buttons_method = None
+
+    if len(media) == 1:
+        # Single media file
+        media_item = media[0]
+        if media_item["type"] not in SINGLE_MEDIA_METHODS:
+            raise Exception(f"Unsupported media type: {media_item['type']}")
+
+        method_class, media_field = SINGLE_MEDIA_METHODS[media_item["type"]]
+        post_method = method_class(**{
+            "chat_id": TEMPLATE_CHAT_ID,
+            media_field: media_item["file_id"],
+            "caption": text,
+            "reply_markup": inline_keyboard,
+            "parse_mode": ParseMode.HTML,
+            "disable_notification": disable_notification
+        })
+
+    elif len(media) > 1:
+        # Multiple media files - send as media group
+        media_group = []
+        for i, media_item in enumerate(media[:10]):  # Telegram limit is 10
+            input_media_class = GROUP_MEDIA_TYPES.get(media_item["type"])
+            if input_media_class:
+                media_group.append(input_media_class(
+                    media=media_item["file_id"],
+                    caption=text if i == 0 else None,
+                    parse_mode=ParseMode.HTML if i == 0 and text else None
+                ))
+
+        post_method = SendMediaGroup(
+            chat_id=TEMPLATE_CHAT_ID,
+            media=media_group,
+            disable_notification=disable_notification
+        )
+
+        # Media groups can't carry inline keyboards
+        if inline_keyboard:
+            buttons_method = SendMessage(
+                chat_id=TEMPLATE_CHAT_ID,
+                text="*Action buttons for the post above*",
+                reply_markup=inline_keyboard,
+                parse_mode=ParseMode.MARKDOWN,
+                disable_notification=disable_notification
+            )
+
+    else:
+        # Text only
+        post_method = SendMessage(
+            chat_id=TEMPLATE_CHAT_ID,
+            text=text,
+            reply_markup=inline_keyboard,
+            parse_mode=ParseMode.HTML,
+            disable_notification=disable_notification,
+            disable_web_page_preview=not user_data.get("link_preview", True)
+        )
+
+    return RenderedPost(
+        post_method,
+        buttons_method=buttons_method,
+        pin_post=user_data.get("pin_post", False),
+        disable_notification=disable_notification
+    )
@@ -0,0 +1,91 @@
+"""
+Throttled progress reporting for long-running fan-outs
+Status message edits are coalesced to at most one per interval and edits
+that would not change the text are skipped, so live counts cost a bounded
+number of API calls no matter how many updates are reported.
+"""
+import asyncio
+import time
+
+from aiogram.enums import ParseMode
+
+from config import Config
+from utils.logger import logger
+
+
+class ProgressReporter:
+    """Coalescing editor for one status message"""
+
+    def __init__(self, bot, chat_id: int, message_id: int, interval: float = None, parse_mode: str = ParseMode.HTML):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = Config.PROGRESS_EDIT_INTERVAL if interval is None else interval
+        self.parse_mode = parse_mode
+
+        self.last_text = None
+        self.last_edit = 0.0
+        self.pending_text = None
+        self.flush_task = None
+        self.lock = asyncio.Lock()
+
+        self.edits = 0
+        self.coalesced = 0
+
+    def update(self, text: str):
+        """Report new progress; the edit happens at most once per interval"""
+        if self.pending_text is not None:
+            self.coalesced += 1
+        self.pending_text = text
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        """Apply the latest pending text, waiting out the interval first"""
+        while self.pending_text is not None:
+            delay = self.last_edit + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            text, self.pending_text = self.pending_text, None
+            await self._edit(text)
+
+    async def _edit(self, text: str) -> bool:
+        """Edit the status message unless it already shows ``text``"""
+        async with self.lock:
+            if text == self.last_text:
+                return True
+            try:
+                await self.bot.edit_message_text(
+                    text,
+                    chat_id=self.chat_id,
+                    message_id=self.message_id,
+                    parse_mode=self.parse_mode
+                )
+            except Exception as e:
+                if "message is not modified" in str(e).lower():
+                    self.last_text = text
+                    return True
+                logger.warning(f"Progress edit in {self.chat_id} failed: {e}")
+                return False
+            finally:
+                self.last_edit = time.monotonic()
+            self.last_text = text
+            self.edits += 1
+            return True
+
+    async def finish(self, text: str) -> bool:
+        """Drop pending updates and show the final text immediately
+
+        Returns:
+            False if the status message could not be edited
+        """
+        self.pending_text = None
+        if self.flush_task and not self.flush_task.done():
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+        if self.message_id is None:
+            return False
+        return await self._edit(text)
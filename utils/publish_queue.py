@@ -0,0 +1,376 @@
+"""
+Durable publish job queue for PostBot
+Publishes are stored in MongoDB as one job per (post, channel) and executed
+by a pool of async workers, so a restart mid fan-out resumes the remaining
+channels instead of dropping them. A claimed job is leased for
+PUBLISH_JOB_LEASE seconds; only a job whose lease ran out is taken over,
+so several bot instances can share the queue without posting twice.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.types import MessageId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from config import Config
+from db import db
+from utils.logger import logger, log_error, log_system_event
+from utils.post_draft import PostDraft, post_document
+from utils.post_renderer import render_post
+from utils.progress import ProgressReporter
+from utils.receipts import build_receipt, ensure_indexes, save_receipts
+from utils.idempotency import publish_dedupe
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Draft fields copied into each job so workers never depend on in-memory state
+POST_FIELDS = ("text", "media", "buttons", "pin_post", "notifications", "link_preview")
+
+# Errors worth retrying; anything else (bad request, forbidden) fails the job
+TRANSIENT_ERRORS = (TelegramNetworkError, TelegramServerError, asyncio.TimeoutError, ConnectionError)
+
+POLL_INTERVAL = 5  # seconds between queue polls when idle
+MAX_BACKOFF = 300  # seconds
+
+
+class PublishQueue:
+    """MongoDB-backed publish queue with an async worker pool"""
+
+    def __init__(self, worker_count: int = None):
+        self.worker_count = worker_count or Config.PUBLISH_CONCURRENCY
+        self.bot = None
+        self.workers = []
+        self.wakeup = asyncio.Event()
+        # post_id -> RenderedPost, so a post is compiled once per fan-out
+        self.rendered = {}
+        # post_id -> ProgressReporter for the batch's status message
+        self.progress = {}
+
+    async def start(self, bot):
+        """Create indexes, recover unfinished jobs and start the workers"""
+        self.bot = bot
+
+        await db.publish_jobs.create_index([("status", ASCENDING), ("run_at", ASCENDING)])
+        await db.publish_jobs.create_index([("status", ASCENDING), ("claimed_at", ASCENDING)])
+        await db.publish_jobs.create_index("post_id")
+        await ensure_indexes()
+        await publish_dedupe.ensure_indexes()
+
+        # Running jobs may belong to another live instance; workers only take
+        # over the ones whose lease has expired
+        stale = await db.publish_jobs.count_documents(self._stale_filter())
+        pending = await db.publish_jobs.count_documents({"status": PENDING})
+
+        # Batches whose last job finished but whose report never ran
+        unreported = [
+            batch async for batch in db.publish_batches.find({"completed_at": None})
+            if batch["succeeded"] + batch["failed"] >= batch["total"]
+        ]
+        for batch in unreported:
+            try:
+                await self._report(batch)
+            except Exception as e:
+                log_error(e, f"Publish report for {batch['_id']} failed")
+
+        log_system_event(
+            "Publish queue started",
+            f"Workers: {self.worker_count}, Pending: {pending}, Stale: {stale}, "
+            f"Reported: {len(unreported)}"
+        )
+
+        for worker_id in range(self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker(worker_id)))
+
+    async def enqueue(
+        self,
+        user_id: int,
+        user_data: dict,
+        channels: list,
+        status_chat_id: int,
+        status_message_id: int,
+        post_id: str = None
+    ) -> str:
+        """Store one job per channel and return the publish job id
+
+        Idempotent for a given ``post_id``: the batch is upserted and jobs have
+        deterministic ids, so a call repeated after a crash fills in whatever
+        the first one did not store and queues nothing twice.
+        """
+        post_id = post_id or uuid.uuid4().hex
+        now = datetime.now()
+        post = {field: value for field, value in post_document(user_data).items() if field in POST_FIELDS}
+
+        # The batch goes first: a job finishing before its batch exists would lose its count
+        await db.publish_batches.update_one(
+            {"_id": post_id},
+            {"$setOnInsert": {
+                "user_id": user_id,
+                "total": len(channels),
+                "succeeded": 0,
+                "failed": 0,
+                "failures": [],
+                "channel_name": channels[0].get("title") if len(channels) == 1 else None,
+                "status_chat_id": status_chat_id,
+                "status_message_id": status_message_id,
+                "created_at": now,
+                "completed_at": None
+            }},
+            upsert=True
+        )
+        try:
+            await db.publish_jobs.insert_many([
+                {
+                    "_id": f"{post_id}:{index}",
+                    "post_id": post_id,
+                    "user_id": user_id,
+                    "channel": channel,
+                    "post": post,
+                    "status": PENDING,
+                    "attempts": 0,
+                    "run_at": now,
+                    "created_at": now,
+                    "last_error": None
+                }
+                for index, channel in enumerate(channels)
+            ], ordered=False)
+        except BulkWriteError as e:
+            # Jobs already stored by an earlier attempt are fine
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+
+        self.wakeup.set()
+        return post_id
+
+    async def set_status_message(self, post_id: str, status_message_id: int):
+        """Attach the status message of a batch queued without one"""
+        await db.publish_batches.update_one(
+            {"_id": post_id},
+            {"$set": {"status_message_id": status_message_id}}
+        )
+        reporter = self.progress.get(post_id)
+        if reporter is not None:
+            reporter.message_id = status_message_id
+
+    @staticmethod
+    def _stale_filter() -> dict:
+        """Running jobs whose claim outlived the lease, left by a dead worker"""
+        return {
+            "status": RUNNING,
+            "claimed_at": {"$lt": datetime.now() - timedelta(seconds=Config.PUBLISH_JOB_LEASE)}
+        }
+
+    async def _claim(self, worker_id: int):
+        """Atomically move the next due or abandoned job to running
+
+        Each claim gets a fresh token; a worker whose lease was taken over
+        finds its token gone and records nothing.
+        """
+        now = datetime.now()
+        return await db.publish_jobs.find_one_and_update(
+            {"$or": [{"status": PENDING, "run_at": {"$lte": now}}, self._stale_filter()]},
+            {
+                "$set": {"status": RUNNING, "claimed_at": now, "claim": uuid.uuid4().hex, "worker": worker_id},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _worker(self, worker_id: int):
+        """Claim and run jobs until cancelled"""
+        while True:
+            # Cleared before claiming, so a job enqueued during the claim still wakes us
+            self.wakeup.clear()
+            try:
+                job = await self._claim(worker_id)
+            except Exception as e:
+                log_error(e, "Publish job claim failed")
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job)
+            except Exception as e:
+                log_error(e, f"Publish job {job['_id']} crashed")
+
+    async def _run(self, job: dict):
+        """Publish a single job and record the outcome"""
+        from handlers.preview_publish import publish_post_to_channel
+
+        async def record_post(messages: list):
+            # A retry after this point only sends the buttons message and pin
+            await db.publish_jobs.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"sent_message_ids": [message.message_id for message in messages]}}
+            )
+
+        # Post messages an earlier attempt already delivered
+        sent = job.get("sent_message_ids")
+        resumed = [MessageId(message_id=message_id) for message_id in sent] if sent else None
+
+        try:
+            rendered = self.rendered.get(job["post_id"])
+            if rendered is None:
+                rendered = self.rendered[job["post_id"]] = render_post(job["post"])
+            sent_messages = await publish_post_to_channel(
+                self.bot, job["channel"], job["post"], rendered, sent_messages=resumed, on_post_sent=record_post
+            )
+        except TelegramRetryAfter as e:
+            # Flood control is not the job's fault, so it does not use up an attempt
+            await self._retry(job, e.retry_after, str(e), count_attempt=False)
+        except TRANSIENT_ERRORS as e:
+            if job["attempts"] < Config.PUBLISH_MAX_ATTEMPTS:
+                delay = min(2 ** job["attempts"], MAX_BACKOFF)
+                await self._retry(job, delay, str(e))
+            else:
+                await self._finish(job, FAILED, error=str(e))
+        except Exception as e:
+            await self._finish(job, FAILED, error=str(e))
+        else:
+            receipt = build_receipt(job["post"], job["channel"], sent_messages, rendered, job["user_id"], job["post_id"])
+            await self._finish(job, DONE, receipt=receipt)
+
+    async def _retry(self, job: dict, delay: float, error: str, count_attempt: bool = True):
+        """Put a job back in the queue after ``delay`` seconds"""
+        update = {
+            "$set": {
+                "status": PENDING,
+                "run_at": datetime.now() + timedelta(seconds=delay),
+                "last_error": error
+            }
+        }
+        if not count_attempt:
+            update["$inc"] = {"attempts": -1}
+        result = await db.publish_jobs.update_one({"_id": job["_id"], "claim": job["claim"]}, update)
+        if not result.matched_count:
+            return
+        logger.warning(f"Publish job {job['_id']} retrying in {delay}s: {error}")
+
+    async def _finish(self, job: dict, status: str, receipt: dict = None, error: str = None):
+        """Mark a job finished and report the publish once every job is done"""
+        result = await db.publish_jobs.update_one(
+            {"_id": job["_id"], "claim": job["claim"]},
+            {"$set": {
+                "status": status,
+                "receipt": receipt,
+                "last_error": error,
+                "finished_at": datetime.now()
+            }}
+        )
+        if not result.matched_count:
+            # The lease expired and another worker took the job over; it counts it
+            logger.warning(f"Publish job {job['_id']} was taken over; outcome {status} not recorded")
+            return
+
+        batch_update = {"$inc": {"succeeded" if status == DONE else "failed": 1}}
+        if status == FAILED:
+            batch_update["$push"] = {"failures": {"channel": job["channel"], "error": error or "Unknown error"}}
+
+        batch = await db.publish_batches.find_one_and_update(
+            {"_id": job["post_id"]},
+            batch_update,
+            return_document=ReturnDocument.AFTER
+        )
+        if not batch:
+            return
+        if batch["succeeded"] + batch["failed"] >= batch["total"]:
+            await self._report(batch)
+        else:
+            from handlers.channel_selection import format_publish_progress
+            self._reporter(batch).update(format_publish_progress(
+                batch["total"], batch["succeeded"], batch["failed"], batch["_id"], batch.get("channel_name")
+            ))
+
+    def _reporter(self, batch: dict) -> ProgressReporter:
+        reporter = self.progress.get(batch["_id"])
+        if reporter is None:
+            reporter = self.progress[batch["_id"]] = ProgressReporter(
+                self.bot, batch["status_chat_id"], batch["status_message_id"]
+            )
+        return reporter
+
+    async def _report(self, batch: dict):
+        """Save receipts and send the final publish summary to the user
+
+        Safe to run again for the same batch: receipts are keyed by job id.
+        """
+        from handlers.channel_selection import format_publish_summary
+
+        self.rendered.pop(batch["_id"], None)
+
+        # Persist receipts for every channel that succeeded in one bulk insert
+        if batch["succeeded"]:
+            receipts = [
+                {**job["receipt"], "_id": job["_id"]}
+                async for job in db.publish_jobs.find(
+                    {"post_id": batch["_id"], "status": DONE},
+                    {"receipt": 1}
+                )
+                if job.get("receipt")
+            ]
+            try:
+                await save_receipts(receipts)
+            except Exception as e:
+                log_error(e, f"Saving publish receipts for {batch['_id']} failed")
+        await db.publish_batches.update_one(
+            {"_id": batch["_id"]},
+            {"$set": {"completed_at": datetime.now()}}
+        )
+
+        result_text = format_publish_summary(
+            batch["total"], batch["succeeded"], batch["failures"], batch.get("channel_name")
+        )
+        reporter = self._reporter(batch)
+        self.progress.pop(batch["_id"], None)
+        if not await reporter.finish(result_text):
+            try:
+                await self.bot.send_message(batch["status_chat_id"], result_text, parse_mode=ParseMode.HTML)
+            except Exception as e:
+                log_error(e, f"Publish summary for {batch['_id']} could not be delivered")
+
+        if not batch["succeeded"]:
+            await self._restore_draft(batch)
+
+    async def _restore_draft(self, batch: dict):
+        """Give the post back as a draft when no channel got it, so it can be retried"""
+        from utils.data_store import user_post_data
+        from utils.keyboards import get_post_creation_keyboard
+
+        job = await db.publish_jobs.find_one({"post_id": batch["_id"]}, {"post": 1})
+        if not job:
+            return
+        user_id = batch["user_id"]
+        await user_post_data.load(user_id)
+        if user_id in user_post_data:
+            # The user has started another post since; don't overwrite it
+            return
+        user_post_data.set(user_id, PostDraft.from_dict(job["post"]))
+
+        try:
+            await self.bot.send_message(
+                batch["status_chat_id"],
+                "Your post was kept as a draft. Tap <b>Publish Post</b> to try again.",
+                parse_mode=ParseMode.HTML,
+                reply_markup=get_post_creation_keyboard()
+            )
+        except Exception as e:
+            log_error(e, f"Draft restore notice for {batch['_id']} could not be delivered")
+
+
+# Global publish queue instance, started in main.py
+publish_queue = PublishQueue()
@@ -0,0 +1,166 @@
+"""
+Outbound Telegram API rate limiting for PostBot
+Token buckets installed as an aiogram session middleware so every request
+made through the shared Bot (publish, broadcast, edit, connect) is paced
+against Telegram's global, per-chat and per-group budgets.
+"""
+import asyncio
+import time
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from config import Config
+from utils.logger import logger
+
+
+class TokenBucket:
+    """Token bucket with reservation semantics
+
+    Callers reserve a token immediately (the balance may go negative) and
+    sleep until their reservation is covered, so waiters are served in
+    arrival order without a lock.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at", "waits", "wait_time")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait for it"""
+        self._refill(time.monotonic())
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        delay = -self.tokens / self.rate
+        self.waits += 1
+        self.wait_time += delay
+        return delay
+
+    async def acquire(self):
+        """Wait until a token is available"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so the next token is available after ``seconds``"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def fill_level(self) -> float:
+        """Current fill level between 0 and 1"""
+        self._refill(time.monotonic())
+        return max(self.tokens, 0) / self.capacity
+
+    def is_idle(self) -> bool:
+        """True when the bucket is full and nobody is waiting on it"""
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class TelegramRateLimiter(BaseRequestMiddleware):
+    """Session middleware enforcing Telegram's outbound rate limits"""
+
+    # Read-only calls and long polling do not count against send limits
+    EXEMPT_PREFIXES = ("get",)
+
+    def __init__(
+        self,
+        global_rate: float = None,
+        chat_rate: float = None,
+        chat_burst: int = None,
+        group_per_minute: int = None,
+        max_tracked_chats: int = 10000
+    ):
+        global_rate = global_rate or Config.TELEGRAM_GLOBAL_RATE
+        self.chat_rate = chat_rate or Config.TELEGRAM_CHAT_RATE
+        self.chat_burst = chat_burst or Config.TELEGRAM_CHAT_BURST
+        self.group_per_minute = group_per_minute or Config.TELEGRAM_GROUP_RATE
+        self.max_tracked_chats = max_tracked_chats
+
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_buckets = {}
+        self.flood_waits = 0
+        # Wait totals carried over from pruned chat buckets
+        self.pruned_waits = 0
+        self.pruned_wait_time = 0.0
+
+    def _is_group(self, chat_id) -> bool:
+        """Groups, supergroups and channels have negative ids or @usernames"""
+        if isinstance(chat_id, str):
+            return chat_id.startswith("-") or not chat_id.isdigit()
+        return chat_id < 0
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= self.max_tracked_chats:
+                self._prune_idle_buckets()
+            if self._is_group(chat_id):
+                bucket = TokenBucket(self.group_per_minute / 60, self.group_per_minute)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_idle_buckets(self):
+        """Drop buckets that have fully refilled; they carry no state"""
+        for chat_id in [key for key, bucket in self.chat_buckets.items() if bucket.is_idle()]:
+            bucket = self.chat_buckets.pop(chat_id)
+            self.pruned_waits += bucket.waits
+            self.pruned_wait_time += bucket.wait_time
+
+    async def __call__(self, make_request, bot, method):
+        api_method = getattr(method, "__api_method__", "")
+        if api_method.startswith(self.EXEMPT_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        chat_bucket = self._chat_bucket(chat_id) if chat_id is not None else None
+
+        # Wait on the chat first so a slow chat does not hold global tokens
+        if chat_bucket:
+            await chat_bucket.acquire()
+        await self.global_bucket.acquire()
+
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            self.flood_waits += 1
+            if chat_bucket:
+                chat_bucket.pause(e.retry_after)
+            else:
+                self.global_bucket.pause(e.retry_after)
+            logger.warning(f"RATE LIMIT | {api_method} | flood wait {e.retry_after}s | chat {chat_id}")
+            raise
+
+    def get_metrics(self) -> dict:
+        """Bucket fill levels and accumulated wait times"""
+        chat_buckets = list(self.chat_buckets.values())
+        chat_waits = self.pruned_waits + sum(bucket.waits for bucket in chat_buckets)
+        chat_wait_time = self.pruned_wait_time + sum(bucket.wait_time for bucket in chat_buckets)
+        return {
+            "global_fill": round(self.global_bucket.fill_level(), 3),
+            "global_waits": self.global_bucket.waits,
+            "global_wait_seconds": round(self.global_bucket.wait_time, 3),
+            "tracked_chats": len(chat_buckets),
+            "throttled_chats": sum(1 for bucket in chat_buckets if bucket.fill_level() == 0),
+            "chat_waits": chat_waits,
+            "chat_wait_seconds": round(chat_wait_time, 3),
+            "flood_waits": self.flood_waits
+        }
+
+
+# Global limiter instance, installed on the Bot session in main.py
+rate_limiter = TelegramRateLimiter()
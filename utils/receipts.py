@@ -0,0 +1,72 @@
+"""
+Publish receipts for PostBot
+A compact record of every successful channel publish, stored in db.posts so
+edits can find the post again and /stats can count it.
+"""
+import hashlib
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+
+from db import db
+from utils.logger import log_database_operation
+
+
+def content_hash(post: dict) -> str:
+    """Stable hash of the publishable content of a post"""
+    digest = hashlib.sha1()
+    digest.update((post.get("text") or "").encode("utf-8"))
+    for media_item in post.get("media") or []:
+        digest.update(b"\x00" + media_item["type"].encode() + b":" + media_item["file_id"].encode())
+    for button in post.get("buttons") or []:
+        digest.update(b"\x01" + button["text"].encode("utf-8") + b"\x02" + button["url"].encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_receipt(post: dict, channel: dict, sent_messages: list, rendered, author_id: int, post_id: str = None) -> dict:
+    """Build the db.posts document for one channel publish"""
+    message_ids = [message.message_id for message in sent_messages]
+    has_buttons_message = rendered.buttons_method is not None
+
+    return {
+        "post_id": post_id,
+        "channel_id": channel.get("chat_id") or sent_messages[0].chat.id,
+        "message_id": message_ids[0],
+        # Every message of the post, so a forward of any album item resolves
+        "message_ids": message_ids,
+        "media_group_ids": (message_ids[:-1] if has_buttons_message else message_ids) if rendered.is_media_group else [],
+        "buttons_message_id": message_ids[-1] if has_buttons_message else None,
+        "content_hash": content_hash(post),
+        # Content is kept so the edit flow can show and reuse it
+        "content": post.get("text", ""),
+        "media": post.get("media", []),
+        "buttons": post.get("buttons", []),
+        "author_id": author_id,
+        "created_at": datetime.now()
+    }
+
+
+async def save_receipts(receipts: list) -> int:
+    """Write all receipts from one fan-out in a single round trip
+
+    Receipts carrying an ``_id`` that is already stored are skipped, so a
+    report re-run after a crash does not duplicate them.
+    """
+    if not receipts:
+        return 0
+    try:
+        result = await db.posts.insert_many(receipts, ordered=False)
+        inserted = len(result.inserted_ids)
+    except BulkWriteError as e:
+        if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+            raise
+        inserted = e.details["nInserted"]
+    log_database_operation("INSERT_MANY", "posts", count=inserted)
+    return inserted
+
+
+async def ensure_indexes():
+    """Indexes for edit lookups and post statistics"""
+    await db.posts.create_index([("channel_id", ASCENDING), ("message_ids", ASCENDING)])
+    await db.posts.create_index([("created_at", DESCENDING)])
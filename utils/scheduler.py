@@ -0,0 +1,209 @@
+"""
+Scheduled publishing for PostBot
+Scheduled posts are stored in MongoDB indexed on run_at. Only the next window
+of due posts is held in an in-process min-heap, and each post is claimed
+atomically before it is handed to the publish queue, so a restart never
+fires the same post twice.
+"""
+import asyncio
+import heapq
+import html
+import uuid
+from datetime import datetime, timedelta
+
+from aiogram.enums import ParseMode
+from pymongo import ASCENDING, ReturnDocument
+
+from db import db
+from utils.logger import logger, log_error, log_system_event
+from utils.post_draft import post_document
+from utils.publish_queue import POST_FIELDS, publish_queue
+
+# Schedule states
+SCHEDULED = "scheduled"
+FIRING = "firing"
+FIRED = "fired"
+CANCELLED = "cancelled"
+
+WINDOW = 300  # seconds of upcoming posts loaded into memory
+MAX_LOADED = 1000  # posts loaded per window refresh
+
+
+class PostScheduler:
+    """Timer for scheduled posts backed by a run_at index"""
+
+    def __init__(self, window: int = WINDOW, max_loaded: int = MAX_LOADED):
+        self.window = timedelta(seconds=window)
+        self.max_loaded = max_loaded
+        self.bot = None
+        # (run_at, schedule_id) for posts due before window_end
+        self.heap = []
+        self.loaded = set()
+        self.window_end = datetime.min
+        self.wakeup = asyncio.Event()
+        self.firing = set()
+        self.fired = 0
+
+    async def start(self, bot):
+        """Create indexes, finish interrupted posts and start the timer"""
+        self.bot = bot
+
+        await db.scheduled_posts.create_index([("status", ASCENDING), ("run_at", ASCENDING)])
+        await db.scheduled_posts.create_index([("user_id", ASCENDING), ("status", ASCENDING)])
+
+        # Posts claimed by a previous process; the publish batch id makes this safe
+        interrupted = [post async for post in db.scheduled_posts.find({"status": FIRING})]
+        for post in interrupted:
+            await self._fire(post)
+
+        pending = await db.scheduled_posts.count_documents({"status": SCHEDULED})
+        log_system_event("Post scheduler started", f"Pending: {pending}, Recovered: {len(interrupted)}")
+
+        asyncio.create_task(self._timer())
+
+    async def schedule(self, user_id: int, user_data: dict, channels: list, status_chat_id: int, run_at: datetime) -> str:
+        """Store a post to be published at ``run_at`` and return its id"""
+        schedule_id = uuid.uuid4().hex
+        await db.scheduled_posts.insert_one({
+            "_id": schedule_id,
+            "user_id": user_id,
+            "post": {field: value for field, value in post_document(user_data).items() if field in POST_FIELDS},
+            "channels": channels,
+            "status_chat_id": status_chat_id,
+            "run_at": run_at,
+            "status": SCHEDULED,
+            "created_at": datetime.now(),
+            "fired_at": None
+        })
+
+        # Posts outside the loaded window are picked up by a later refresh
+        if run_at <= self.window_end:
+            self._push(run_at, schedule_id)
+            self.wakeup.set()
+        return schedule_id
+
+    async def cancel(self, user_id: int, schedule_id: str) -> bool:
+        """Cancel a pending post; returns False if it already fired"""
+        result = await db.scheduled_posts.update_one(
+            {"_id": schedule_id, "user_id": user_id, "status": SCHEDULED},
+            {"$set": {"status": CANCELLED}}
+        )
+        return result.modified_count > 0
+
+    async def get_pending(self, user_id: int, limit: int = 10) -> list:
+        """Upcoming posts for one user, soonest first"""
+        cursor = db.scheduled_posts.find(
+            {"user_id": user_id, "status": SCHEDULED},
+            {"run_at": 1, "channels.title": 1, "post.text": 1, "post.media": 1}
+        ).sort("run_at", ASCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    def _push(self, run_at: datetime, schedule_id: str):
+        if schedule_id not in self.loaded:
+            self.loaded.add(schedule_id)
+            heapq.heappush(self.heap, (run_at, schedule_id))
+
+    async def _load_window(self):
+        """Load the posts due before the end of the next window"""
+        window_end = datetime.now() + self.window
+        cursor = db.scheduled_posts.find(
+            {"status": SCHEDULED, "run_at": {"$lte": window_end}},
+            {"run_at": 1}
+        ).sort("run_at", ASCENDING).limit(self.max_loaded)
+        posts = await cursor.to_list(length=self.max_loaded)
+
+        for post in posts:
+            self._push(post["run_at"], post["_id"])
+
+        # A full page may have cut the window short; refresh again from there
+        self.window_end = posts[-1]["run_at"] if len(posts) >= self.max_loaded else window_end
+
+    async def _timer(self):
+        """Fire due posts and sleep until the next one"""
+        while True:
+            try:
+                now = datetime.now()
+                if now >= self.window_end:
+                    await self._load_window()
+
+                while self.heap and self.heap[0][0] <= now:
+                    _, schedule_id = heapq.heappop(self.heap)
+                    self.loaded.discard(schedule_id)
+                    task = asyncio.create_task(self._claim_and_fire(schedule_id))
+                    self.firing.add(task)
+                    task.add_done_callback(self.firing.discard)
+
+                next_wake = min(self.heap[0][0], self.window_end) if self.heap else self.window_end
+                timeout = max((next_wake - datetime.now()).total_seconds(), 0)
+            except Exception as e:
+                log_error(e, "Post scheduler tick failed")
+                timeout = self.window.total_seconds()
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim_and_fire(self, schedule_id: str):
+        """Atomically claim a due post so no other process fires it"""
+        post = await db.scheduled_posts.find_one_and_update(
+            {"_id": schedule_id, "status": SCHEDULED, "run_at": {"$lte": datetime.now()}},
+            {"$set": {"status": FIRING, "claimed_at": datetime.now()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if post is None:
+            # Cancelled, or already claimed elsewhere
+            return
+        await self._fire(post)
+
+    async def _fire(self, post: dict):
+        """Hand a claimed post to the publish queue"""
+        channels = post["channels"]
+        if len(channels) == 1:
+            target = html.escape(channels[0].get("title", channels[0].get("username", "Unknown")))
+        else:
+            target = f"{len(channels)} channels"
+
+        # The schedule id doubles as the publish batch id, so a post fired
+        # again after a crash completes the same batch instead of a new one
+        fresh = await db.publish_batches.count_documents({"_id": post["_id"]}, limit=1) == 0
+        try:
+            await publish_queue.enqueue(
+                post["user_id"],
+                post["post"],
+                post["channels"],
+                post["status_chat_id"],
+                None,
+                post_id=post["_id"]
+            )
+        except Exception as e:
+            log_error(e, f"Scheduled post {post['_id']} could not be queued")
+            # Release the claim and try again after the next window refresh
+            await db.scheduled_posts.update_one(
+                {"_id": post["_id"]},
+                {"$set": {"status": SCHEDULED, "run_at": datetime.now() + self.window}}
+            )
+            return
+
+        if fresh:
+            try:
+                status_message = await self.bot.send_message(
+                    post["status_chat_id"],
+                    f"<b>Publishing scheduled post to {target}</b>\n\nYour post is being sent...",
+                    parse_mode=ParseMode.HTML
+                )
+                await publish_queue.set_status_message(post["_id"], status_message.message_id)
+            except Exception as e:
+                # The summary falls back to a new message
+                logger.warning(f"Scheduled post {post['_id']} status message failed: {e}")
+
+        await db.scheduled_posts.update_one(
+            {"_id": post["_id"]},
+            {"$set": {"status": FIRED, "fired_at": datetime.now()}}
+        )
+        self.fired += 1
+
+
+# Global scheduler instance, started in main.py
+post_scheduler = PostScheduler()
@@ -0,0 +1,148 @@
+"""
+Audience segments for targeted broadcasts
+Segments are parsed from /broadcast options into absolute filters, stored
+with the broadcast and turned into db.users queries served by partial
+compound indexes on deliverable users.
+"""
+import html
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING
+
+from db import db
+from utils.logger import log_system_event
+
+# Users a broadcast can reach; served by partial indexes
+DELIVERABLE = {"deliverable": True}
+
+# Largest explicit user list accepted in one segment
+MAX_SEGMENT_USERS = 1000
+
+
+def parse_segment(text: str):
+    """Split leading segment options off a /broadcast argument string
+
+    Options come first and are separated by spaces:
+        active:7                         active in the last 7 days
+        has:channels                     has connected channels
+        joined:2025-01-01..2025-02-01    joined in a date range (either end optional)
+        users:1,2,3                      explicit user ids
+
+    Returns:
+        (segment, remaining_text)
+
+    Raises:
+        ValueError: If an option is malformed
+    """
+    segment = {}
+    words = text.split(" ")
+    consumed = 0
+
+    for word in words:
+        if not word:
+            consumed += 1
+            continue
+        key, _, value = word.partition(":")
+        key = key.lower()
+
+        if key == "active" and value:
+            if not value.isdigit() or int(value) <= 0:
+                raise ValueError("active:N needs a positive number of days")
+            segment["active_since"] = datetime.now() - timedelta(days=int(value))
+        elif key == "has" and value == "channels":
+            segment["has_channels"] = True
+        elif key == "joined" and value:
+            start, _, end = value.partition("..")
+            try:
+                if start:
+                    segment["joined_from"] = datetime.strptime(start, "%Y-%m-%d")
+                if end:
+                    # Inclusive end date
+                    segment["joined_to"] = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)
+            except ValueError:
+                raise ValueError("joined:FROM..TO needs dates like 2025-01-31")
+        elif key == "users" and value:
+            try:
+                user_ids = sorted({int(user_id) for user_id in value.split(",") if user_id})
+            except ValueError:
+                raise ValueError("users:ID,ID needs numeric user ids")
+            if not user_ids or len(user_ids) > MAX_SEGMENT_USERS:
+                raise ValueError(f"users: takes 1 to {MAX_SEGMENT_USERS} user ids")
+            segment["user_ids"] = user_ids
+        else:
+            break
+        consumed += 1
+
+    return segment, " ".join(words[consumed:]).strip()
+
+
+def segment_query(segment: dict) -> dict:
+    """db.users filter for a segment, always limited to deliverable users"""
+    query = dict(DELIVERABLE)
+    if "active_since" in segment:
+        query["last_activity"] = {"$gte": segment["active_since"]}
+    if segment.get("has_channels"):
+        query["connected_channels.chat_id"] = {"$exists": True}
+    if "joined_from" in segment or "joined_to" in segment:
+        query["joined_date"] = {}
+        if "joined_from" in segment:
+            query["joined_date"]["$gte"] = segment["joined_from"]
+        if "joined_to" in segment:
+            query["joined_date"]["$lt"] = segment["joined_to"]
+    if "user_ids" in segment:
+        query["user_id"] = {"$in": segment["user_ids"]}
+    return query
+
+
+def describe_segment(segment: dict) -> str:
+    """Human-readable (HTML) description of a segment"""
+    if not segment:
+        return "All reachable users"
+
+    parts = []
+    if "active_since" in segment:
+        parts.append(f"active since {segment['active_since'].strftime('%Y-%m-%d')}")
+    if segment.get("has_channels"):
+        parts.append("with connected channels")
+    if "joined_from" in segment or "joined_to" in segment:
+        joined_from = segment["joined_from"].strftime("%Y-%m-%d") if "joined_from" in segment else "start"
+        joined_to = (segment["joined_to"] - timedelta(days=1)).strftime("%Y-%m-%d") if "joined_to" in segment else "now"
+        parts.append(f"joined {joined_from} to {joined_to}")
+    if "user_ids" in segment:
+        parts.append(f"{len(segment['user_ids'])} listed user(s)")
+    return html.escape("Reachable users " + ", ".join(parts))
+
+
+async def count_segment(segment: dict) -> int:
+    """Count-only audience preview"""
+    return await db.users.count_documents(segment_query(segment))
+
+
+async def ensure_indexes():
+    """Partial compound indexes so segment filters never scan the collection
+
+    Also backfills joined_date, which older user documents don't have.
+    """
+    await db.users.create_index(
+        [("last_activity", ASCENDING), ("user_id", ASCENDING)],
+        name="deliverable_last_activity",
+        partialFilterExpression=DELIVERABLE
+    )
+    await db.users.create_index(
+        [("joined_date", ASCENDING), ("user_id", ASCENDING)],
+        name="deliverable_joined_date",
+        partialFilterExpression=DELIVERABLE
+    )
+    await db.users.create_index(
+        [("connected_channels.chat_id", ASCENDING), ("user_id", ASCENDING)],
+        name="deliverable_channels",
+        partialFilterExpression=DELIVERABLE
+    )
+
+    # Users stored before joined_date existed joined when they were first seen
+    backfilled = await db.users.update_many(
+        {"joined_date": {"$exists": False}, "first_seen": {"$exists": True}},
+        [{"$set": {"joined_date": "$first_seen"}}]
+    )
+    if backfilled.modified_count:
+        log_system_event("Joined dates backfilled", f"Count: {backfilled.modified_count}")
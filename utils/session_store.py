@@ -0,0 +1,351 @@
+"""
+Pluggable session storage for PostBot
+Drafts, edit state and pending broadcasts are kept in SessionMaps. Reads are
+served synchronously from an in-process LRU/TTL tier so router filters stay
+cheap; when SESSION_BACKEND is "mongo" or "redis" every change is also
+written through to the shared store, and sessions are reloaded from it
+before each update is handled.
+"""
+import abc
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from aiogram import BaseMiddleware
+
+from config import Config
+from utils.logger import log_error
+
+# Marker for a pending delete in the write-behind buffer
+_DELETED = object()
+
+# Backoff between write-behind retries while the shared store is failing
+FLUSH_RETRY_MIN = 1  # seconds
+FLUSH_RETRY_MAX = 60  # seconds
+
+
+def encode_session(value) -> bytes:
+    """Serialize a session for stores without native document support"""
+    return json.dumps(value, default=_encode_default, separators=(",", ":")).encode("utf-8")
+
+
+def decode_session(data: bytes):
+    return json.loads(data, object_hook=_decode_hook)
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Session value of type {type(value).__name__} is not serializable")
+
+
+def _decode_hook(value: dict):
+    if "__datetime__" in value and len(value) == 1:
+        return datetime.fromisoformat(value["__datetime__"])
+    return value
+
+
+class SessionStore(abc.ABC):
+    """Async key-value interface shared by all session backends
+
+    Persistent stores hold encoded bytes; SessionMap does the encoding.
+    """
+
+    # False for stores that only live in this process
+    persistent = True
+
+    @abc.abstractmethod
+    async def get(self, key: str):
+        """Return the stored value or None"""
+
+    @abc.abstractmethod
+    async def set(self, key: str, value):
+        pass
+
+    @abc.abstractmethod
+    async def delete(self, key: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store with idle TTL and LRU eviction"""
+
+    persistent = False
+
+    def __init__(self, ttl: int = None, max_entries: int = None):
+        self.ttl = Config.SESSION_TTL if ttl is None else ttl
+        self.max_entries = max_entries or Config.SESSION_MAX_ENTRIES
+        # key -> (value, last_access); ordered from least to most recently used
+        self.entries = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_nowait(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        now = time.monotonic()
+        if self.ttl and now - entry[1] > self.ttl:
+            del self.entries[key]
+            self.expirations += 1
+            return default
+        self.entries[key] = (entry[0], now)
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def set_nowait(self, key, value):
+        self.entries[key] = (value, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete_nowait(self, key):
+        self.entries.pop(key, None)
+
+    def sweep(self) -> int:
+        """Drop idle entries; only touches the expired ones at the LRU end"""
+        if not self.ttl:
+            return 0
+        cutoff = time.monotonic() - self.ttl
+        swept = 0
+        while self.entries:
+            key, entry = self.entries.popitem(last=False)
+            if entry[1] > cutoff:
+                # Still live; put it back at the LRU end
+                self.entries[key] = entry
+                self.entries.move_to_end(key, last=False)
+                break
+            swept += 1
+        self.expirations += swept
+        return swept
+
+    def get_metrics(self) -> dict:
+        """Size and eviction counters"""
+        return {
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def __contains__(self, key) -> bool:
+        return self.get_nowait(key, _DELETED) is not _DELETED
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def get(self, key: str):
+        return self.get_nowait(key)
+
+    async def set(self, key: str, value):
+        self.set_nowait(key, value)
+
+    async def delete(self, key: str):
+        self.delete_nowait(key)
+
+
+class MongoSessionStore(SessionStore):
+    """Sessions as documents in db.sessions, expired by a TTL index"""
+
+    def __init__(self, collection=None, ttl: int = None):
+        from db import db
+        self.collection = collection if collection is not None else db.sessions
+        self.ttl = Config.SESSION_TTL if ttl is None else ttl
+        self.indexed = False
+
+    async def _ensure_index(self):
+        if not self.indexed:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self.indexed = True
+
+    async def get(self, key: str):
+        document = await self.collection.find_one({"_id": key}, {"value": 1})
+        return bytes(document["value"]) if document else None
+
+    async def set(self, key: str, value):
+        await self._ensure_index()
+        await self.collection.replace_one(
+            {"_id": key},
+            {"value": value, "expires_at": datetime.fromtimestamp(time.time() + self.ttl)},
+            upsert=True
+        )
+
+    async def delete(self, key: str):
+        await self.collection.delete_one({"_id": key})
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions in any Redis-protocol server (Redis, Valkey, KeyDB, Dragonfly)"""
+
+    def __init__(self, url: str = None, ttl: int = None, client=None):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package (pip install redis)")
+            client = redis.from_url(url or Config.REDIS_URL)
+        self.client = client
+        self.ttl = Config.SESSION_TTL if ttl is None else ttl
+
+    async def get(self, key: str):
+        return await self.client.get(key)
+
+    async def set(self, key: str, value):
+        await self.client.set(key, value, ex=self.ttl or None)
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_session_store(backend: str = None) -> SessionStore:
+    """Build the shared store named by SESSION_BACKEND"""
+    backend = (backend or Config.SESSION_BACKEND).lower()
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "mongo":
+        return MongoSessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+
+class SessionMap:
+    """Synchronous per-namespace session view used by handlers
+
+    Every map keeps a local MemorySessionStore. With a persistent backend,
+    changes are buffered and written through by one background task per
+    map, so repeated updates to the same session coalesce into one write.
+    """
+
+    # Every map, for the sweeper and metrics
+    maps = []
+    # Maps reloaded for the current user before each update
+    user_maps = []
+
+    def __init__(self, namespace: str, backend: SessionStore = None, per_user: bool = True,
+                 ttl: int = None, max_entries: int = None, encode=encode_session, decode=decode_session):
+        self.namespace = namespace
+        self.backend = backend if backend is not None else session_backend
+        self.encode = encode
+        self.decode = decode
+        self.local = MemorySessionStore(ttl, max_entries)
+        # key -> (value or _DELETED, write sequence number)
+        self.pending = {}
+        self.write_seq = 0
+        self.flush_task = None
+        SessionMap.maps.append(self)
+        if per_user:
+            SessionMap.user_maps.append(self)
+
+    def _key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key, default=None):
+        return self.local.get_nowait(key, default)
+
+    def set(self, key, value):
+        self.local.set_nowait(key, value)
+        self._write(key, value)
+
+    def delete(self, key):
+        self.local.delete_nowait(key)
+        self._write(key, _DELETED)
+
+    def __contains__(self, key) -> bool:
+        return key in self.local
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    async def load(self, key):
+        """Refresh one session from the shared store"""
+        if not self.backend.persistent or key in self.pending:
+            # Local copy is authoritative or newer than the stored one
+            return
+        try:
+            data = await self.backend.get(self._key(key))
+            value = self.decode(data) if data is not None else None
+        except Exception as e:
+            log_error(e, f"Loading {self.namespace} session {key} failed")
+            return
+        if value is None:
+            self.local.delete_nowait(key)
+        else:
+            self.local.set_nowait(key, value)
+
+    def _write(self, key, value):
+        if not self.backend.persistent:
+            return
+        self.write_seq += 1
+        self.pending[key] = (value, self.write_seq)
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        backoff = 0
+        while self.pending:
+            key = next(iter(self.pending))
+            value, seq = self.pending[key]
+            try:
+                data = None if value is _DELETED else self.encode(value)
+            except Exception as e:
+                # Retrying can't fix a value that doesn't serialize
+                log_error(e, f"Encoding {self.namespace} session {key} failed")
+            else:
+                try:
+                    if value is _DELETED:
+                        await self.backend.delete(self._key(key))
+                    else:
+                        await self.backend.set(self._key(key), data)
+                except Exception as e:
+                    log_error(e, f"Saving {self.namespace} session {key} failed")
+                    # Keep the change and retry it after the others, backing
+                    # off while the store is down
+                    self.pending[key] = self.pending.pop(key)
+                    backoff = min(backoff * 2 or FLUSH_RETRY_MIN, FLUSH_RETRY_MAX)
+                    await asyncio.sleep(backoff)
+                    continue
+                backoff = 0
+            # Keep the entry if it was changed again while saving
+            if self.pending.get(key, (None, None))[1] == seq:
+                del self.pending[key]
+
+
+def get_session_metrics() -> dict:
+    """Per-namespace size and eviction counters"""
+    return {session_map.namespace: session_map.local.get_metrics() for session_map in SessionMap.maps}
+
+
+async def session_sweeper_task():
+    """Background task dropping idle sessions so memory stays flat"""
+    while True:
+        await asyncio.sleep(Config.SESSION_SWEEP_INTERVAL)
+        try:
+            for session_map in SessionMap.maps:
+                session_map.local.sweep()
+        except Exception as e:
+            log_error(e, "Session sweep failed")
+
+
+class SessionLoaderMiddleware(BaseMiddleware):
+    """Outer middleware reloading the user's sessions before filters run"""
+
+    async def __call__(self, handler, event, data):
+        user = data.get("event_from_user")
+        if user is not None and session_backend.persistent:
+            await asyncio.gather(*(session_map.load(user.id) for session_map in SessionMap.user_maps))
+        return await handler(event, data)
+
+
+# Shared store for every SessionMap
+session_backend = create_session_store()
+session_loader = SessionLoaderMiddleware()
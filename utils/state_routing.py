@@ -0,0 +1,71 @@
+"""
+State-indexed message routing for PostBot
+Handlers that consume free-form input (post text, media, button lists,
+schedule times, edits) register here by session and state instead of with
+a router filter. A middleware looks the user's state up once per message
+and calls the matching handler directly, so ordinary messages no longer
+run every state filter on the router.
+"""
+from aiogram import BaseMiddleware
+
+from utils.handler_metrics import handler_metrics
+from utils.keyboards import MENU_LABELS
+
+
+def is_menu_or_command(message) -> bool:
+    """Menu buttons and commands always go to the router"""
+    text = message.text
+    return bool(text) and (text in MENU_LABELS or text.startswith("/"))
+
+
+class StateRouter:
+    """Maps (session map, state) to the handlers accepting that input"""
+
+    def __init__(self):
+        # session map -> {state: [(accepts, handler)]}, checked in registration order
+        self.routes = {}
+
+    def message(self, sessions, state: str, accepts=None):
+        """Register a handler for messages sent while a session is in `state`
+
+        `accepts` is an optional predicate on the message; input that is a
+        menu button or command is never passed to it.
+        """
+        def decorator(handler):
+            self.routes.setdefault(sessions, {}).setdefault(state, []).append((accepts, handler))
+            return handler
+        return decorator
+
+    def resolve(self, message):
+        """The handler for this message, or None to use the router"""
+        if is_menu_or_command(message):
+            return None
+        user_id = message.from_user.id
+        for sessions, states in self.routes.items():
+            session = sessions.get(user_id)
+            if not session:
+                continue
+            for accepts, handler in states.get(session.get("state"), ()):
+                if accepts is None or accepts(message):
+                    return handler
+        return None
+
+
+class StateRoutingMiddleware(BaseMiddleware):
+    """Outer message middleware dispatching state input without the router"""
+
+    def __init__(self, state_router: StateRouter):
+        self.state_router = state_router
+
+    async def __call__(self, handler, event, data):
+        if event.from_user is not None:
+            state_handler = self.state_router.resolve(event)
+            if state_handler is not None:
+                handler_metrics.label(state_handler)
+                return await state_handler(event)
+        return await handler(event, data)
+
+
+# Global state router instance
+state_router = StateRouter()
+state_routing = StateRoutingMiddleware(state_router)
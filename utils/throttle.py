@@ -0,0 +1,126 @@
+"""
+Inbound per-user throttling for PostBot
+Each user may send RATE_LIMIT_REQUESTS updates per RATE_LIMIT_WINDOW
+seconds, counted with an approximate sliding window: the current fixed
+window's count plus the previous window's count weighted by how much of
+it still overlaps. That is two counters per user, kept in a bounded LRU
+table. Updates over the limit are dropped before they are queued or
+handled; the user is told once per window, and at most one dropped
+callback query per window is answered so the button stops loading
+without spending an API call on every tap. Admins are never throttled.
+"""
+import time
+from collections import OrderedDict
+
+from aiogram import BaseMiddleware
+
+from config import Config
+from utils.logger import logger
+
+
+class _UserWindow:
+    __slots__ = ("window", "current", "previous", "warned", "callback_answered")
+
+    def __init__(self, window: int):
+        # Index of the fixed window `current` counts
+        self.window = window
+        self.current = 0
+        self.previous = 0
+        self.warned = False
+        self.callback_answered = False
+
+
+class InboundThrottle(BaseMiddleware):
+    """Outer update middleware dropping updates over the per-user limit"""
+
+    def __init__(self, limit: int = None, window: int = None, max_users: int = None):
+        self.limit = limit or Config.RATE_LIMIT_REQUESTS
+        self.window = window or Config.RATE_LIMIT_WINDOW
+        self.max_users = max_users or Config.RATE_LIMIT_MAX_USERS
+        # user_id -> _UserWindow; ordered from least to most recently seen
+        self.users = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+        self.throttled_windows = 0
+        self.evictions = 0
+
+    def allow(self, user_id: int) -> bool:
+        """Count one update for the user; False when it is over the limit"""
+        now = time.monotonic() / self.window
+        index = int(now)
+
+        state = self.users.get(user_id)
+        if state is None:
+            state = self.users[user_id] = _UserWindow(index)
+            if len(self.users) > self.max_users:
+                # The least recently seen user loses their count, nothing else
+                self.users.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.users.move_to_end(user_id)
+            if state.window != index:
+                state.previous = state.current if state.window == index - 1 else 0
+                state.current = 0
+                state.window = index
+                state.warned = False
+                state.callback_answered = False
+
+        # Share of the previous window still inside the sliding window
+        overlap = 1.0 - (now - index)
+        if state.current + state.previous * overlap >= self.limit:
+            return False
+        state.current += 1
+        return True
+
+    async def __call__(self, handler, event, data):
+        user = data.get("event_from_user")
+        if user is None or Config.is_admin(user.id):
+            return await handler(event, data)
+        if self.allow(user.id):
+            self.allowed += 1
+            return await handler(event, data)
+
+        self.rejected += 1
+        state = self.users[user.id]
+        if not state.warned:
+            # Tell the user once per window; everything else is dropped silently
+            state.warned = True
+            state.callback_answered = event.callback_query is not None
+            self.throttled_windows += 1
+            logger.warning(f"THROTTLE | user {user.id} | over {self.limit} updates per {self.window}s")
+            await self._notify(event)
+        elif event.callback_query and not state.callback_answered:
+            # Stop the button's loading indicator once; later taps are left to time out
+            state.callback_answered = True
+            try:
+                await event.callback_query.answer()
+            except Exception as e:
+                logger.warning(f"THROTTLE | could not answer callback | {e}")
+        return None
+
+    async def _notify(self, update):
+        text = "Too many requests. Please slow down and try again in a minute."
+        try:
+            if update.callback_query:
+                await update.callback_query.answer(text, show_alert=True)
+            elif update.message:
+                await update.message.answer(text)
+        except Exception as e:
+            logger.warning(f"THROTTLE | could not notify user | {e}")
+
+    def get_metrics(self) -> dict:
+        """Allowed and rejected update counts"""
+        return {
+            "limit": self.limit,
+            "window": self.window,
+            "tracked_users": len(self.users),
+            "max_users": self.max_users,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "throttled_windows": self.throttled_windows,
+            "evictions": self.evictions
+        }
+
+
+# Global inbound throttle instance
+inbound_throttle = InboundThrottle()
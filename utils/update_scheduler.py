@@ -0,0 +1,75 @@
+"""
+Per-user update ordering for PostBot
+Polling handles every update as its own task. Updates from one user are
+run one at a time, in arrival order, so two quick taps can't interleave
+their draft read-modify-writes; updates from different users still run
+in parallel. Locks exist only while a user has updates in flight.
+"""
+import asyncio
+import time
+
+from aiogram import BaseMiddleware
+
+
+class _UserLane:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Updates running or waiting for this user
+        self.pending = 0
+
+
+class UserUpdateSerializer(BaseMiddleware):
+    """Outer update middleware serializing updates per user"""
+
+    def __init__(self):
+        self.lanes = {}
+        self.processed = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.max_depth = 0
+
+    async def __call__(self, handler, event, data):
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        lane = self.lanes.get(user.id)
+        if lane is None:
+            lane = self.lanes[user.id] = _UserLane()
+        lane.pending += 1
+        self.max_depth = max(self.max_depth, lane.pending)
+
+        started = time.monotonic()
+        try:
+            # asyncio.Lock wakes waiters first-in, first-out
+            async with lane.lock:
+                wait = time.monotonic() - started
+                if wait > 0.001:
+                    self.waited += 1
+                    self.wait_seconds += wait
+                    self.max_wait = max(self.max_wait, wait)
+                return await handler(event, data)
+        finally:
+            lane.pending -= 1
+            self.processed += 1
+            if lane.pending == 0:
+                del self.lanes[user.id]
+
+    def get_metrics(self) -> dict:
+        """Queue depth and wait time for the update queue"""
+        return {
+            "active_users": len(self.lanes),
+            "queued_updates": sum(lane.pending for lane in self.lanes.values()) - len(self.lanes),
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "waited": self.waited,
+            "avg_wait": self.wait_seconds / self.waited if self.waited else 0.0,
+            "max_wait": self.max_wait
+        }
+
+
+# Global update serializer instance
+update_serializer = UserUpdateSerializer()